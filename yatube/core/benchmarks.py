@@ -0,0 +1,405 @@
+import math
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import URLResolver, get_resolver, reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from posts.models import Group, Post
+from .instrumentation import capture
+from .templates import cached_loaders, precompile_templates, reset_templates
+
+
+User = get_user_model()
+
+BENCH_NAMESPACES = ('posts', 'users', 'about')
+
+# Изменяющие данные и служебные адреса в замерах не участвуют.
+SKIP_VIEWS = {
+    'users:logout',
+    'posts:add_comment',
+    'posts:profile_follow',
+    'posts:profile_unfollow',
+    'posts:profile_export',
+    'posts:group_export',
+}
+
+PAGES = {
+    'shallow': '1',
+    'deep': 'last',
+}
+
+FEED_VIEWS = (
+    'posts:index',
+    'posts:group_posts',
+    'posts:profile',
+    'posts:follow_index',
+)
+
+TEMPLATE_VIEWS = FEED_VIEWS + ('posts:post_detail',)
+
+POOLED_ENGINES = {
+    'django.db.backends.postgresql': 'core.db.backends.postgresql',
+    'django.db.backends.sqlite3': 'core.db.backends.sqlite3',
+}
+
+
+def percentile(values, percent):
+    """Перцентиль методом ближайшего ранга."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def iter_named_urls(patterns=None, namespace=None):
+    """Обходит urlconf и отдает пары (view_name, pattern)."""
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_named_urls(
+                pattern.url_patterns, pattern.namespace or namespace)
+        elif pattern.name and namespace:
+            yield f'{namespace}:{pattern.name}', pattern
+
+
+def bench_views(namespaces=BENCH_NAMESPACES, skip=SKIP_VIEWS):
+    seen = set()
+    for view_name, pattern in iter_named_urls():
+        namespace = view_name.split(':')[0]
+        if namespace in namespaces and view_name not in skip:
+            if view_name not in seen:
+                seen.add(view_name)
+                yield view_name, pattern
+
+
+def is_paginated(pattern):
+    view_class = getattr(pattern.callback, 'view_class', None)
+    return bool(getattr(view_class, 'paginate_by', None))
+
+
+def sample_kwargs(user):
+    """Значения параметров адресов из самых «тяжелых» объектов базы."""
+    group = Group.objects.annotate(total=Count('posts')).order_by(
+        '-total').first()
+    author = User.objects.annotate(total=Count('posts')).order_by(
+        '-total').first()
+    post = Post.objects.annotate(total=Count('comments')).order_by(
+        '-total').first()
+    return {
+        'slug': group.slug if group else 'missing',
+        'username': author.username if author else 'missing',
+        'post_id': post.pk if post else 0,
+        'uidb64': urlsafe_base64_encode(force_bytes(user.pk)),
+        'token': default_token_generator.make_token(user),
+    }
+
+
+def bench_user(username=None):
+    """Пользователь для авторизованных замеров: самый подписанный."""
+    if username:
+        return User.objects.get(username=username)
+    return User.objects.annotate(total=Count('follower')).order_by(
+        '-total').first()
+
+
+def build_cases(user):
+    """Список (ключ, адрес, нужна ли авторизация) для всех замеров."""
+    kwargs = sample_kwargs(user)
+    cases = []
+    for view_name, pattern in bench_views():
+        url_kwargs = {
+            name: kwargs[name] for name in pattern.pattern.converters
+        }
+        url = reverse(view_name, kwargs=url_kwargs)
+        pages = PAGES if is_paginated(pattern) else {'shallow': None}
+        for depth, page in pages.items():
+            page_url = f'{url}?page={page}' if page else url
+            for authorized in (False, True):
+                kind = 'user' if authorized else 'anonymous'
+                cases.append(
+                    (f'{view_name} {kind} {depth}', page_url, authorized))
+    return cases
+
+
+def fetch(client, url):
+    response = client.get(url)
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+def measure(client, url, iterations, warmup=1, before_request=None):
+    """Замеряет адрес: задержку, число SQL-запросов и время в SQL."""
+    for _ in range(warmup):
+        fetch(client, url)
+    latencies, query_counts, sql_times = [], [], []
+    status = None
+    for _ in range(iterations):
+        if before_request:
+            before_request()
+        with capture() as log:
+            started = time.perf_counter()
+            status = fetch(client, url).status_code
+            latencies.append((time.perf_counter() - started) * 1000)
+        query_counts.append(log.count)
+        sql_times.append(log.sql_time * 1000)
+    return {
+        'url': url,
+        'status': status,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'queries': max(query_counts),
+        'sql_ms': round(percentile(sql_times, 50), 3),
+    }
+
+
+def run_benchmarks(user, iterations, warmup=1, before_request=None):
+    anonymous, authorized = Client(), Client()
+    authorized.force_login(user)
+    results = {}
+    for key, url, is_authorized in build_cases(user):
+        client = authorized if is_authorized else anonymous
+        try:
+            results[key] = measure(
+                client, url, iterations, warmup, before_request)
+        except Exception as error:
+            results[key] = {'url': url, 'error': repr(error)}
+    return results
+
+
+def compare(baseline, current, tolerance=0.25, min_delta_ms=2.0):
+    """Список регрессий относительно сохраненного baseline.
+
+    Задержка считается регрессией, если p95 вырос больше чем на tolerance
+    и при этом больше чем на min_delta_ms; число запросов не должно
+    расти вовсе.
+    """
+    regressions = []
+    for key, result in sorted(current.items()):
+        before = baseline.get(key)
+        if not before or 'error' in before:
+            continue
+        if 'error' in result:
+            regressions.append(f'{key}: {result["error"]}')
+            continue
+        if result['queries'] > before['queries']:
+            regressions.append(
+                f'{key}: SQL-запросов {before["queries"]} '
+                f'-> {result["queries"]}')
+        limit = max(
+            before['p95_ms'] * (1 + tolerance),
+            before['p95_ms'] + min_delta_ms
+        )
+        if result['p95_ms'] > limit:
+            regressions.append(
+                f'{key}: p95 {before["p95_ms"]} мс '
+                f'-> {result["p95_ms"]} мс')
+    return regressions
+
+
+@contextmanager
+def database_engine(engine, alias=DEFAULT_DB_ALIAS):
+    """Временно подменяет ENGINE алиаса, подключение на каждый запрос."""
+    original = connections.databases[alias]
+    connections[alias].close()
+    del connections[alias]
+    connections.databases[alias] = {
+        **original, 'ENGINE': engine, 'CONN_MAX_AGE': 0}
+    try:
+        yield connections[alias]
+    finally:
+        connections[alias].close()
+        del connections[alias]
+        connections.databases[alias] = original
+
+
+@contextmanager
+def private_cache():
+    """Кеши SQLite во временном каталоге вместо общих файлов: замеры с
+    холодным кешем очищают его, не трогая кеш запущенного сервера."""
+    with tempfile.TemporaryDirectory(prefix='yatube-cache-') as directory:
+        private = {
+            alias: {**params, 'LOCATION': os.path.join(
+                directory, f'{alias}.sqlite3')}
+            if params['BACKEND'] == 'core.cache.sqlite.SQLiteCache'
+            else params
+            for alias, params in settings.CACHES.items()
+        }
+        with override_settings(CACHES=private):
+            # L1 процесса очищается вместе с временным L2.
+            cache.clear()
+            try:
+                yield
+            finally:
+                cache.clear()
+
+
+def bench_connection_modes(user, iterations, alias=DEFAULT_DB_ALIAS):
+    """Ленты с подключением на запрос и с пулом core.db.backends.
+
+    Кеш (временный, private_cache) очищается перед каждым запросом, чтобы
+    каждый запрос шел в базу.
+    """
+    from core.db.pool import close_pools
+    from core.clients import WSGISession
+    from yatube.wsgi import application
+
+    engine = connections.databases[alias]['ENGINE']
+    plain = {pooled: base for base, pooled in POOLED_ENGINES.items()}.get(
+        engine, engine)
+    if plain not in POOLED_ENGINES:
+        raise ValueError(f'Нет пула для бэкенда {engine}')
+    cases = [
+        case for case in build_cases(user)
+        if case[0].split()[0] in FEED_VIEWS and 'shallow' in case[0]
+    ]
+    connects = []
+
+    def count_connect(sender, connection, **kwargs):
+        if connection.alias == alias:
+            connects.append(connection)
+
+    results = {}
+    connection_created.connect(count_connect)
+    try:
+        for mode, mode_engine in (
+                ('plain', plain), ('pooled', POOLED_ENGINES[plain])):
+            connects.clear()
+            with database_engine(mode_engine, alias) as connection, \
+                    private_cache():
+                # Тестовый Client не закрывает подключения после запроса,
+                # поэтому запросы идут через WSGI-приложение целиком.
+                login = Client()
+                login.force_login(user)
+                anonymous = WSGISession(application)
+                authorized = WSGISession(application)
+                authorized.cookies.update({
+                    name: morsel.value
+                    for name, morsel in login.cookies.items()
+                })
+                latencies = []
+                for _ in range(iterations):
+                    for key, url, is_authorized in cases:
+                        cache.clear()
+                        session = authorized if is_authorized else anonymous
+                        started = time.perf_counter()
+                        session.request('GET', url)
+                        latencies.append(
+                            (time.perf_counter() - started) * 1000)
+                pool = getattr(connection, 'pool', None)
+                stats = pool.stats() if pool else {'created': len(connects)}
+                connect_ms = connect_time(connection)
+                close_pools()
+            results[mode] = {
+                'requests': len(latencies),
+                'mean_ms': round(sum(latencies) / len(latencies), 3),
+                'p50_ms': round(percentile(latencies, 50), 3),
+                'p95_ms': round(percentile(latencies, 95), 3),
+                'connections_opened': stats.get('created', 0),
+                'connect_ms': connect_ms,
+                'pool': stats if pool else None,
+            }
+    finally:
+        connection_created.disconnect(count_connect)
+    # Пул платит полную цену только за новые подключения, а за выдачу
+    # готового - время connect() через пул.
+    plain, pooled = results['plain'], results['pooled']
+    pooled_cost = (
+        pooled['connections_opened'] * plain['connect_ms']
+        + pooled['pool'].get('reused', 0) * pooled['connect_ms']
+    )
+    results['saved_ms_per_request'] = round((
+        plain['connections_opened'] * plain['connect_ms'] - pooled_cost
+    ) / plain['requests'], 3)
+    return results
+
+
+def connect_time(connection, samples=10):
+    """Среднее время connect() с настройкой подключения, мс."""
+    total = 0.0
+    for _ in range(samples):
+        connection.close()
+        started = time.perf_counter()
+        connection.ensure_connection()
+        total += time.perf_counter() - started
+    connection.close()
+    return round(total / samples * 1000, 3)
+
+
+def cached_templates():
+    """settings.TEMPLATES с cached.Loader, как вне режима отладки."""
+    templates = []
+    for backend in settings.TEMPLATES:
+        backend = {**backend, 'OPTIONS': {**backend.get('OPTIONS', {})}}
+        if backend['BACKEND'].endswith('DjangoTemplates'):
+            backend.pop('APP_DIRS', None)
+            backend['OPTIONS']['loaders'] = [(
+                'django.template.loaders.cached.Loader',
+                settings.TEMPLATE_LOADERS,
+            )]
+        templates.append(backend)
+    return templates
+
+
+def timed_fetch(client, url):
+    started = time.perf_counter()
+    fetch(client, url)
+    return (time.perf_counter() - started) * 1000
+
+
+def bench_template_warmup(user, iterations):
+    """Первый запрос воркера против установившегося режима.
+
+    Для лент и страницы поста замеряются первый запрос без разобранных
+    шаблонов (cold_ms), первый запрос после precompile_templates
+    (precompiled_ms) и медиана следующих запросов (steady_ms). Кеш
+    загрузчика сбрасывается перед холодными замерами, поэтому каждый
+    адрес мерится как первый в новом процессе. Кеш данных прогревается
+    заранее и не очищается: разница замеров - это разбор шаблонов.
+    """
+    cases = [
+        case for case in build_cases(user)
+        if case[0].split()[0] in TEMPLATE_VIEWS and 'shallow' in case[0]
+    ]
+    anonymous, authorized = Client(), Client()
+    authorized.force_login(user)
+    results = {}
+    with override_settings(TEMPLATES=cached_templates()):
+        for key, url, is_authorized in cases:
+            client = authorized if is_authorized else anonymous
+            fetch(client, url)
+            reset_templates()
+            cold = timed_fetch(client, url)
+            reset_templates()
+            precompile_templates()
+            precompiled = timed_fetch(client, url)
+            steady = [timed_fetch(client, url) for _ in range(iterations)]
+            results[key] = {
+                'url': url,
+                'cold_ms': round(cold, 3),
+                'precompiled_ms': round(precompiled, 3),
+                'steady_ms': round(percentile(steady, 50), 3),
+            }
+        reset_templates()
+        started = time.perf_counter()
+        compiled = precompile_templates()
+        results['precompile'] = {
+            'templates': compiled,
+            'loaders': len(cached_loaders()),
+            'ms': round((time.perf_counter() - started) * 1000, 3),
+        }
+    return results
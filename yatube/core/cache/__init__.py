@@ -0,0 +1,11 @@
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+
+
+def delete_prefixed(prefixes, alias=DEFAULT_CACHE_ALIAS):
+    """Удаляет ключи с префиксами; бэкенд без delete_prefixed (LocMem,
+    Dummy в тестах) очищается целиком."""
+    backend = caches[alias]
+    if hasattr(backend, 'delete_prefixed'):
+        backend.delete_prefixed(prefixes)
+    else:
+        backend.clear()
@@ -0,0 +1,370 @@
+"""Кеш в файле SQLite, общий для всех процессов на сервере.
+
+LocMemCache держит отдельную копию данных в каждом воркере, и удаление
+ключа в одном воркере не доходит до остальных. Этот бэкенд хранит
+записи в одном файле (LOCATION), который открывают все процессы: запись
+сразу видна остальным, а WAL позволяет читать, не дожидаясь писателя.
+
+Журнал изменений (append_log, read_log) хранится в отдельной таблице:
+его записи не считаются в MAX_ENTRIES и MAX_SIZE и не вытесняются
+вместе со значениями. clear() и delete_prefixed() пишут в журнал запись
+без ключей - «изменилось все». Несколько записей объединяются в одну
+транзакцию блоком atomic().
+
+Дополнительные OPTIONS:
+
+    MAX_ENTRIES        - предел числа записей (как у встроенных бэкендов);
+    CULL_FREQUENCY     - при переполнении удаляется 1/CULL_FREQUENCY
+                         давно не читавшихся записей;
+    MAX_SIZE           - предел суммарного размера значений в байтах,
+                         None - без предела;
+    ACCESS_RESOLUTION  - как часто (в секундах) обновлять время чтения
+                         записи для LRU; чаще - точнее, но больше записей;
+    BUSY_TIMEOUT       - сколько миллисекунд ждать блокировку записи.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache_entry (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_entry_accessed ON cache_entry (accessed);
+CREATE INDEX IF NOT EXISTS cache_entry_expires ON cache_entry (expires);
+CREATE TABLE IF NOT EXISTS cache_usage (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    entries INTEGER NOT NULL,
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_usage VALUES (1, 0, 0);
+CREATE TABLE IF NOT EXISTS cache_log (
+    number INTEGER PRIMARY KEY AUTOINCREMENT,
+    keys BLOB,
+    expires REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_log_expires ON cache_log (expires);
+CREATE TRIGGER IF NOT EXISTS cache_entry_insert AFTER INSERT ON cache_entry
+BEGIN
+    UPDATE cache_usage SET entries = entries + 1, bytes = bytes + NEW.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entry_update
+AFTER UPDATE OF size ON cache_entry
+BEGIN
+    UPDATE cache_usage SET bytes = bytes - OLD.size + NEW.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entry_delete AFTER DELETE ON cache_entry
+BEGIN
+    UPDATE cache_usage SET entries = entries - 1, bytes = bytes - OLD.size;
+END;
+'''
+
+UPSERT = (
+    'INSERT INTO cache_entry (key, value, size, expires, accessed) '
+    'VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+    'value = excluded.value, size = excluded.size, '
+    'expires = excluded.expires, accessed = excluded.accessed'
+)
+LIVE = '(expires IS NULL OR expires > ?)'
+
+# SQLite ограничивает число параметров запроса (999 в старых сборках).
+CHUNK_SIZE = 500
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class SQLiteCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = location
+        options = params.get('OPTIONS', {})
+        self.max_size = options.get('MAX_SIZE')
+        self.access_resolution = options.get('ACCESS_RESOLUTION', 1)
+        self.busy_timeout = options.get('BUSY_TIMEOUT', 5000)
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        """Подключение потока; после fork открывается заново."""
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # isolation_level=None: транзакции открываются явно.
+            connection = sqlite3.connect(
+                self.path, timeout=self.busy_timeout / 1000,
+                isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode = wal')
+            connection.execute('PRAGMA synchronous = normal')
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+            self._local.pid = pid
+            self._local.atomic = False
+        return self._local.connection
+
+    @contextmanager
+    def atomic(self):
+        """Транзакция BEGIN IMMEDIATE: блокировка записи берется сразу, и
+        чтение-изменение-запись не пересекается с другими процессами.
+        Записи внутри блока (и вложенные atomic) входят в ту же
+        транзакцию."""
+        connection = self.connection
+        if self._local.atomic:
+            yield connection
+            return
+        connection.execute('BEGIN IMMEDIATE')
+        self._local.atomic = True
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        else:
+            connection.execute('COMMIT')
+        finally:
+            self._local.atomic = False
+
+    def _write(self, func, *args):
+        """Выполняет func(connection, ...) в транзакции atomic()."""
+        with self.atomic() as connection:
+            return func(connection, *args)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _pickle(self, value):
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def _touch_accessed(self, connection, keys, now):
+        """Отмечает чтение для LRU без ожидания блокировки записи:
+        если база занята, отметка пропускается."""
+        threshold = now - self.access_resolution
+        connection.execute('PRAGMA busy_timeout = 0')
+        try:
+            for chunk in _chunks(keys):
+                marks = ', '.join('?' * len(chunk))
+                connection.execute(
+                    f'UPDATE cache_entry SET accessed = ? '
+                    f'WHERE key IN ({marks}) AND accessed < ?',
+                    (now, *chunk, threshold))
+        except sqlite3.OperationalError:
+            pass
+        finally:
+            connection.execute(f'PRAGMA busy_timeout = {self.busy_timeout}')
+
+    def _fetch(self, keys):
+        now = time.time()
+        connection = self.connection
+        found, stale = {}, []
+        for chunk in _chunks(keys):
+            marks = ', '.join('?' * len(chunk))
+            rows = connection.execute(
+                f'SELECT key, value, accessed FROM cache_entry '
+                f'WHERE key IN ({marks}) AND {LIVE}', (*chunk, now))
+            for key, value, accessed in rows:
+                found[key] = value
+                if now - accessed > self.access_resolution:
+                    stale.append(key)
+        if stale:
+            self._touch_accessed(connection, stale, now)
+        return found
+
+    def _store(self, connection, items, timeout):
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        connection.executemany(UPSERT, [
+            (key, pickled, len(pickled), expires, now)
+            for key, pickled in items
+        ])
+        self._cull(connection, now)
+
+    def _cull(self, connection, now):
+        entries, size = connection.execute(
+            'SELECT entries, bytes FROM cache_usage').fetchone()
+        if not self._over_limit(entries, size):
+            return
+        connection.execute(
+            'DELETE FROM cache_entry WHERE expires <= ?', (now,))
+        while True:
+            entries, size = connection.execute(
+                'SELECT entries, bytes FROM cache_usage').fetchone()
+            if not entries or not self._over_limit(entries, size):
+                return
+            if self._cull_frequency == 0:
+                connection.execute('DELETE FROM cache_entry')
+                return
+            connection.execute(
+                'DELETE FROM cache_entry WHERE key IN ('
+                'SELECT key FROM cache_entry ORDER BY accessed LIMIT ?)',
+                (max(entries // self._cull_frequency, 1),))
+
+    def _over_limit(self, entries, size):
+        if entries > self._max_entries:
+            return True
+        return self.max_size is not None and size > self.max_size
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        pickled = self._pickle(value)
+
+        def add(connection):
+            exists = connection.execute(
+                f'SELECT 1 FROM cache_entry WHERE key = ? AND {LIVE}',
+                (key, time.time())).fetchone()
+            if exists:
+                return False
+            self._store(connection, [(key, pickled)], timeout)
+            return True
+        return self._write(add)
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        found = self._fetch([key])
+        if key not in found:
+            return default
+        return pickle.loads(found[key])
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        found = self._fetch(list(keys))
+        return {
+            keys[key]: pickle.loads(pickled) for key, pickled in found.items()
+        }
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        self._write(self._store, [(key, self._pickle(value))], timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        items = [
+            (self._key(key, version), self._pickle(value))
+            for key, value in data.items()
+        ]
+        if items:
+            self._write(self._store, items, timeout)
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        cursor = self.connection.execute(
+            f'UPDATE cache_entry SET expires = ? WHERE key = ? AND {LIVE}',
+            (self.get_backend_timeout(timeout), key, time.time()))
+        return cursor.rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return bool(self.connection.execute(
+            f'SELECT 1 FROM cache_entry WHERE key = ? AND {LIVE}',
+            (key, time.time())).fetchone())
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+
+        def incr(connection):
+            row = connection.execute(
+                f'SELECT value FROM cache_entry WHERE key = ? AND {LIVE}',
+                (key, time.time())).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            pickled = self._pickle(value)
+            connection.execute(
+                'UPDATE cache_entry SET value = ?, size = ?, accessed = ? '
+                'WHERE key = ?', (pickled, len(pickled), time.time(), key))
+            return value
+        return self._write(incr)
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        self.connection.execute(
+            'DELETE FROM cache_entry WHERE key = ?', (key,))
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+
+        def delete_many(connection):
+            for chunk in _chunks(keys):
+                marks = ', '.join('?' * len(chunk))
+                connection.execute(
+                    f'DELETE FROM cache_entry WHERE key IN ({marks})', chunk)
+        if keys:
+            self._write(delete_many)
+
+    def delete_prefixed(self, prefixes, version=None):
+        """Удаляет записи, ключи которых начинаются с одного из префиксов."""
+        prefixes = [self.make_key(prefix, version) for prefix in prefixes]
+
+        def delete_prefixed(connection):
+            for prefix in prefixes:
+                connection.execute(
+                    'DELETE FROM cache_entry WHERE substr(key, 1, ?) = ?',
+                    (len(prefix), prefix))
+            self.append_log(None)
+        if prefixes:
+            self._write(delete_prefixed)
+
+    def clear(self):
+        def clear(connection):
+            connection.execute('DELETE FROM cache_entry')
+            self.append_log(None)
+        self._write(clear)
+
+    def append_log(self, keys, timeout=DEFAULT_TIMEOUT):
+        """Добавляет в журнал список измененных ключей (None - все ключи)
+        и возвращает номер записи. Внутри atomic() запись журнала
+        попадает в транзакцию вместе с изменением."""
+        pickled = None if keys is None else self._pickle(list(keys))
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+
+        def append(connection):
+            connection.execute(
+                'DELETE FROM cache_log WHERE expires <= ?', (now,))
+            return connection.execute(
+                'INSERT INTO cache_log (keys, expires) VALUES (?, ?)',
+                (pickled, float('inf') if expires is None else expires),
+            ).lastrowid
+        return self._write(append)
+
+    def log_sequence(self):
+        """Номер последней записи журнала, 0 - записей еще не было."""
+        row = self.connection.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'cache_log'"
+        ).fetchone()
+        return row[0] if row else 0
+
+    def read_log(self, after, until):
+        """Неистекшие записи журнала с номерами после after и до until
+        включительно: {номер: список ключей или None}."""
+        rows = self.connection.execute(
+            'SELECT number, keys FROM cache_log '
+            'WHERE number > ? AND number <= ? AND expires > ?',
+            (after, until, time.time()))
+        return {
+            number: None if keys is None else pickle.loads(keys)
+            for number, keys in rows
+        }
+
+    def usage(self):
+        """Число записей и суммарный размер значений в байтах."""
+        entries, size = self.connection.execute(
+            'SELECT entries, bytes FROM cache_usage').fetchone()
+        return {'entries': entries, 'bytes': size}
@@ -0,0 +1,103 @@
+"""Пересчет кешированных значений без «лавины» запросов.
+
+Когда у популярного ключа истекает срок, все одновременные запросы видят
+промах и пересчитывают значение разом. get_or_compute хранит значение
+дольше его срока (еще CACHE_STALE_SECONDS) вместе со временем расчета и:
+
+- пересчитывает чуть раньше срока с вероятностью, растущей к его концу
+  и пропорциональной времени расчета (XFetch, CACHE_RECOMPUTE_BETA);
+- пускает на пересчет один запрос: блокировка - cache.add на ключ
+  <key>:lock, общий для всех процессов при общем кеше;
+- остальным, пока идет пересчет, отдает устаревшее значение, а при
+  холодном кеше ждет результат до CACHE_LOCK_TIMEOUT секунд.
+
+Во view:
+
+    posts = get_or_compute('index:top', lambda: list(top_posts()), 20)
+
+В шаблоне - тег {% swr_cache %} из core.templatetags.swr_cache.
+"""
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+
+from core import metrics
+
+
+POLL_INTERVAL = 0.05
+
+
+def _event(name):
+    metrics.CACHE_STAMPEDE_EVENTS.inc(event=name)
+
+
+def lock_key(key):
+    return f'{key}:lock'
+
+
+def should_recompute(expires, delta, now, beta=None):
+    """Решение XFetch: пересчитать раньше срока expires, если
+    now - delta * beta * ln(rand) достигает его."""
+    if beta is None:
+        beta = settings.CACHE_RECOMPUTE_BETA
+    if now >= expires:
+        return True
+    if not beta or not delta:
+        return False
+    return now - delta * beta * math.log(1 - random.random()) >= expires
+
+
+def _compute_and_store(cache, key, compute, timeout):
+    started = time.monotonic()
+    value = compute()
+    delta = time.monotonic() - started
+    cache.set(
+        key, (value, time.time() + timeout, delta),
+        timeout + settings.CACHE_STALE_SECONDS)
+    return value
+
+
+def get_or_compute(key, compute, timeout, cache=None):
+    """Значение из кеша или результат compute(), сохраненный на timeout
+    секунд; пересчитывает не более одного запроса одновременно."""
+    cache = cache or default_cache
+    entry = cache.get(key)
+    if entry is not None:
+        value, expires, delta = entry
+        now = time.time()
+        if not should_recompute(expires, delta, now):
+            return value
+        if not cache.add(lock_key(key), True, settings.CACHE_LOCK_TIMEOUT):
+            _event('stale_served')
+            return value
+        _event('early' if now < expires else 'expired')
+    else:
+        if not cache.add(lock_key(key), True, settings.CACHE_LOCK_TIMEOUT):
+            entry = _wait_for(cache, key)
+            if entry is not None:
+                _event('waited')
+                return entry[0]
+            # Пересчет не успел: считаем сами, не дожидаясь дольше.
+            _event('wait_timeout')
+            return compute()
+        _event('cold')
+    try:
+        return _compute_and_store(cache, key, compute, timeout)
+    finally:
+        cache.delete(lock_key(key))
+
+
+def _wait_for(cache, key):
+    deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+        if not cache.has_key(lock_key(key)):
+            # Пересчитавший мог сохранить значение после нашего get.
+            return cache.get(key)
+    return None
@@ -0,0 +1,316 @@
+"""Двухуровневый кеш: память процесса (L1) перед общим кешем (L2).
+
+Горячие ключи вроде фрагмента index_page читаются на каждый запрос, и
+даже общий кеш в файле стоит обращения к SQLite. TieredCache держит
+небольшой LRU в памяти процесса, а промахи читает из кеша-алиаса,
+указанного в LOCATION (core.cache.sqlite.SQLiteCache).
+
+Записи расходятся по процессам через журнал инвалидаций L2: каждая
+запись кладет в журнал список изменившихся ключей в той же транзакции,
+что и само значение. Процесс не чаще CHECK_INTERVAL секунд сверяет номер
+последней записи журнала и выбрасывает из L1 ключи, измененные другими.
+Если журнал отстал больше чем на LOG_LENGTH записей, его записи истекли
+или в нем запись clear() и delete_prefixed(), L1 очищается целиком. Срок
+записи в L1 ограничен L1_TIMEOUT (для отдельных префиксов ключей -
+L1_TIMEOUTS, 0 отключает L1), поэтому даже запись мимо журнала, напрямую в
+L2, видна не позже этого срока.
+
+OPTIONS: L1_MAX_ENTRIES, L1_TIMEOUT, L1_TIMEOUTS, CHECK_INTERVAL,
+LOG_LENGTH, LOG_TIMEOUT.
+"""
+import os
+import pickle
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from core import metrics
+from core.instrumentation import uninstrumented
+
+
+_missing = object()
+
+
+class LocalTier:
+    """L1 одного процесса, общий для его потоков."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+        # Номер последней учтенной записи журнала; None - еще не сверялся.
+        self.sequence = None
+        self.checked = float('-inf')
+        # Свои номера в журнале: свои записи из L1 выбрасывать не нужно.
+        self.own = set()
+        self.reads = Counter()
+
+    def get(self, key, now):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            pickled, expires = entry
+            if expires <= now:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return pickled
+
+    def put(self, key, pickled, expires):
+        with self.lock:
+            self.entries[key] = (pickled, expires)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def discard(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.own.clear()
+
+
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+def get_tier(location, max_entries):
+    """L1 текущего процесса; после fork создается пустой."""
+    key = (os.getpid(), location)
+    if key not in _tiers:
+        with _tiers_lock:
+            if key not in _tiers:
+                _tiers[key] = LocalTier(max_entries)
+    return _tiers[key]
+
+
+class TieredCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.location = location
+        options = params.get('OPTIONS', {})
+        self.l1_max_entries = options.get('L1_MAX_ENTRIES', 500)
+        self.l1_timeout = options.get('L1_TIMEOUT', 5)
+        self.l1_timeouts = options.get('L1_TIMEOUTS', {})
+        self.check_interval = options.get('CHECK_INTERVAL', 0.5)
+        self.log_length = options.get('LOG_LENGTH', 1000)
+        self.log_timeout = options.get('LOG_TIMEOUT', 300)
+
+    @property
+    def l2(self):
+        return caches[self.location]
+
+    @property
+    def tier(self):
+        return get_tier(self.location, self.l1_max_entries)
+
+    def stats(self):
+        """Чтения процесса по уровням и доли попаданий."""
+        reads = dict(self.tier.reads)
+        total = sum(reads.values())
+        reached_l2 = total - reads.get('l1', 0)
+        return {
+            **reads,
+            'l1_ratio': reads.get('l1', 0) / total if total else None,
+            'l2_ratio': (
+                reads.get('l2', 0) / reached_l2 if reached_l2 else None),
+        }
+
+    def _count(self, tier, result, amount=1):
+        tier.reads[result] += amount
+        metrics.CACHE_TIER_REQUESTS.inc(
+            amount, cache=self.location, tier=result)
+
+    def _local_timeout(self, key):
+        for prefix, timeout in self.l1_timeouts.items():
+            if key.startswith(prefix):
+                return timeout
+        return self.l1_timeout
+
+    def _remember(self, tier, key, full_key, value, timeout, now):
+        """Кладет значение в L1 не дольше срока L1 и срока самой записи;
+        timeout=None - срок записи неизвестен (прочитана из L2)."""
+        local_timeout = self._local_timeout(key)
+        if not local_timeout:
+            return
+        expires = now + local_timeout
+        if timeout is not None:
+            backend_expires = self.l2.get_backend_timeout(timeout)
+            if backend_expires is not None:
+                expires = min(expires, backend_expires)
+        tier.put(full_key, pickle.dumps(value, self.pickle_protocol), expires)
+
+    def _full_key(self, key, version):
+        full_key = self.make_key(key, version=version)
+        self.validate_key(full_key)
+        return full_key
+
+    def sync(self, tier, now):
+        """Выбрасывает из L1 ключи, измененные другими процессами."""
+        if now - tier.checked < self.check_interval:
+            return
+        if not tier.sync_lock.acquire(blocking=False):
+            return
+        try:
+            with uninstrumented():
+                self._sync(tier)
+            tier.checked = now
+        finally:
+            tier.sync_lock.release()
+
+    def _sync(self, tier):
+        l2 = self.l2
+        sequence = l2.log_sequence()
+        if tier.sequence is None or sequence < tier.sequence:
+            # Первая сверка или файл L2 создан заново.
+            tier.clear()
+        elif sequence - tier.sequence > self.log_length:
+            tier.clear()
+        elif sequence > tier.sequence:
+            log = l2.read_log(tier.sequence, sequence)
+            for number in range(tier.sequence + 1, sequence + 1):
+                if number in tier.own:
+                    tier.own.discard(number)
+                    continue
+                keys = log.get(number)
+                if keys is None:
+                    # Запись журнала истекла или это clear().
+                    tier.clear()
+                    break
+                tier.discard(keys)
+        tier.sequence = sequence
+
+    def publish(self, full_keys):
+        """Сообщает другим процессам об изменении ключей; вызывается
+        внутри l2.atomic() вместе с самой записью."""
+        with uninstrumented():
+            number = self.l2.append_log(full_keys, self.log_timeout)
+        self.tier.own.add(number)
+
+    def get(self, key, default=None, version=None):
+        full_key = self._full_key(key, version)
+        tier, now = self.tier, time.time()
+        self.sync(tier, now)
+        pickled = tier.get(full_key, now)
+        if pickled is not None:
+            self._count(tier, 'l1')
+            return pickle.loads(pickled)
+        with uninstrumented():
+            value = self.l2.get(key, _missing, version)
+        if value is _missing:
+            self._count(tier, 'miss')
+            return default
+        self._count(tier, 'l2')
+        self._remember(tier, key, full_key, value, None, now)
+        return value
+
+    def get_many(self, keys, version=None):
+        tier, now = self.tier, time.time()
+        self.sync(tier, now)
+        found, missing = {}, {}
+        for key in keys:
+            full_key = self._full_key(key, version)
+            pickled = tier.get(full_key, now)
+            if pickled is None:
+                missing[key] = full_key
+            else:
+                found[key] = pickle.loads(pickled)
+        if found:
+            self._count(tier, 'l1', len(found))
+        if not missing:
+            return found
+        with uninstrumented():
+            fetched = self.l2.get_many(list(missing), version)
+        for key, value in fetched.items():
+            self._remember(tier, key, missing[key], value, None, now)
+        if fetched:
+            self._count(tier, 'l2', len(fetched))
+        if len(missing) > len(fetched):
+            self._count(tier, 'miss', len(missing) - len(fetched))
+        found.update(fetched)
+        return found
+
+    def has_key(self, key, version=None):
+        full_key = self._full_key(key, version)
+        tier, now = self.tier, time.time()
+        self.sync(tier, now)
+        if tier.get(full_key, now) is not None:
+            return True
+        return self.l2.has_key(key, version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        full_key = self._full_key(key, version)
+        with self.l2.atomic():
+            self.l2.set(key, value, timeout, version)
+            self.publish([full_key])
+        self._remember(self.tier, key, full_key, value, timeout, time.time())
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        full_key = self._full_key(key, version)
+        with self.l2.atomic():
+            if not self.l2.add(key, value, timeout, version):
+                return False
+            self.publish([full_key])
+        self._remember(self.tier, key, full_key, value, timeout, time.time())
+        return True
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        full_keys = {key: self._full_key(key, version) for key in data}
+        with self.l2.atomic():
+            failed = self.l2.set_many(data, timeout, version)
+            self.publish(full_keys.values())
+        tier, now = self.tier, time.time()
+        for key, value in data.items():
+            if key not in failed:
+                self._remember(tier, key, full_keys[key], value, timeout, now)
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        # Срок в L1 короче срока записи, новый срок подхватится с L2.
+        self.tier.discard([self._full_key(key, version)])
+        return self.l2.touch(key, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        full_key = self._full_key(key, version)
+        with self.l2.atomic():
+            value = self.l2.incr(key, delta, version)
+            self.publish([full_key])
+        self.tier.discard([full_key])
+        return value
+
+    def delete(self, key, version=None):
+        full_key = self._full_key(key, version)
+        with self.l2.atomic():
+            self.l2.delete(key, version)
+            self.publish([full_key])
+        self.tier.discard([full_key])
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        full_keys = [self._full_key(key, version) for key in keys]
+        with self.l2.atomic():
+            self.l2.delete_many(keys, version)
+            self.publish(full_keys)
+        self.tier.discard(full_keys)
+
+    def delete_prefixed(self, prefixes, version=None):
+        """Удаляет из L2 ключи с префиксами; L1 всех процессов
+        очищается целиком."""
+        self.l2.delete_prefixed(prefixes, version)
+        self.tier.clear()
+
+    def clear(self):
+        """Очищает L2 и L1 всех процессов."""
+        self.l2.clear()
+        self.tier.clear()
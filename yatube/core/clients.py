@@ -0,0 +1,100 @@
+"""Сессии виртуального пользователя для нагрузочного теста и прогрева.
+
+Модуль импортирует только стандартную библиотеку: yatube/wsgi.py берет
+отсюда WSGISession для прогрева при старте воркера, и тестовые модули
+Django и замеры из core.benchmarks в воркер попадать не должны.
+"""
+import sys
+from http.cookies import SimpleCookie
+from io import BytesIO
+from urllib.parse import urlencode, urlsplit
+
+
+class WSGISession:
+    """Сессия виртуального пользователя поверх WSGI-приложения в процессе.
+
+    Запрос собирается в environ и передается прямо в application, поэтому
+    замеряется весь стек Django, но без сети и без отдельного сервера.
+    """
+
+    def __init__(self, application):
+        self.application = application
+        self.cookies = {}
+        # Путь из Location последнего ответа или None.
+        self.location = None
+
+    def environ(self, method, path, body=b'', content_type=None):
+        path, _, query = path.partition('?')
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SCRIPT_NAME': '',
+            'SERVER_NAME': 'testserver',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REMOTE_ADDR': '127.0.0.1',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        if content_type:
+            environ['CONTENT_TYPE'] = content_type
+        if self.cookies:
+            environ['HTTP_COOKIE'] = '; '.join(
+                f'{name}={value}' for name, value in self.cookies.items())
+        return environ
+
+    def request(self, method, path, data=None):
+        body, content_type = b'', None
+        if data is not None:
+            body = urlencode(data).encode()
+            content_type = 'application/x-www-form-urlencoded'
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split()[0])
+            response['headers'] = headers
+
+        result = self.application(
+            self.environ(method, path, body, content_type), start_response)
+        try:
+            b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        self.location = None
+        for name, value in response['headers']:
+            if name.lower() == 'location':
+                self.location = urlsplit(value).path
+            if name.lower() == 'set-cookie':
+                for morsel in SimpleCookie(value).values():
+                    self.cookies[morsel.key] = morsel.value
+        return response['status']
+
+
+class HTTPSession:
+    """Та же сессия, но против запущенного сервера через requests."""
+
+    def __init__(self, base_url):
+        import requests
+
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        self.location = None
+
+    @property
+    def cookies(self):
+        return self.session.cookies
+
+    def request(self, method, path, data=None):
+        response = self.session.request(
+            method, self.base_url + path, data=data, allow_redirects=False)
+        location = response.headers.get('Location')
+        self.location = urlsplit(location).path if location else None
+        return response.status_code
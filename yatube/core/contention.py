@@ -0,0 +1,250 @@
+"""Замеры пропускной способности SQLite при конкурентной нагрузке.
+
+ContentionBenchmark запускает одинаковые чтения и записи на двух копиях
+базы: с настройками по умолчанию (журнал DELETE) и с SQLITE_PRAGMAS.
+WriteBenchmark сравнивает запись комментариев через ORM из многих
+потоков напрямую и через очередь core.writer.
+"""
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.db import OperationalError, connections, transaction
+
+from .benchmarks import percentile
+from .sqlite import apply_pragmas, copy_database
+from .writer import WriteQueue
+
+
+BASELINE_PRAGMAS = {'journal_mode': 'delete'}
+
+# Чтение как на странице поста: комментарии с авторами.
+READ_SQL = (
+    'SELECT c.id, c.text, c.created, u.username FROM posts_comment c '
+    'INNER JOIN auth_user u ON u.id = c.author_id '
+    'WHERE c.post_id = ? ORDER BY c.id'
+)
+WRITE_SQL = (
+    'INSERT INTO posts_comment (created, post_id, author_id, text) '
+    "VALUES (datetime('now'), ?, ?, ?)"
+)
+
+
+class ContentionBenchmark:
+    """Читатели загружают комментарии к постам, писатели добавляют новые.
+
+    Каждый поток открывает свое подключение с одинаковыми параметрами,
+    отличаются только PRAGMA, поэтому разница в пропускной способности
+    показывает вклад настроек.
+    """
+
+    def __init__(self, path, pragmas, readers, writers, duration,
+                 timeout=5.0):
+        self.path = path
+        self.pragmas = pragmas
+        self.readers = readers
+        self.writers = writers
+        self.duration = duration
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.latencies = {'read': [], 'write': []}
+        self.errors = {'read': 0, 'write': 0}
+
+    def connect(self):
+        connection = sqlite3.connect(
+            self.path, timeout=self.timeout, isolation_level=None)
+        apply_pragmas(connection, {
+            name: value for name, value in self.pragmas.items()
+            if name != 'journal_mode'
+        })
+        return connection
+
+    def worker(self, kind, seed, deadline, bounds):
+        rng = random.Random(seed)
+        connection = self.connect()
+        posts, users = bounds
+        try:
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    if kind == 'read':
+                        connection.execute(
+                            READ_SQL, (rng.choice(posts),)).fetchall()
+                    else:
+                        connection.execute('BEGIN')
+                        connection.execute(WRITE_SQL, (
+                            rng.choice(posts), rng.choice(users),
+                            'Комментарий замера конкуренции'))
+                        connection.execute('COMMIT')
+                except sqlite3.OperationalError:
+                    if connection.in_transaction:
+                        connection.execute('ROLLBACK')
+                    with self.lock:
+                        self.errors[kind] += 1
+                    continue
+                elapsed = time.perf_counter() - started
+                with self.lock:
+                    self.latencies[kind].append(elapsed * 1000)
+        finally:
+            connection.close()
+
+    def bounds(self):
+        connection = sqlite3.connect(self.path)
+        try:
+            posts = [row[0] for row in connection.execute(
+                'SELECT id FROM posts_post ORDER BY id LIMIT 1000')]
+            users = [row[0] for row in connection.execute(
+                'SELECT id FROM auth_user ORDER BY id LIMIT 1000')]
+        finally:
+            connection.close()
+        return posts, users
+
+    def run(self):
+        bounds = self.bounds()
+        if not bounds[0] or not bounds[1]:
+            raise ValueError('Для замера нужны посты и пользователи')
+        deadline = time.monotonic() + self.duration
+        threads = [
+            threading.Thread(
+                target=self.worker, args=(kind, number, deadline, bounds))
+            for number, kind in enumerate(
+                ['read'] * self.readers + ['write'] * self.writers)
+        ]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+        return {
+            kind: {
+                'ops': len(values),
+                'ops_per_s': round(len(values) / elapsed, 1),
+                'p95_ms': round(percentile(values, 95), 2),
+                'locked': self.errors[kind],
+            }
+            for kind, values in self.latencies.items()
+        }
+
+
+def compare_settings(source, directory, pragmas, readers, writers, duration):
+    """Замер на двух копиях базы: исходные настройки и pragmas."""
+    results = {}
+    for name, variant in (('default', BASELINE_PRAGMAS), ('tuned', pragmas)):
+        path = os.path.join(directory, f'{name}.sqlite3')
+        copy_database(source, path, variant)
+        results[name] = ContentionBenchmark(
+            path, variant, readers, writers, duration).run()
+    return results
+
+
+@contextmanager
+def database_copy(alias, path, copy_alias='contention'):
+    """Копия базы alias, доступная ORM под именем copy_alias."""
+    copy_database(connections[alias].settings_dict['NAME'], path)
+    connections.databases[copy_alias] = {
+        **connections.databases[alias], 'NAME': path}
+    try:
+        yield copy_alias
+    finally:
+        connections[copy_alias].close()
+        del connections[copy_alias]
+        del connections.databases[copy_alias]
+
+
+class WriteBenchmark:
+    """Потоки создают комментарии через ORM и ждут результата записи."""
+
+    def __init__(self, using, writers, duration, mode='direct',
+                 batch_size=50):
+        self.using = using
+        self.writers = writers
+        self.duration = duration
+        self.mode = mode
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.errors = 0
+
+    def create_comment(self, post_id, author_id):
+        from posts.models import Comment
+
+        return Comment.objects.using(self.using).create(
+            post_id=post_id, author_id=author_id,
+            text='Комментарий замера записи')
+
+    def write(self, write_queue, post_id, author_id):
+        if write_queue is not None:
+            return write_queue.submit(
+                self.create_comment, post_id, author_id).result()
+        with transaction.atomic(using=self.using):
+            return self.create_comment(post_id, author_id)
+
+    def worker(self, seed, deadline, bounds, write_queue):
+        rng = random.Random(seed)
+        posts, users = bounds
+        try:
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    self.write(
+                        write_queue, rng.choice(posts), rng.choice(users))
+                except OperationalError:
+                    with self.lock:
+                        self.errors += 1
+                    continue
+                elapsed = time.perf_counter() - started
+                with self.lock:
+                    self.latencies.append(elapsed * 1000)
+        finally:
+            connections[self.using].close()
+
+    def bounds(self):
+        from posts.models import Post, User
+
+        return (
+            list(Post.objects.using(self.using).order_by('id')
+                 .values_list('id', flat=True)[:1000]),
+            list(User.objects.using(self.using).order_by('id')
+                 .values_list('id', flat=True)[:1000]),
+        )
+
+    def run(self):
+        bounds = self.bounds()
+        if not bounds[0] or not bounds[1]:
+            raise ValueError('Для замера нужны посты и пользователи')
+        write_queue = None
+        if self.mode == 'queue':
+            write_queue = WriteQueue(self.using, self.batch_size)
+        deadline = time.monotonic() + self.duration
+        threads = [
+            threading.Thread(
+                target=self.worker,
+                args=(number, deadline, bounds, write_queue))
+            for number in range(self.writers)
+        ]
+        started = time.monotonic()
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            if write_queue is not None:
+                write_queue.close()
+        elapsed = time.monotonic() - started
+        result = {
+            'ops': len(self.latencies),
+            'ops_per_s': round(len(self.latencies) / elapsed, 1),
+            'p50_ms': round(percentile(self.latencies, 50), 2),
+            'p95_ms': round(percentile(self.latencies, 95), 2),
+            'p99_ms': round(percentile(self.latencies, 99), 2),
+            'locked': self.errors,
+        }
+        if write_queue is not None and write_queue.batches:
+            result['avg_batch'] = round(
+                len(self.latencies) / write_queue.batches, 1)
+        return result
@@ -0,0 +1,12 @@
+from django.db.backends.postgresql import base
+
+from core.db.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """PostgreSQL с пулом подключений, см. core.db.pool."""
+
+    def reset_raw_connection(self, connection):
+        if connection.closed:
+            raise base.Database.InterfaceError('Подключение уже закрыто')
+        connection.rollback()
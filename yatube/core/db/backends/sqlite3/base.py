@@ -0,0 +1,8 @@
+from django.db.backends.sqlite3 import base
+
+from core.db.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """SQLite с пулом подключений: для локальной проверки пула и
+    замеров без сервера баз данных."""
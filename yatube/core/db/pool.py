@@ -0,0 +1,283 @@
+"""Пул подключений для бэкендов core.db.backends.
+
+Django 2.2 открывает подключение на каждый запрос (CONN_MAX_AGE = 0) или
+держит по одному на поток. Пул переиспользует физические подключения
+между запросами и потоками процесса: close() в Django возвращает
+подключение в пул, а новое открывается только если свободных нет и
+размер пула меньше MAX_SIZE.
+
+Настройки задаются ключом POOL в записи DATABASES:
+
+    MIN_SIZE      - сколько простаивающих подключений не закрывать;
+    MAX_SIZE      - предел подключений процесса;
+    TIMEOUT       - сколько секунд ждать свободное подключение;
+    IDLE_TIMEOUT  - через сколько секунд простоя подключение закрывается;
+    MAX_LIFETIME  - предельный возраст подключения в секундах;
+    CHECK_AFTER   - после скольких секунд простоя проверять подключение
+                    запросом перед выдачей.
+"""
+import os
+import threading
+import time
+from collections import Counter, deque
+
+from django.db import OperationalError
+
+from core import metrics
+
+
+DEFAULTS = {
+    'MIN_SIZE': 0,
+    'MAX_SIZE': 10,
+    'TIMEOUT': 10,
+    'IDLE_TIMEOUT': 300,
+    'MAX_LIFETIME': 3600,
+    'CHECK_AFTER': 30,
+}
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+def _close_quietly(connection):
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+class ConnectionPool:
+    def __init__(self, connect, check=None, name='default', min_size=0,
+                 max_size=10, timeout=10, idle_timeout=300,
+                 max_lifetime=3600, check_after=30):
+        self.connect = connect
+        self.check = check
+        self.name = name
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.check_after = check_after
+        self.condition = threading.Condition()
+        # Свободные подключения: (подключение, создано, возвращено).
+        # Выдаются с конца - самые «теплые», закрываются с начала.
+        self.idle = deque()
+        self.in_use = {}
+        self.opening = 0
+        self.events = Counter()
+        self.connect_seconds = 0.0
+
+    @property
+    def size(self):
+        return len(self.idle) + len(self.in_use) + self.opening
+
+    def event(self, name, amount=1):
+        self.events[name] += amount
+        metrics.DB_POOL_EVENTS.inc(amount, alias=self.name, event=name)
+
+    def expired(self, created, now):
+        return bool(self.max_lifetime) and now - created > self.max_lifetime
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            entry = self.take(deadline)
+            if entry is None:
+                return self.open()
+            connection, created, released = entry
+            stale = time.monotonic() - released > self.check_after
+            if stale and self.check and not self.is_healthy(connection):
+                self.event('health_check_failed')
+                self.discard(connection)
+                continue
+            with self.condition:
+                self.in_use[id(connection)] = created
+                self.opening -= 1
+                self.report()
+            self.event('reused')
+            return connection
+
+    def take(self, deadline):
+        """Свободное подключение или None, если можно открыть новое.
+
+        В обоих случаях место в пуле резервируется через opening.
+        """
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                while self.idle:
+                    connection, created, released = self.idle.pop()
+                    if self.expired(created, now):
+                        self.event('expired')
+                        _close_quietly(connection)
+                        continue
+                    self.opening += 1
+                    return connection, created, released
+                if self.size < self.max_size:
+                    self.opening += 1
+                    return None
+                remaining = deadline - now
+                if remaining <= 0:
+                    self.event('timeout')
+                    raise PoolTimeout(
+                        f'Нет свободных подключений к «{self.name}» за '
+                        f'{self.timeout} с (MAX_SIZE={self.max_size})')
+                self.event('wait')
+                self.condition.wait(remaining)
+
+    def open(self):
+        started = time.perf_counter()
+        try:
+            connection = self.connect()
+        except Exception:
+            with self.condition:
+                self.opening -= 1
+                self.condition.notify()
+            raise
+        elapsed = time.perf_counter() - started
+        with self.condition:
+            self.opening -= 1
+            self.in_use[id(connection)] = time.monotonic()
+            self.connect_seconds += elapsed
+            self.report()
+        self.event('created')
+        return connection
+
+    def is_healthy(self, connection):
+        try:
+            self.check(connection)
+        except Exception:
+            return False
+        return True
+
+    def release(self, connection, broken=False):
+        """Возвращает подключение; сломанное или старое закрывается."""
+        now = time.monotonic()
+        with self.condition:
+            created = self.in_use.pop(id(connection), None)
+            reuse = (
+                not broken and created is not None
+                and not self.expired(created, now)
+            )
+            if reuse:
+                self.idle.append((connection, created, now))
+            self.prune(now)
+            self.condition.notify()
+            self.report()
+        if not reuse:
+            self.event('broken' if broken else 'closed')
+            _close_quietly(connection)
+
+    def discard(self, connection):
+        with self.condition:
+            self.in_use.pop(id(connection), None)
+            self.opening = max(self.opening - 1, 0)
+            self.condition.notify()
+            self.report()
+        _close_quietly(connection)
+
+    def prune(self, now):
+        """Закрывает простаивающие дольше IDLE_TIMEOUT сверх MIN_SIZE."""
+        while (self.idle and len(self.idle) > self.min_size
+               and now - self.idle[0][2] > self.idle_timeout):
+            connection, *_ = self.idle.popleft()
+            self.event('idle_closed')
+            _close_quietly(connection)
+
+    def close_all(self):
+        with self.condition:
+            idle, self.idle = list(self.idle), deque()
+            self.report()
+        for connection, *_ in idle:
+            _close_quietly(connection)
+
+    def report(self):
+        metrics.DB_POOL_CONNECTIONS.set(
+            len(self.idle), alias=self.name, state='idle')
+        metrics.DB_POOL_CONNECTIONS.set(
+            len(self.in_use), alias=self.name, state='in_use')
+
+    def stats(self):
+        with self.condition:
+            return {
+                'size': self.size,
+                'idle': len(self.idle),
+                'in_use': len(self.in_use),
+                'max_size': self.max_size,
+                'connect_ms': round(self.connect_seconds * 1000, 3),
+                **self.events,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, options, connect, check=None):
+    """Пул алиаса в текущем процессе; после fork создается новый, чтобы
+    не делить сокеты родителя."""
+    key = (os.getpid(), alias)
+    if key not in _pools:
+        with _pools_lock:
+            if key not in _pools:
+                config = {**DEFAULTS, **(options or {})}
+                _pools[key] = ConnectionPool(
+                    connect, check, alias,
+                    min_size=config['MIN_SIZE'],
+                    max_size=config['MAX_SIZE'],
+                    timeout=config['TIMEOUT'],
+                    idle_timeout=config['IDLE_TIMEOUT'],
+                    max_lifetime=config['MAX_LIFETIME'],
+                    check_after=config['CHECK_AFTER'],
+                )
+    return _pools[key]
+
+
+def close_pools():
+    for key, pool in list(_pools.items()):
+        if key[0] == os.getpid():
+            pool.close_all()
+
+
+class PooledDatabaseWrapperMixin:
+    """Примесь к DatabaseWrapper бэкенда Django.
+
+    Подключение берется из пула, а close() возвращает его туда после
+    отката незавершенной транзакции. Бэкенд определяет
+    check_raw_connection и reset_raw_connection.
+    """
+
+    @property
+    def pool(self):
+        return _pools.get((os.getpid(), self.alias))
+
+    def get_new_connection(self, conn_params):
+        base = super()
+        return get_pool(
+            self.alias,
+            self.settings_dict.get('POOL'),
+            lambda: base.get_new_connection(conn_params),
+            self.check_raw_connection,
+        ).acquire()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        try:
+            self.reset_raw_connection(self.connection)
+        except Exception:
+            self.pool.release(self.connection, broken=True)
+        else:
+            self.pool.release(self.connection)
+
+    def check_raw_connection(self, connection):
+        cursor = connection.cursor()
+        try:
+            cursor.execute('SELECT 1')
+        finally:
+            cursor.close()
+
+    def reset_raw_connection(self, connection):
+        connection.rollback()
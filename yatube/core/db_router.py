@@ -0,0 +1,78 @@
+"""Чтение с реплик для страниц-лент и постов, запись - только в основную.
+
+Реплики перечислены в settings.DATABASE_REPLICAS. Чтения уходят на них
+лишь внутри запросов к view с атрибутом replica_reads = True. Если в
+запросе была запись, ReplicaRouterMiddleware ставит cookie, и следующие
+REPLICA_PIN_SECONDS секунд запросы этого клиента читают основную базу:
+пользователь сразу видит свой пост, комментарий или подписку, даже если
+реплика еще не догнала основную базу.
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+_state = threading.local()
+
+
+class RoutingScope:
+    """Состояние маршрутизации одного запроса."""
+
+    def __init__(self, pinned=False):
+        self.replicas = False
+        self.pinned = pinned
+        self.wrote = False
+
+    @property
+    def use_replicas(self):
+        return self.replicas and not self.pinned and not self.wrote
+
+
+@contextmanager
+def routing_scope(pinned=False):
+    previous = current_scope()
+    _state.scope = scope = RoutingScope(pinned)
+    try:
+        yield scope
+    finally:
+        _state.scope = previous
+
+
+def current_scope():
+    return getattr(_state, 'scope', None)
+
+
+def mark_write():
+    """Отмечает запись в текущем запросе, даже если ее выполнил другой
+    поток (например, очередь core.writer)."""
+    scope = current_scope()
+    if scope is not None:
+        scope.wrote = True
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        scope = current_scope()
+        if settings.DATABASE_REPLICAS and scope and scope.use_replicas:
+            return random.choice(settings.DATABASE_REPLICAS)
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Явно: иначе объект, прочитанный с реплики, сохранился бы туда же.
+        mark_write()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики получают схему вместе с данными при синхронизации.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,161 @@
+"""Планы выполнения для всех различных форм SQL-запросов.
+
+Формы собираются обходом адресов (как в bench_views) или из файла,
+который пишет ExplainCaptureMiddleware. Для каждой формы выполняется
+EXPLAIN QUERY PLAN с параметрами первого встреченного запроса, а в
+плане ищутся полные сканирования, сортировки во временном B-дереве и
+поиск по индексу, которому не хватает колонок до покрывающего.
+"""
+import json
+import re
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client
+
+from .benchmarks import build_cases, fetch, private_cache
+from .instrumentation import capture
+from .querycheck import fingerprint
+
+
+Flag = namedtuple('Flag', 'kind severity detail')
+
+WARNING = 'warning'
+NOTE = 'note'
+
+# Правила для строк плана SQLite и текстового EXPLAIN PostgreSQL.
+# Поиск по уникальному индексу (sqlite_autoindex_*) находит одну строку,
+# лишнее чтение таблицы после него не стоит отдельной заметки.
+SQLITE_RULES = (
+    (re.compile(r'^SCAN (?:TABLE )?\w+(?: AS \w+)?$'), 'full_scan', WARNING),
+    (re.compile(r'USE TEMP B-TREE'), 'temp_btree', WARNING),
+    (re.compile(r'AUTOMATIC (?:COVERING |PARTIAL )*INDEX'),
+     'automatic_index', WARNING),
+    (re.compile(r'^SEARCH .* USING INDEX (?!sqlite_autoindex_)'),
+     'not_covering', NOTE),
+)
+POSTGRES_RULES = (
+    (re.compile(r'Seq Scan on'), 'full_scan', WARNING),
+    (re.compile(r'\bSort\b(?! Key)'), 'temp_btree', WARNING),
+    (re.compile(r'(?<!Only )Index Scan'), 'not_covering', NOTE),
+)
+
+
+class ShapeCollector:
+    """Различные формы SELECT-запросов с примером SQL и параметров."""
+
+    def __init__(self):
+        self.shapes = {}
+
+    def add(self, alias, sql, params, view):
+        if not sql.lstrip().upper().startswith('SELECT'):
+            return
+        shape = fingerprint(sql)
+        entry = self.shapes.setdefault(shape, {
+            'fingerprint': shape,
+            'alias': alias,
+            'sql': sql,
+            'params': list(params or ()),
+            'views': [],
+            'count': 0,
+        })
+        entry['count'] += 1
+        if view not in entry['views']:
+            entry['views'].append(view)
+
+    def add_log(self, log, view):
+        for query in log.queries:
+            if not query.many:
+                self.add(query.alias, query.sql, query.params, view)
+
+    def load(self, lines):
+        """Формы из файла ExplainCaptureMiddleware, по JSON на строку."""
+        for line in lines:
+            if line.strip():
+                record = json.loads(line)
+                self.add(record['alias'], record['sql'], record['params'],
+                         record['view'])
+
+
+def collect_from_views(user):
+    """Обходит адреса posts, users и about анонимно и с авторизацией.
+
+    Кеш очищается перед каждым запросом, иначе закешированные фрагменты
+    скрыли бы часть запросов; очищается временный кеш (private_cache), а
+    не кеш запущенного сервера.
+    """
+    anonymous, authorized = Client(), Client()
+    authorized.force_login(user)
+    collector = ShapeCollector()
+    with private_cache():
+        for key, url, is_authorized in build_cases(user):
+            client = authorized if is_authorized else anonymous
+            cache.clear()
+            with capture() as log:
+                fetch(client, url)
+            collector.add_log(log, key.split()[0])
+    return collector
+
+
+def query_plan(alias, sql, params):
+    connection = connections[alias]
+    prefix = (
+        'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN ')
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql, params)
+        rows = cursor.fetchall()
+    if connection.vendor == 'sqlite':
+        return [row[-1] for row in rows]
+    return [row[0] for row in rows]
+
+
+def plan_flags(plan, vendor):
+    rules = SQLITE_RULES if vendor == 'sqlite' else POSTGRES_RULES
+    flags = []
+    for line in plan:
+        detail = line.strip().lstrip('->').strip()
+        for pattern, kind, severity in rules:
+            if pattern.search(detail):
+                flags.append(Flag(kind, severity, detail))
+                break
+    return flags
+
+
+def explain_shapes(collector):
+    """Отчет по всем формам: сначала с предупреждениями, затем заметки."""
+    report = []
+    for entry in collector.shapes.values():
+        vendor = connections[entry['alias']].vendor
+        try:
+            plan = query_plan(entry['alias'], entry['sql'], entry['params'])
+        except Exception as error:
+            plan, flags = [], [Flag('error', WARNING, repr(error))]
+        else:
+            flags = plan_flags(plan, vendor)
+        report.append({
+            'fingerprint': entry['fingerprint'],
+            'views': sorted(entry['views']),
+            'count': entry['count'],
+            'plan': plan,
+            'flags': [flag._asdict() for flag in flags],
+        })
+    severity = {WARNING: 0, NOTE: 1}
+    return sorted(report, key=lambda item: (
+        min((severity[flag['severity']] for flag in item['flags']),
+            default=2),
+        -item['count'],
+    ))
+
+
+def format_report(report, verbose=False):
+    lines = []
+    for item in report:
+        if not item['flags'] and not verbose:
+            continue
+        kinds = ', '.join(sorted({flag['kind'] for flag in item['flags']}))
+        lines.append(f'[{kinds or "ok"}] x{item["count"]} '
+                     f'{", ".join(item["views"])}')
+        lines.append(f'  {item["fingerprint"]}')
+        lines.extend(f'    {step}' for step in item['plan'])
+    return '\n'.join(lines)
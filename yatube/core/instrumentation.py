@@ -0,0 +1,212 @@
+"""Сбор SQL-запросов и обращений к кешу в рамках одного запроса.
+
+capture() вешает execute_wrapper на все подключения и регистрирует
+журнал в текущем потоке, поэтому работает и без DEBUG, и без лимита
+connection.queries_log. Обращения к кешу попадают в журнал после
+instrument_cache_backends().
+"""
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter, namedtuple
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.utils.module_loading import import_string
+
+
+Query = namedtuple(
+    'Query', 'alias sql params many duration origin', defaults=(None,))
+
+CACHE_KINDS = (
+    ('template.cache.index_page.', 'index_page'),
+    ('template.cache.', 'fragment'),
+    ('post_card:', 'post_card'),
+    ('feed:', 'feed'),
+    ('obj:', 'object'),
+    ('lookup:', 'lookup'),
+    ('version:', 'version'),
+    ('sorl-thumbnail', 'thumbnail'),
+)
+
+_local = threading.local()
+_missing = object()
+_CORE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Собственный код сбора метрик не считается источником запросов.
+_INTERNAL_PATHS = tuple(
+    os.path.join(_CORE_DIR, name)
+    for name in ('instrumentation.py', 'querycheck.py', 'middleware')
+)
+
+
+def active_logs():
+    return getattr(_local, 'logs', ())
+
+
+def cache_key_kind(key):
+    for prefix, kind in CACHE_KINDS:
+        if str(key).startswith(prefix):
+            return kind
+    return 'other'
+
+
+class QueryLog:
+    """Журнал SQL-запросов и обращений к кешу."""
+
+    def __init__(self, origins=False):
+        self.origins = origins
+        self.queries = []
+        self.cache = Counter()
+
+    def wrapper(self, alias):
+        def execute_wrapper(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                duration = time.perf_counter() - started
+                origin = query_origin() if self.origins else None
+                self.queries.append(
+                    Query(alias, sql, params, many, duration, origin))
+        return execute_wrapper
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def sql_time(self):
+        return sum(query.duration for query in self.queries)
+
+    @property
+    def cache_hits(self):
+        return sum(
+            total for (_, hit), total in self.cache.items() if hit)
+
+    @property
+    def cache_misses(self):
+        return sum(
+            total for (_, hit), total in self.cache.items() if not hit)
+
+    def record_cache(self, key, hit):
+        self.cache[(cache_key_kind(key), hit)] += 1
+
+
+def query_origin():
+    """Место в шаблоне или коде проекта, откуда пришел запрос.
+
+    Строка шаблона берется из ближайшего Node.render_annotated на стеке,
+    строка кода - из самого глубокого кадра внутри BASE_DIR.
+    """
+    code_origin = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        if code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            token = getattr(node, 'token', None)
+            origin = getattr(node, 'origin', None)
+            if token is not None and origin is not None:
+                template = (
+                    f'{origin.template_name or origin.name}:{token.lineno}')
+                if code_origin:
+                    return f'{code_origin} ({template})'
+                return template
+        elif code_origin is None and _is_project_file(code.co_filename):
+            code_origin = (
+                f'{os.path.relpath(code.co_filename, settings.BASE_DIR)}:'
+                f'{frame.f_lineno} in {code.co_name}'
+            )
+        frame = frame.f_back
+    return code_origin or 'unknown'
+
+
+def _is_project_file(filename):
+    return (
+        filename.startswith(settings.BASE_DIR)
+        and 'site-packages' not in filename
+        and not filename.startswith(_INTERNAL_PATHS)
+    )
+
+
+@contextmanager
+def capture(origins=False):
+    """Собирает в QueryLog все запросы текущего потока внутри блока.
+
+    origins=True дополнительно запоминает источник каждого запроса, это
+    заметно дороже и нужно только для отладки.
+    """
+    log = QueryLog(origins)
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(
+                connections[alias].execute_wrapper(log.wrapper(alias)))
+        _local.logs = active_logs() + (log,)
+        try:
+            yield log
+        finally:
+            _local.logs = tuple(
+                active for active in active_logs() if active is not log)
+
+
+def record_cache(key, hit):
+    for log in active_logs():
+        log.record_cache(key, hit)
+
+
+@contextmanager
+def uninstrumented():
+    """Обращения к кешу внутри блока не попадают в журналы: так
+    многоуровневый кеш не считает обращения к нижнему уровню дважды."""
+    depth = getattr(_local, 'uninstrumented', 0)
+    _local.uninstrumented = depth + 1
+    try:
+        yield
+    finally:
+        _local.uninstrumented = depth
+
+
+def _recording():
+    return bool(active_logs()) and not getattr(_local, 'uninstrumented', 0)
+
+
+def _wrap_get(get):
+    @functools.wraps(get)
+    def wrapper(self, key, default=None, version=None):
+        if not _recording():
+            return get(self, key, default, version)
+        value = get(self, key, _missing, version)
+        hit = value is not _missing
+        record_cache(key, hit)
+        return value if hit else default
+    wrapper.instrumented = True
+    return wrapper
+
+
+def _wrap_get_many(get_many):
+    @functools.wraps(get_many)
+    def wrapper(self, keys, version=None):
+        if not _recording():
+            return get_many(self, keys, version)
+        keys = list(keys)
+        # BaseCache.get_many вызывает get(), не считаем ключи дважды.
+        with uninstrumented():
+            values = get_many(self, keys, version)
+        for key in keys:
+            record_cache(key, key in values)
+        return values
+    wrapper.instrumented = True
+    return wrapper
+
+
+def instrument_cache_backends():
+    """Оборачивает get/get_many классов кешей из settings.CACHES."""
+    for options in settings.CACHES.values():
+        backend = import_string(options['BACKEND'])
+        for name, wrap in (('get', _wrap_get), ('get_many', _wrap_get_many)):
+            method = getattr(backend, name)
+            if not getattr(method, 'instrumented', False):
+                setattr(backend, name, wrap(method))
@@ -0,0 +1,239 @@
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.core.signals import got_request_exception
+from django.db import OperationalError, connections
+
+from .benchmarks import percentile
+
+
+SCENARIOS = {
+    'index': 30,
+    'group': 15,
+    'profile': 15,
+    'post': 25,
+    'follow_feed': 5,
+    'comment': 7,
+    'follow': 3,
+}
+
+CATALOG_SIZE = 1000
+
+LOGIN_PATH = '/auth/login/'
+
+
+class VirtualUser:
+    def __init__(self, session, username, password, catalog, rng):
+        self.session = session
+        self.username = username
+        self.password = password
+        self.catalog = catalog
+        self.rng = rng
+        self.following = set()
+
+    @property
+    def csrf_token(self):
+        return self.session.cookies.get('csrftoken', '')
+
+    def login(self):
+        """True, если вход удался: форма с ошибкой отдается с кодом 200,
+        успешный вход - редирект не на страницу входа."""
+        self.session.request('GET', LOGIN_PATH)
+        status = self.session.request('POST', LOGIN_PATH, {
+            'username': self.username,
+            'password': self.password,
+            'csrfmiddlewaretoken': self.csrf_token,
+        })
+        return status == 302 and not self.redirected_to_login()
+
+    def redirected_to_login(self):
+        """Последний ответ отправил на вход: сессия потеряна."""
+        return (self.session.location or '').startswith(LOGIN_PATH)
+
+    def page(self):
+        return self.rng.choice(('1', '1', '1', '2', '3', 'last'))
+
+    def index(self):
+        return self.session.request('GET', f'/?page={self.page()}')
+
+    def group(self):
+        slug = self.rng.choice(self.catalog['groups'])
+        return self.session.request(
+            'GET', f'/group/{slug}/?page={self.page()}')
+
+    def profile(self):
+        username = self.rng.choice(self.catalog['users'])
+        return self.session.request(
+            'GET', f'/profile/{username}/?page={self.page()}')
+
+    def post(self):
+        post_id = self.rng.choice(self.catalog['posts'])
+        return self.session.request('GET', f'/posts/{post_id}/')
+
+    def follow_feed(self):
+        return self.session.request('GET', f'/follow/?page={self.page()}')
+
+    def comment(self):
+        post_id = self.rng.choice(self.catalog['posts'])
+        return self.session.request('POST', f'/posts/{post_id}/comment/', {
+            'text': f'Комментарий нагрузочного теста {time.time()}',
+            'csrfmiddlewaretoken': self.csrf_token,
+        })
+
+    def follow(self):
+        username = self.rng.choice(self.catalog['users'])
+        if username in self.following:
+            self.following.discard(username)
+            return self.session.request(
+                'GET', f'/profile/{username}/unfollow/')
+        self.following.add(username)
+        return self.session.request('GET', f'/profile/{username}/follow/')
+
+
+class Recorder:
+    """Копит результаты запросов с разбивкой по интервалам времени."""
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.buckets = defaultdict(list)
+        self.scenarios = defaultdict(list)
+        self.locked = Counter()
+        self.login_errors = 0
+
+    def add(self, scenario, latency, ok):
+        bucket = int((time.monotonic() - self.started) / self.interval)
+        with self.lock:
+            self.buckets[bucket].append((latency, ok))
+            self.scenarios[scenario].append((latency, ok))
+
+    def add_lock_error(self):
+        bucket = int((time.monotonic() - self.started) / self.interval)
+        with self.lock:
+            self.locked[bucket] += 1
+
+    def add_login_error(self):
+        with self.lock:
+            self.login_errors += 1
+
+    @staticmethod
+    def summarize(samples, seconds):
+        latencies = [latency * 1000 for latency, _ in samples]
+        failed = sum(1 for _, ok in samples if not ok)
+        return {
+            'requests': len(samples),
+            'rps': round(len(samples) / seconds, 2) if seconds else 0,
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'error_rate': round(failed / len(samples), 4) if samples else 0,
+        }
+
+    def report(self, duration):
+        timeline = []
+        for bucket in sorted(self.buckets):
+            row = self.summarize(self.buckets[bucket], self.interval)
+            row['t'] = round(bucket * self.interval, 2)
+            row['lock_errors'] = self.locked[bucket]
+            timeline.append(row)
+        all_samples = [
+            sample for samples in self.buckets.values() for sample in samples
+        ]
+        total = self.summarize(all_samples, duration)
+        total['lock_errors'] = sum(self.locked.values())
+        total['login_errors'] = self.login_errors
+        return {
+            'total': total,
+            'scenarios': {
+                name: self.summarize(samples, duration)
+                for name, samples in sorted(self.scenarios.items())
+            },
+            'timeline': timeline,
+        }
+
+
+class LoadTest:
+    def __init__(self, session_factory, credentials, catalog, concurrency,
+                 duration, interval=1.0, think_time=0.0,
+                 scenarios=SCENARIOS, seed=None):
+        self.session_factory = session_factory
+        self.credentials = credentials
+        self.catalog = catalog
+        self.concurrency = concurrency
+        self.duration = duration
+        self.think_time = think_time
+        self.scenarios = scenarios
+        self.seed = seed
+        self.recorder = Recorder(interval)
+
+    def on_exception(self, sender, request=None, **kwargs):
+        error = sys.exc_info()[1]
+        if isinstance(error, OperationalError) and 'locked' in str(error):
+            self.recorder.add_lock_error()
+
+    def worker(self, number, deadline):
+        rng = random.Random(None if self.seed is None else self.seed + number)
+        username, password = self.credentials[
+            number % len(self.credentials)]
+        user = VirtualUser(
+            self.session_factory(), username, password, self.catalog, rng)
+        names = list(self.scenarios)
+        weights = [self.scenarios[name] for name in names]
+        try:
+            if not user.login():
+                # Без входа сценарии для авторизованных упирались бы в
+                # редирект на вход, и замер был бы не о том.
+                self.recorder.add_login_error()
+                return
+            while time.monotonic() < deadline:
+                scenario = rng.choices(names, weights)[0]
+                started = time.perf_counter()
+                try:
+                    status = getattr(user, scenario)()
+                    ok = status < 500 and not user.redirected_to_login()
+                except Exception:
+                    ok = False
+                self.recorder.add(
+                    scenario, time.perf_counter() - started, ok)
+                if self.think_time:
+                    time.sleep(rng.uniform(0, self.think_time * 2))
+        finally:
+            connections.close_all()
+
+    def run(self):
+        got_request_exception.connect(self.on_exception)
+        try:
+            self.recorder.started = time.monotonic()
+            deadline = self.recorder.started + self.duration
+            threads = [
+                threading.Thread(target=self.worker, args=(number, deadline))
+                for number in range(self.concurrency)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.monotonic() - self.recorder.started
+        finally:
+            got_request_exception.disconnect(self.on_exception)
+        return self.recorder.report(elapsed)
+
+
+def build_catalog(size=CATALOG_SIZE):
+    """Случайные выборки адресуемых объектов для сценариев."""
+    from posts.models import Group, Post, User
+
+    return {
+        'posts': list(
+            Post.objects.order_by('?').values_list('id', flat=True)[:size]),
+        'groups': list(
+            Group.objects.order_by('?').values_list('slug', flat=True)[:size]
+        ),
+        'users': list(
+            User.objects.filter(posts__isnull=False).distinct()
+            .order_by('?').values_list('username', flat=True)[:size]),
+    }
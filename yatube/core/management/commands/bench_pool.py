@@ -0,0 +1,47 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import bench_connection_modes, bench_user
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает ленты с подключением к базе на каждый запрос и с '
+            'пулом core.db.backends: задержку, число открытых подключений '
+            'и сэкономленное на подключении время на запрос.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument(
+            '--user', help='username для авторизованных замеров')
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--output', help='Сохранить результат в JSON')
+
+    def handle(self, *args, **options):
+        user = bench_user(options['user'])
+        if user is None:
+            raise CommandError(
+                'В базе нет пользователей, сначала выполните seed_load')
+        try:
+            results = bench_connection_modes(
+                user, options['iterations'], options['database'])
+        except ValueError as error:
+            raise CommandError(error)
+
+        self.stdout.write(
+            f'{"mode":<8} {"requests":>8} {"mean":>8} {"p50":>8} '
+            f'{"p95":>8} {"connects":>8}')
+        for mode in ('plain', 'pooled'):
+            row = results[mode]
+            self.stdout.write(
+                f'{mode:<8} {row["requests"]:>8} {row["mean_ms"]:>8.2f} '
+                f'{row["p50_ms"]:>8.2f} {row["p95_ms"]:>8.2f} '
+                f'{row["connections_opened"]:>8}')
+        self.stdout.write(
+            f'Сэкономлено на запрос: {results["saved_ms_per_request"]} мс')
+        if results['pooled']['pool']:
+            self.stdout.write(f'Пул: {results["pooled"]["pool"]}')
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
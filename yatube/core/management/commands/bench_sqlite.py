@@ -0,0 +1,49 @@
+import json
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.contention import compare_settings
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность SQLite под одновременными '
+            'чтениями ленты и записью комментариев на копиях базы: с '
+            'настройками по умолчанию и с SQLITE_PRAGMAS.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument(
+            '--duration', type=float, default=10,
+            help='Секунды на каждый вариант')
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--output', help='Сохранить результат в JSON')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('Замер рассчитан только на SQLite')
+        with tempfile.TemporaryDirectory() as directory:
+            results = compare_settings(
+                connection.settings_dict['NAME'],
+                directory,
+                settings.SQLITE_PRAGMAS,
+                options['readers'],
+                options['writers'],
+                options['duration'],
+            )
+
+        self.stdout.write(
+            f'{"":<8} {"kind":<6} {"ops/s":>9} {"p95 ms":>9} {"locked":>7}')
+        for name, result in results.items():
+            for kind, row in result.items():
+                self.stdout.write(
+                    f'{name:<8} {kind:<6} {row["ops_per_s"]:>9.1f} '
+                    f'{row["p95_ms"]:>9.2f} {row["locked"]:>7}')
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
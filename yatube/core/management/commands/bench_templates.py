@@ -0,0 +1,40 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import bench_template_warmup, bench_user
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает первый запрос воркера без разобранных шаблонов, '
+            'первый запрос после их предварительного разбора и '
+            'установившийся режим с cached.Loader.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument(
+            '--user', help='username для авторизованных замеров')
+        parser.add_argument('--output', help='Сохранить результат в JSON')
+
+    def handle(self, *args, **options):
+        user = bench_user(options['user'])
+        if user is None:
+            raise CommandError(
+                'В базе нет пользователей, сначала выполните seed_load')
+        results = bench_template_warmup(user, options['iterations'])
+        precompile = results.pop('precompile')
+
+        self.stdout.write(
+            f'{"view":<40} {"cold":>8} {"precomp":>8} {"steady":>8}')
+        for key, row in sorted(results.items()):
+            self.stdout.write(
+                f'{key:<40} {row["cold_ms"]:>8.2f} '
+                f'{row["precompiled_ms"]:>8.2f} {row["steady_ms"]:>8.2f}')
+        self.stdout.write(
+            f'Разобрано шаблонов: {precompile["templates"]} '
+            f'за {precompile["ms"]} мс')
+
+        if options['output']:
+            results['precompile'] = precompile
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
@@ -0,0 +1,73 @@
+import json
+from contextlib import nullcontext
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import (bench_user, compare, private_cache,
+                             run_benchmarks)
+
+
+class Command(BaseCommand):
+    help = ('Замеряет p50/p95, число SQL-запросов и время в SQL для всех '
+            'именованных адресов posts, users и about и сравнивает '
+            'результат с сохраненным baseline.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument(
+            '--user', help='username для авторизованных замеров')
+        parser.add_argument(
+            '--cold-cache', action='store_true',
+            help='Очищать кеш перед каждым запросом; замер идет на '
+                 'временном кеше, кеш сервера не трогается')
+        parser.add_argument(
+            '--output', help='Сохранить результат как JSON baseline')
+        parser.add_argument(
+            '--compare', help='JSON baseline для поиска регрессий')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='Допустимый относительный рост p95')
+
+    def handle(self, *args, **options):
+        user = bench_user(options['user'])
+        if user is None:
+            raise CommandError(
+                'В базе нет пользователей, сначала выполните seed_load')
+        cold_cache = options['cold_cache']
+        with private_cache() if cold_cache else nullcontext():
+            results = run_benchmarks(
+                user,
+                options['iterations'],
+                options['warmup'],
+                before_request=cache.clear if cold_cache else None,
+            )
+        self.print_table(results)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2,
+                          sort_keys=True)
+
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as baseline:
+                regressions = compare(
+                    json.load(baseline), results, options['tolerance'])
+            if regressions:
+                raise CommandError(
+                    'Найдены регрессии:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('Регрессий нет'))
+
+    def print_table(self, results):
+        self.stdout.write(
+            f'{"view":<52} {"code":>4} {"p50":>8} {"p95":>8} '
+            f'{"sql":>4} {"sql ms":>8}')
+        for key, result in sorted(results.items()):
+            if 'error' in result:
+                self.stdout.write(f'{key:<52} {result["error"]}')
+                continue
+            self.stdout.write(
+                f'{key:<52} {result["status"]:>4} {result["p50_ms"]:>8.2f} '
+                f'{result["p95_ms"]:>8.2f} {result["queries"]:>4} '
+                f'{result["sql_ms"]:>8.2f}')
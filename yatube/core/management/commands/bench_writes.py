@@ -0,0 +1,48 @@
+import json
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.contention import WriteBenchmark, database_copy
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает запись комментариев из многих потоков напрямую и '
+            'через очередь с одним писателем (core.writer) на копии базы: '
+            'пропускную способность, p50/p95/p99 и ошибки блокировки.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=16)
+        parser.add_argument(
+            '--duration', type=float, default=10,
+            help='Секунды на каждый режим')
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--output', help='Сохранить результат в JSON')
+
+    def handle(self, *args, **options):
+        if connections[options['database']].vendor != 'sqlite':
+            raise CommandError('Замер рассчитан только на SQLite')
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for mode in ('direct', 'queue'):
+                path = os.path.join(directory, f'{mode}.sqlite3')
+                with database_copy(options['database'], path) as alias:
+                    results[mode] = WriteBenchmark(
+                        alias, options['writers'], options['duration'],
+                        mode, options['batch_size']).run()
+
+        self.stdout.write(
+            f'{"mode":<8} {"ops/s":>9} {"p50":>8} {"p95":>8} {"p99":>8} '
+            f'{"locked":>7} {"batch":>6}')
+        for mode, row in results.items():
+            self.stdout.write(
+                f'{mode:<8} {row["ops_per_s"]:>9.1f} {row["p50_ms"]:>8.2f} '
+                f'{row["p95_ms"]:>8.2f} {row["p99_ms"]:>8.2f} '
+                f'{row["locked"]:>7} {row.get("avg_batch", 1):>6}')
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
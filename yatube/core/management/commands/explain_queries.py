@@ -0,0 +1,60 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import bench_user
+from core.explain import (WARNING, ShapeCollector, collect_from_views,
+                          explain_shapes, format_report)
+
+
+class Command(BaseCommand):
+    help = ('Собирает различные формы SQL-запросов адресов posts, users и '
+            'about, выполняет для каждой EXPLAIN QUERY PLAN и отмечает '
+            'полные сканирования, сортировки во временном B-дереве и '
+            'некрывающие индексы.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--input',
+            help='Файл ExplainCaptureMiddleware вместо обхода адресов')
+        parser.add_argument(
+            '--user', help='username для авторизованного обхода')
+        parser.add_argument(
+            '--output', help='Сохранить отчет как JSON')
+        parser.add_argument(
+            '--verbose', action='store_true',
+            help='Показывать и формы без замечаний')
+        parser.add_argument(
+            '--fail-on-warning', action='store_true',
+            help='Завершиться ошибкой при полных сканированиях и сортировках')
+
+    def handle(self, *args, **options):
+        if options['input']:
+            collector = ShapeCollector()
+            with open(options['input'], encoding='utf-8') as source:
+                collector.load(source)
+        else:
+            user = bench_user(options['user'])
+            if user is None:
+                raise CommandError(
+                    'В базе нет пользователей, сначала выполните seed_load')
+            collector = collect_from_views(user)
+
+        report = explain_shapes(collector)
+        text = format_report(report, options['verbose'])
+        if text:
+            self.stdout.write(text)
+        warnings = [
+            item for item in report
+            if any(flag['severity'] == WARNING for flag in item['flags'])
+        ]
+        self.stdout.write(
+            f'Форм запросов: {len(report)}, с предупреждениями: '
+            f'{len(warnings)}')
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+
+        if warnings and options['fail_on_warning']:
+            raise CommandError('Найдены неэффективные планы запросов')
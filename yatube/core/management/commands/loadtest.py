@@ -0,0 +1,108 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.clients import HTTPSession, WSGISession
+from core.loadtest import SCENARIOS, LoadTest, build_catalog
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест: много одновременных виртуальных '
+            'пользователей читают ленты, открывают посты, комментируют и '
+            'подписываются. По умолчанию вызывает yatube.wsgi.application '
+            'в этом же процессе, с --url ходит на запущенный сервер.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument(
+            '--duration', type=float, default=30, help='Секунды')
+        parser.add_argument(
+            '--interval', type=float, default=1,
+            help='Шаг временной шкалы в отчете, секунды')
+        parser.add_argument(
+            '--think-time', type=float, default=0,
+            help='Средняя пауза пользователя между запросами, секунды')
+        parser.add_argument(
+            '--url', help='Адрес запущенного сервера вместо WSGI в процессе')
+        parser.add_argument(
+            '--prefix', default='load',
+            help='Префикс пользователей, созданных seed_load')
+        parser.add_argument('--password', default='load-test')
+        parser.add_argument(
+            '--mix', default='',
+            help='Веса сценариев, например index=50,comment=20')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--output', help='Сохранить отчет в JSON')
+
+    def handle(self, *args, **options):
+        usernames = list(
+            User.objects.filter(username__startswith=f'{options["prefix"]}_')
+            .order_by('?').values_list('username', flat=True)
+            [:options['concurrency']]
+        )
+        if not usernames:
+            raise CommandError(
+                'Нет пользователей для входа, сначала выполните seed_load')
+        catalog = build_catalog()
+        if not catalog['posts'] or not catalog['groups']:
+            raise CommandError('В базе нет постов или групп')
+
+        if options['url']:
+            def session_factory():
+                return HTTPSession(options['url'])
+        else:
+            from yatube.wsgi import application
+
+            def session_factory():
+                return WSGISession(application)
+
+        load_test = LoadTest(
+            session_factory,
+            [(username, options['password']) for username in usernames],
+            catalog,
+            concurrency=options['concurrency'],
+            duration=options['duration'],
+            interval=options['interval'],
+            think_time=options['think_time'],
+            scenarios=self.parse_mix(options['mix']),
+            seed=options['seed'],
+        )
+        report = load_test.run()
+        self.print_report(report)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+
+    def parse_mix(self, mix):
+        scenarios = dict(SCENARIOS)
+        for item in filter(None, mix.split(',')):
+            name, _, weight = item.partition('=')
+            if name not in SCENARIOS:
+                raise CommandError(f'Неизвестный сценарий: {name}')
+            scenarios[name] = float(weight)
+        return scenarios
+
+    def print_report(self, report):
+        header = (f'{"":<12} {"req":>6} {"rps":>8} {"p50":>8} {"p95":>8} '
+                  f'{"p99":>8} {"err%":>6} {"locked":>6}')
+        self.stdout.write(header)
+        for row in report['timeline']:
+            self.stdout.write(self.format_row(f't={row["t"]}', row))
+        self.stdout.write('')
+        for name, row in report['scenarios'].items():
+            self.stdout.write(self.format_row(name, row))
+        self.stdout.write(self.format_row('total', report['total']))
+        if report['total']['login_errors']:
+            self.stderr.write(
+                f'Не удалось войти: {report["total"]["login_errors"]} '
+                f'виртуальных пользователей')
+
+    def format_row(self, title, row):
+        return (f'{title:<12} {row["requests"]:>6} {row["rps"]:>8.1f} '
+                f'{row["p50_ms"]:>8.1f} {row["p95_ms"]:>8.1f} '
+                f'{row["p99_ms"]:>8.1f} {row["error_rate"] * 100:>6.2f} '
+                f'{row.get("lock_errors", ""):>6}')
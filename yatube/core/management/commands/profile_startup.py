@@ -0,0 +1,53 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.startup import compare_startup, profile_startup
+
+
+class Command(BaseCommand):
+    help = ('Замеряет старт воркера (import yatube.wsgi) и manage.py с '
+            '-X importtime: полное время, время импортов, самые дорогие '
+            'пакеты и тяжелые модули, загруженные без необходимости.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument(
+            '--top', type=int, default=15, help='Сколько пакетов выводить')
+        parser.add_argument(
+            '--output', help='Сохранить результат как JSON baseline')
+        parser.add_argument(
+            '--compare', help='JSON baseline для поиска регрессий')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Допустимый относительный рост времени старта')
+
+    def handle(self, *args, **options):
+        try:
+            results = profile_startup(options['runs'], options['top'])
+        except RuntimeError as error:
+            raise CommandError(error)
+
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name}: старт {result["wall_ms"]:.1f} мс, импорты '
+                f'{result["imports_ms"]:.1f} мс, модулей {result["modules"]}')
+            for package, ms in result['packages']:
+                self.stdout.write(f'  {package:<40} {ms:>8.2f} мс')
+            for module in result['lazy_violations']:
+                self.stdout.write(self.style.WARNING(
+                    f'  при старте загружен {module}'))
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2,
+                          sort_keys=True)
+
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as baseline:
+                regressions = compare_startup(
+                    json.load(baseline), results, options['tolerance'])
+            if regressions:
+                raise CommandError(
+                    'Найдены регрессии:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('Регрессий нет'))
@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.sqlite import copy_database
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в реплики из DATABASE_REPLICAS '
+            'через backup API. С --interval повторяет копирование, '
+            'имитируя отставание асинхронной репликации.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'replicas', nargs='*',
+            help='Алиасы реплик, по умолчанию все из DATABASE_REPLICAS')
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Повторять каждые N секунд')
+
+    def handle(self, *args, **options):
+        replicas = options['replicas'] or settings.DATABASE_REPLICAS
+        if not replicas:
+            raise CommandError('Реплики не настроены: DATABASE_REPLICAS')
+        source = connections[DEFAULT_DB_ALIAS]
+        if source.vendor != 'sqlite':
+            raise CommandError('Синхронизация рассчитана только на SQLite')
+        while True:
+            for alias in replicas:
+                started = time.monotonic()
+                copy_database(
+                    source.settings_dict['NAME'],
+                    connections.databases[alias]['NAME'])
+                self.stdout.write(
+                    f'{alias}: {time.monotonic() - started:.2f} с')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,40 @@
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+
+from core.clients import HTTPSession, WSGISession
+from core.warmup import feed_urls, warmup
+
+
+class Command(BaseCommand):
+    help = ('Прогревает резолвер адресов, шаблоны, sorl и Pillow, '
+            'миниатюры и общий кеш лент. С --url запрашивает страницы лент '
+            'у запущенного пула, чтобы их прогрели сами воркеры.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', type=int, default=None,
+            help='Сколько страниц лент прогревать (WARMUP_FEED_PAGES)')
+        parser.add_argument('--url', help='Адрес запущенного сервера')
+        parser.add_argument(
+            '--rounds', type=int, default=1,
+            help='Сколько раз запросить каждую страницу у пула: запросы '
+                 'распределяются по воркерам')
+
+    def handle(self, *args, **options):
+        pages = options['pages'] or settings.WARMUP_FEED_PAGES
+        results = warmup(WSGISession(get_wsgi_application()), pages)
+        for name, (result, ms) in results.items():
+            self.stdout.write(f'{name:<12} {str(result):>8} {ms:>10.1f} мс')
+
+        if options['url']:
+            session = HTTPSession(options['url'])
+            statuses = Counter(
+                session.request('GET', url)
+                for _ in range(options['rounds'])
+                for url in feed_urls(pages)
+            )
+            self.stdout.write(
+                f'Пул {options["url"]}: ответы {dict(statuses)}')
@@ -0,0 +1,417 @@
+"""Метрики в формате Prometheus, общие для всех процессов-воркеров.
+
+Каждый процесс пишет значения в свой файл METRICS_DIR/metrics_<pid>.db,
+отображенный в память через mmap: запись - это обновление double по
+известному смещению, без системных вызовов. Эндпоинт /metrics читает
+файлы всех процессов и суммирует одинаковые ряды, поэтому любой воркер
+отдает картину всего сервера.
+
+Файлы завершившихся процессов при чтении переносятся в
+metrics_archive.db: счетчики и гистограммы прибавляются к архиву, чтобы
+суммы не уменьшались, а значения gauge отбрасываются - они описывали
+состояние процесса, которого больше нет.
+"""
+import fcntl
+import glob
+import mmap
+import os
+import re
+import struct
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+INITIAL_SIZE = 1 << 16
+HEADER = struct.Struct('<Q')
+KEY_LENGTH = struct.Struct('<I')
+VALUE = struct.Struct('<d')
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+ARCHIVE_NAME = 'metrics_archive.db'
+PROCESS_FILE = re.compile(r'^metrics_(\d+)\.db$')
+
+
+def _padding(position):
+    return (8 - position % 8) % 8
+
+
+def read_entries(data, used):
+    """Отдает (ключ, значение, смещение значения) из образа файла."""
+    position = HEADER.size
+    while position < used:
+        length, = KEY_LENGTH.unpack_from(data, position)
+        position += KEY_LENGTH.size
+        key = bytes(data[position:position + length]).decode('utf-8')
+        position += length
+        position += _padding(position)
+        value, = VALUE.unpack_from(data, position)
+        yield key, value, position
+        position += VALUE.size
+
+
+class MmapStore:
+    """Файл значений одного процесса: заголовок с размером и записи
+    [длина ключа][ключ][выравнивание до 8][double]."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, 'a+b')
+        size = os.fstat(self.file.fileno()).st_size
+        if size < INITIAL_SIZE:
+            self.file.truncate(INITIAL_SIZE)
+            size = INITIAL_SIZE
+        self.map = mmap.mmap(self.file.fileno(), size)
+        self.used, = HEADER.unpack_from(self.map, 0)
+        if not self.used:
+            self.used = HEADER.size
+            HEADER.pack_into(self.map, 0, self.used)
+        self.positions = {
+            key: position
+            for key, _, position in read_entries(self.map, self.used)
+        }
+
+    def _position(self, key):
+        position = self.positions.get(key)
+        if position is not None:
+            return position
+        encoded = key.encode('utf-8')
+        entry_start = self.used + KEY_LENGTH.size + len(encoded)
+        value_position = entry_start + _padding(entry_start)
+        end = value_position + VALUE.size
+        if end > len(self.map):
+            self._grow(end)
+        KEY_LENGTH.pack_into(self.map, self.used, len(encoded))
+        start = self.used + KEY_LENGTH.size
+        self.map[start:start + len(encoded)] = encoded
+        VALUE.pack_into(self.map, value_position, 0.0)
+        # Размер обновляется последним: читатель не увидит запись
+        # раньше, чем она будет заполнена.
+        self.used = end
+        HEADER.pack_into(self.map, 0, self.used)
+        self.positions[key] = value_position
+        return value_position
+
+    def _grow(self, needed):
+        size = len(self.map)
+        while size < needed:
+            size *= 2
+        self.map.close()
+        self.file.truncate(size)
+        self.map = mmap.mmap(self.file.fileno(), size)
+
+    def inc(self, key, amount=1.0):
+        with self.lock:
+            position = self._position(key)
+            value, = VALUE.unpack_from(self.map, position)
+            VALUE.pack_into(self.map, position, value + amount)
+
+    def set(self, key, value):
+        with self.lock:
+            VALUE.pack_into(self.map, self._position(key), value)
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Файл текущего процесса; после fork создается заново."""
+    global _store
+    directory = settings.METRICS_DIR
+    path = os.path.join(directory, f'metrics_{os.getpid()}.db')
+    if _store is None or _store.path != path:
+        with _store_lock:
+            if _store is None or _store.path != path:
+                os.makedirs(directory, exist_ok=True)
+                _store = MmapStore(path)
+    return _store
+
+
+def read_file(path):
+    """Пары (ключ, значение) из файла процесса."""
+    with open(path, 'rb') as source:
+        data = source.read()
+    if len(data) < HEADER.size:
+        return []
+    used, = HEADER.unpack_from(data, 0)
+    return [
+        (key, value)
+        for key, value, _ in read_entries(data, min(used, len(data)))
+    ]
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def is_gauge(key):
+    name = key.split('{', 1)[0]
+    return any(
+        metric.kind == 'gauge' and metric.name == name for metric in REGISTRY)
+
+
+@contextmanager
+def directory_lock(directory, operation):
+    """flock на файл каталога: перенос в архив (LOCK_EX) не пересекается
+    с чтением (LOCK_SH), и ряды не считаются дважды."""
+    with open(os.path.join(directory, 'metrics.lock'), 'a') as lock:
+        fcntl.flock(lock, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def process_files(directory):
+    """Пары (pid, путь) файлов процессов в каталоге."""
+    files = []
+    for path in glob.glob(os.path.join(directory, 'metrics_*.db')):
+        match = PROCESS_FILE.match(os.path.basename(path))
+        if match:
+            files.append((int(match.group(1)), path))
+    return files
+
+
+def archive_dead(directory):
+    """Переносит файлы завершившихся процессов в архив; список pid."""
+    dead = [
+        (pid, path) for pid, path in process_files(directory)
+        if not process_alive(pid)
+    ]
+    if not dead:
+        return []
+    archived = []
+    with directory_lock(directory, fcntl.LOCK_EX):
+        archive = MmapStore(os.path.join(directory, ARCHIVE_NAME))
+        try:
+            for pid, path in dead:
+                # Файл мог перенести другой воркер, пока ждали блокировку.
+                if not os.path.exists(path):
+                    continue
+                for key, value in read_file(path):
+                    if not is_gauge(key):
+                        archive.inc(key, value)
+                os.remove(path)
+                archived.append(pid)
+        finally:
+            archive.close()
+    return archived
+
+
+def collect(directory=None):
+    """Сумма значений по файлам всех процессов и архиву."""
+    directory = directory or settings.METRICS_DIR
+    if not os.path.isdir(directory):
+        return defaultdict(float)
+    archive_dead(directory)
+    totals = defaultdict(float)
+    with directory_lock(directory, fcntl.LOCK_SH):
+        paths = [path for _, path in process_files(directory)]
+        archive = os.path.join(directory, ARCHIVE_NAME)
+        if os.path.exists(archive):
+            paths.append(archive)
+        for path in paths:
+            for key, value in read_file(path):
+                totals[key] += value
+    return totals
+
+
+def _escape(value):
+    return (str(value).replace('\\', r'\\').replace('\n', r'\n')
+            .replace('"', r'\"'))
+
+
+def series(name, labels):
+    if not labels:
+        return name
+    pairs = ','.join(
+        f'{label}="{_escape(value)}"'
+        for label, value in sorted(labels.items())
+    )
+    return f'{name}{{{pairs}}}'
+
+
+def _format_le(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        REGISTRY.append(self)
+
+    def owns(self, key):
+        name = key.split('{', 1)[0]
+        return name == self.name or name in self.suffixed()
+
+    def suffixed(self):
+        return ()
+
+
+class CounterMetric(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if settings.METRICS_ENABLED:
+            get_store().inc(series(self.name, labels), amount)
+
+
+class GaugeMetric(Metric):
+    """Значение процесса; на /metrics складываются значения работающих
+    процессов."""
+
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        if settings.METRICS_ENABLED:
+            get_store().set(series(self.name, labels), value)
+
+
+class HistogramMetric(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets):
+        super().__init__(name, documentation)
+        self.buckets = tuple(buckets) + (float('inf'),)
+
+    def suffixed(self):
+        return tuple(
+            f'{self.name}{suffix}' for suffix in ('_bucket', '_sum', '_count'))
+
+    def observe(self, value, **labels):
+        if not settings.METRICS_ENABLED:
+            return
+        store = get_store()
+        for bound in self.buckets:
+            if value <= bound:
+                store.inc(series(
+                    f'{self.name}_bucket', {**labels, 'le': _format_le(bound)}
+                ))
+        store.inc(series(f'{self.name}_sum', labels), value)
+        store.inc(series(f'{self.name}_count', labels))
+
+
+REGISTRY = []
+
+REQUEST_LATENCY = HistogramMetric(
+    'yatube_request_duration_seconds',
+    'Время обработки запроса по имени адреса', LATENCY_BUCKETS)
+RESPONSE_SIZE = HistogramMetric(
+    'yatube_response_size_bytes',
+    'Размер тела ответа по имени адреса', SIZE_BUCKETS)
+REQUEST_QUERIES = HistogramMetric(
+    'yatube_request_sql_queries',
+    'Число SQL-запросов на запрос по имени адреса', QUERY_BUCKETS)
+CACHE_REQUESTS = CounterMetric(
+    'yatube_cache_requests_total',
+    'Обращения к кешу по виду ключа и результату')
+CACHE_TIER_REQUESTS = CounterMetric(
+    'yatube_cache_tier_requests_total',
+    'Чтения двухуровневого кеша: из памяти процесса (l1), из общего '
+    'кеша (l2) и промахи (miss)')
+CACHE_STAMPEDE_EVENTS = CounterMetric(
+    'yatube_cache_stampede_events_total',
+    'Пересчеты get_or_compute (cold, early, expired) и ответы без '
+    'пересчета (stale_served, waited, wait_timeout)')
+OBJECTS_CREATED = CounterMetric(
+    'yatube_objects_created_total',
+    'Созданные посты, комментарии и подписки')
+DB_POOL_EVENTS = CounterMetric(
+    'yatube_db_pool_events_total',
+    'События пула подключений: created, reused, wait, timeout и другие')
+DB_POOL_CONNECTIONS = GaugeMetric(
+    'yatube_db_pool_connections',
+    'Подключения пулов по состоянию: idle и in_use')
+
+
+def _labels(key, prefix):
+    return dict(pair.split('=', 1) for pair in key[len(prefix):-1].split(','))
+
+
+def cache_hit_ratios(totals):
+    """Доля попаданий по видам кеша из суммарных счетчиков."""
+    hits, requests = defaultdict(float), defaultdict(float)
+    prefix = f'{CACHE_REQUESTS.name}{{'
+    for key, value in totals.items():
+        if not key.startswith(prefix):
+            continue
+        labels = _labels(key, prefix)
+        kind = labels['cache'].strip('"')
+        requests[kind] += value
+        if labels['result'] == '"hit"':
+            hits[kind] += value
+    return {
+        kind: hits[kind] / total for kind, total in requests.items() if total
+    }
+
+
+def cache_tier_ratios(totals):
+    """Доля чтений, обслуженных памятью процесса (l1), и доля попаданий
+    в общий кеш среди дошедших до него (l2)."""
+    reads = defaultdict(float)
+    prefix = f'{CACHE_TIER_REQUESTS.name}{{'
+    for key, value in totals.items():
+        if key.startswith(prefix):
+            reads[_labels(key, prefix)['tier'].strip('"')] += value
+    ratios = {}
+    total = sum(reads.values())
+    if total:
+        ratios['l1'] = reads['l1'] / total
+    if total - reads['l1']:
+        ratios['l2'] = reads['l2'] / (total - reads['l1'])
+    return ratios
+
+
+def _ratio_lines(name, documentation, label, ratios):
+    if not ratios:
+        return []
+    return [
+        f'# HELP {name} {documentation}',
+        f'# TYPE {name} gauge',
+        *(
+            f'{series(name, {label: kind})} {ratio!r}'
+            for kind, ratio in sorted(ratios.items())
+        ),
+    ]
+
+
+def exposition(directory=None):
+    """Текстовый формат Prometheus 0.0.4."""
+    totals = collect(directory)
+    lines = []
+    for metric in REGISTRY:
+        keys = sorted(key for key in totals if metric.owns(key))
+        if not keys:
+            continue
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(f'{key} {totals[key]!r}' for key in keys)
+    lines.extend(_ratio_lines(
+        'yatube_cache_hit_ratio', 'Доля попаданий в кеш по виду ключа',
+        'cache', cache_hit_ratios(totals)))
+    lines.extend(_ratio_lines(
+        'yatube_cache_tier_hit_ratio',
+        'Доля попаданий по уровням двухуровневого кеша',
+        'tier', cache_tier_ratios(totals)))
+    return '\n'.join(lines) + '\n'
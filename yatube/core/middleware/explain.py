@@ -0,0 +1,57 @@
+import json
+import threading
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from core.instrumentation import capture
+from core.querycheck import fingerprint
+
+
+class ExplainCaptureMiddleware:
+    """Отладочный сбор форм SQL-запросов для команды explain_queries.
+
+    Каждая новая для процесса форма SELECT-запроса из адресов posts,
+    users и about дописывается строкой JSON в EXPLAIN_CAPTURE_FILE вместе
+    с параметрами и именем адреса. Без настройки middleware отключается.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.path = settings.EXPLAIN_CAPTURE_FILE
+        if not self.path:
+            raise MiddlewareNotUsed
+        # core.benchmarks тянет django.test: только при включенном сборе.
+        from core.benchmarks import BENCH_NAMESPACES
+
+        self.namespaces = BENCH_NAMESPACES
+        self.seen = set()
+        self.lock = threading.Lock()
+
+    def __call__(self, request):
+        with capture() as log:
+            response = self.get_response(request)
+        match = request.resolver_match
+        if match is None or match.namespace not in self.namespaces:
+            return response
+        records = []
+        with self.lock:
+            for query in log.queries:
+                shape = fingerprint(query.sql)
+                if query.many or shape in self.seen:
+                    continue
+                if not shape.upper().startswith('SELECT'):
+                    continue
+                self.seen.add(shape)
+                records.append({
+                    'view': match.view_name,
+                    'alias': query.alias,
+                    'sql': query.sql,
+                    'params': list(query.params or ()),
+                })
+            if records:
+                with open(self.path, 'a', encoding='utf-8') as output:
+                    for record in records:
+                        output.write(json.dumps(
+                            record, ensure_ascii=False, default=str) + '\n')
+        return response
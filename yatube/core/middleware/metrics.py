@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from core import metrics
+from core.instrumentation import capture, instrument_cache_backends
+
+
+class MetricsMiddleware:
+    """Пишет в общее хранилище метрик гистограммы каждого запроса.
+
+    Задержка, размер ответа и число SQL-запросов группируются по имени
+    адреса из resolver_match, обращения к кешу - по виду ключа. При
+    METRICS_ENABLED = False middleware отключается целиком.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        instrument_cache_backends()
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with capture() as log:
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        view = getattr(request.resolver_match, 'view_name', None)
+        view = view or 'unresolved'
+        metrics.REQUEST_LATENCY.observe(elapsed, view=view)
+        metrics.REQUEST_QUERIES.observe(log.count, view=view)
+        if not response.streaming:
+            metrics.RESPONSE_SIZE.observe(len(response.content), view=view)
+        for (kind, hit), total in log.cache.items():
+            metrics.CACHE_REQUESTS.inc(
+                total, cache=kind, result='hit' if hit else 'miss')
+        return response
@@ -0,0 +1,93 @@
+import cProfile
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from core.instrumentation import capture
+from core.profiling import SlowRequestSampler, dump_request
+
+
+logger = logging.getLogger('yatube.profiling')
+
+
+class ProfilingMiddleware:
+    """Профилирование запросов в продакшене без отладчика.
+
+    Доля PROFILING_SAMPLE_RATE запросов целиком идет под cProfile. Если
+    задан PROFILING_SLOW_MS, остальные запросы дольше порога сэмплируются
+    по стеку фоновым потоком; SQL-лог для них ведется только с момента,
+    когда запрос перешел порог, быстрые запросы платят только проверкой
+    флага в обертке.
+    Профиль, стеки и SQL-лог пишутся в PROFILING_DIR/<имя адреса>/.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.slow_ms = settings.PROFILING_SLOW_MS
+        self.directory = settings.PROFILING_DIR
+        if not self.sample_rate and not self.slow_ms:
+            raise MiddlewareNotUsed
+        self.sampler = None
+        if self.slow_ms:
+            self.sampler = SlowRequestSampler(
+                self.slow_ms / 1000, settings.PROFILING_INTERVAL_MS / 1000)
+
+    def __call__(self, request):
+        if self.sample_rate and random.random() < self.sample_rate:
+            return self.profile(request)
+        if self.sampler:
+            return self.watch(request)
+        return self.get_response(request)
+
+    def profile(self, request):
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        with capture() as log:
+            try:
+                profiler.enable()
+            except ValueError:
+                # В потоке уже работает другой профилировщик.
+                return self.get_response(request)
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        self.dump(request, response, time.perf_counter() - started, log,
+                  profiler=profiler)
+        return response
+
+    def watch(self, request):
+        started = time.perf_counter()
+        state = self.sampler.begin()
+        try:
+            # Обертка стоит весь запрос, но пишет в лог, только когда
+            # сэмплер отметит запрос медленным.
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(
+                        state.wrapper(alias)))
+                response = self.get_response(request)
+        finally:
+            self.sampler.end()
+        elapsed = time.perf_counter() - started
+        if elapsed * 1000 >= self.slow_ms:
+            self.dump(request, response, elapsed, state.log,
+                      stacks=state.stacks)
+        return response
+
+    def dump(self, request, response, elapsed, log, **kwargs):
+        try:
+            prefix = dump_request(
+                self.directory, request, response, elapsed, log, **kwargs)
+        except OSError:
+            logger.exception('Не удалось сохранить профиль запроса')
+        else:
+            logger.info(
+                'Профиль %s %s (%.0f мс): %s',
+                request.method, request.path, elapsed * 1000, prefix)
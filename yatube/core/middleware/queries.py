@@ -0,0 +1,44 @@
+import logging
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from core.instrumentation import capture
+from core.querycheck import (DuplicateQueriesError, check_threshold,
+                             find_duplicates, format_report)
+
+
+logger = logging.getLogger('yatube.queries')
+
+
+class DuplicateQueryMiddleware:
+    """Отладочная проверка N+1 для каждого запроса.
+
+    Запоминает источник каждого SQL-запроса - строку шаблона или кода -
+    и сообщает о формах, повторившихся QUERY_DUPLICATES_THRESHOLD раз.
+    При QUERY_DUPLICATES_RAISE вместо предупреждения в лог поднимает
+    DuplicateQueriesError, чтобы тесты с N+1 падали.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold = settings.QUERY_DUPLICATES_THRESHOLD
+        self.raise_errors = settings.QUERY_DUPLICATES_RAISE
+        if not self.threshold:
+            raise MiddlewareNotUsed
+        check_threshold(self.threshold)
+
+    def __call__(self, request):
+        with capture(origins=True) as log:
+            response = self.get_response(request)
+        duplicates = find_duplicates(log.queries, self.threshold)
+        if not duplicates:
+            return response
+        report = format_report(
+            duplicates, f'{request.method} {request.path}: N+1')
+        if self.raise_errors:
+            raise DuplicateQueriesError(report)
+        logger.warning(report)
+        response['X-Duplicate-Queries'] = sum(
+            duplicate.count for duplicate in duplicates)
+        return response
@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from core.db_router import routing_scope
+
+
+class ReplicaRouterMiddleware:
+    """Включает чтение с реплик для view с replica_reads = True.
+
+    После запроса с записью ставит cookie REPLICA_PIN_COOKIE со временем
+    окончания привязки; пока оно не прошло, все чтения клиента идут в
+    основную базу. Без DATABASE_REPLICAS middleware отключается.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.cookie = settings.REPLICA_PIN_COOKIE
+        self.pin_seconds = settings.REPLICA_PIN_SECONDS
+
+    def __call__(self, request):
+        with routing_scope(pinned=self.is_pinned(request)) as scope:
+            request.routing = scope
+            response = self.get_response(request)
+        if scope.wrote:
+            response.set_cookie(
+                self.cookie, str(int(time.time() + self.pin_seconds)),
+                max_age=self.pin_seconds, httponly=True,
+                samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', view_func)
+        request.routing.replicas = getattr(view_class, 'replica_reads', False)
+
+    def is_pinned(self, request):
+        try:
+            return float(request.COOKIES.get(self.cookie, 0)) > time.time()
+        except ValueError:
+            return False
@@ -0,0 +1,115 @@
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from core.staticfiles import ENCODINGS
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding без явно запрещенных (q=0)."""
+    accepted = set()
+    for value in header.split(','):
+        encoding, *params = [part.strip() for part in value.split(';')]
+        quality = 1.0
+        for param in params:
+            if param.startswith('q='):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if encoding and quality > 0:
+            accepted.add(encoding)
+    return accepted
+
+
+class PrecompressedStaticMiddleware:
+    """Раздает собранную статику из STATIC_ROOT с готовыми .br и .gz.
+
+    Кодировка выбирается по Accept-Encoding среди копий, которые
+    collectstatic записал заранее (core.staticfiles); ответ отдается без
+    сжатия на лету. Файлы с хешем в имени из манифеста получают
+    Cache-Control с immutable и сроком STATIC_IMMUTABLE_MAX_AGE, остальные -
+    STATIC_MAX_AGE. Без STATIC_SERVE_PRECOMPRESSED middleware
+    отключается, и статику раздает веб-сервер или runserver.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not settings.STATIC_SERVE_PRECOMPRESSED:
+            raise MiddlewareNotUsed
+        self.prefix = settings.STATIC_URL
+        self.root = settings.STATIC_ROOT
+        self.max_age = settings.STATIC_MAX_AGE
+        self.immutable_max_age = settings.STATIC_IMMUTABLE_MAX_AGE
+        # Собранная статика до перезапуска не меняется, поэтому варианты
+        # файла ищутся на диске один раз. Запоминаются только найденные
+        # файлы: иначе произвольные адреса под STATIC_URL копились бы в
+        # памяти без предела.
+        self.files = {}
+        self.hashed = set(
+            getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+    def __call__(self, request):
+        path = request.path_info
+        if (request.method not in ('GET', 'HEAD')
+                or not path.startswith(self.prefix)):
+            return self.get_response(request)
+        name = path[len(self.prefix):]
+        variants = self.variants(name)
+        if variants is None:
+            return self.get_response(request)
+        return self.serve(request, name, variants)
+
+    def variants(self, name):
+        """Пары (кодировка или None, путь, stat) для имени или None."""
+        if name in self.files:
+            return self.files[name]
+        try:
+            path = safe_join(self.root, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+        found = []
+        for encoding, extension in ENCODINGS:
+            if os.path.isfile(path + extension):
+                found.append((
+                    encoding, path + extension, os.stat(path + extension)))
+        found.append((None, path, os.stat(path)))
+        self.files[name] = found
+        return found
+
+    def serve(self, request, name, variants):
+        accepted = accepted_encodings(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        encoding, path, stat = next(
+            variant for variant in variants
+            if variant[0] is None or variant[0] in accepted)
+        if not was_modified_since(
+                request.META.get('HTTP_IF_MODIFIED_SINCE'),
+                stat.st_mtime, stat.st_size):
+            response = HttpResponseNotModified()
+        else:
+            content_type = mimetypes.guess_type(name)[0]
+            response = FileResponse(
+                open(path, 'rb'),
+                content_type=content_type or 'application/octet-stream')
+            response['Content-Length'] = stat.st_size
+            response['Last-Modified'] = http_date(stat.st_mtime)
+            if encoding:
+                response['Content-Encoding'] = encoding
+        if len(variants) > 1:
+            response['Vary'] = 'Accept-Encoding'
+        if name in self.hashed:
+            response['Cache-Control'] = (
+                f'public, max-age={self.immutable_max_age}, immutable')
+        else:
+            response['Cache-Control'] = f'public, max-age={self.max_age}'
+        return response
@@ -0,0 +1,91 @@
+import json
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from core.instrumentation import capture, instrument_cache_backends
+
+
+logger = logging.getLogger('yatube.timing')
+
+
+class ServerTimingMiddleware:
+    """Метрики запроса в заголовке Server-Timing и в строке лога.
+
+    Для доли запросов REQUEST_TIMING_SAMPLE_RATE замеряет время view,
+    рендеринга шаблона, число и время SQL-запросов, попадания и промахи
+    кеша. При нулевой доле middleware отключается целиком.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.REQUEST_TIMING_SAMPLE_RATE
+        self.send_header = settings.REQUEST_TIMING_HEADER
+        if not self.sample_rate:
+            raise MiddlewareNotUsed
+        instrument_cache_backends()
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        timing = request.timing = {}
+        started = time.perf_counter()
+        with capture() as log:
+            response = self.get_response(request)
+        finished = time.perf_counter()
+        if 'view_started' in timing and 'view' not in timing:
+            timing['view'] = finished - timing['view_started']
+
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': getattr(request.resolver_match, 'view_name', None),
+            'status': response.status_code,
+            'total_ms': self.ms(finished - started),
+            'view_ms': self.ms(timing.get('view', 0)),
+            'render_ms': self.ms(timing.get('render', 0)),
+            'sql_count': log.count,
+            'sql_ms': self.ms(log.sql_time),
+            'cache_hits': log.cache_hits,
+            'cache_misses': log.cache_misses,
+        }
+        if self.send_header:
+            response['Server-Timing'] = self.server_timing(record)
+        logger.info(json.dumps(record, ensure_ascii=False))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if hasattr(request, 'timing'):
+            request.timing['view_started'] = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        timing = getattr(request, 'timing', None)
+        if timing is None:
+            return response
+        render_started = time.perf_counter()
+        if 'view_started' in timing:
+            timing['view'] = render_started - timing['view_started']
+
+        def rendered(response):
+            timing['render'] = time.perf_counter() - render_started
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    @staticmethod
+    def ms(seconds):
+        return round(seconds * 1000, 3)
+
+    @staticmethod
+    def server_timing(record):
+        return ', '.join((
+            f'db;dur={record["sql_ms"]};desc="{record["sql_count"]} queries"',
+            f'view;dur={record["view_ms"]}',
+            f'tpl;dur={record["render_ms"]}',
+            (f'cache;desc="hit={record["cache_hits"]} '
+             f'miss={record["cache_misses"]}"'),
+            f'total;dur={record["total_ms"]}',
+        ))
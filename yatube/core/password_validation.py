@@ -0,0 +1,20 @@
+from django.contrib.auth import password_validation
+from django.utils.functional import cached_property
+
+
+class CommonPasswordValidator(password_validation.CommonPasswordValidator):
+    """CommonPasswordValidator, который читает сжатый список из 20 000
+    паролей при первой проверке, а не при создании.
+
+    Валидаторы создаются и ради подсказок в форме регистрации, где список
+    не нужен, поэтому каждый воркер иначе платит за чтение файла заранее.
+    """
+
+    def __init__(self, password_list_path=None):
+        self.password_list_path = (
+            password_list_path or self.DEFAULT_PASSWORD_LIST_PATH)
+
+    @cached_property
+    def passwords(self):
+        super().__init__(self.password_list_path)
+        return self.__dict__['passwords']
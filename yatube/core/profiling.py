@@ -0,0 +1,142 @@
+"""Профилирование отдельных запросов и сохранение результатов на диск."""
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from .instrumentation import QueryLog
+
+
+class SlowRequest:
+    """Состояние одного наблюдаемого запроса.
+
+    Обертки wrapper() ставит на соединения сам поток запроса; поток
+    сэмплера только поднимает флаг recording, после которого обертки
+    начинают писать запросы в log.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.stacks = Counter()
+        self.log = QueryLog()
+        self.recording = False
+
+    def wrapper(self, alias):
+        record = self.log.wrapper(alias)
+
+        def execute_wrapper(execute, sql, params, many, context):
+            if self.recording:
+                return record(execute, sql, params, many, context)
+            return execute(sql, params, many, context)
+        return execute_wrapper
+
+
+class SlowRequestSampler:
+    """Один фоновый поток на процесс, сэмплирующий стеки медленных запросов.
+
+    Пока запрос быстрее threshold, он не стоит ничего, кроме записи в
+    словарь. Дольше - поток раз в interval снимает стек его потока через
+    sys._current_frames() и копит свернутые стеки для flamegraph, а при
+    первом таком снимке включает SQL-лог запроса. В лог попадают только
+    запросы, выполненные после порога (с точностью до interval).
+    """
+
+    def __init__(self, threshold, interval):
+        self.threshold = threshold
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.active = {}
+        self.pid = None
+
+    def begin(self):
+        self.ensure_thread()
+        state = SlowRequest()
+        with self.lock:
+            self.active[threading.get_ident()] = state
+        return state
+
+    def end(self):
+        with self.lock:
+            self.active.pop(threading.get_ident())
+
+    def ensure_thread(self):
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid != os.getpid():
+                self.pid = os.getpid()
+                threading.Thread(
+                    target=self.run, name='slow-request-sampler',
+                    daemon=True
+                ).start()
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            now = time.monotonic()
+            frames = sys._current_frames()
+            with self.lock:
+                for ident, state in self.active.items():
+                    frame = frames.get(ident)
+                    if frame is None or now - state.started < self.threshold:
+                        continue
+                    state.recording = True
+                    state.stacks[collapse_stack(frame)] += 1
+
+
+def collapse_stack(frame):
+    """Стек в свернутом формате flamegraph: внешний;...;внутренний."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(
+            f'{os.path.basename(code.co_filename)}:{code.co_name}:'
+            f'{frame.f_lineno}')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def view_directory(base_dir, request):
+    """Каталог результатов для имени адреса: posts:index -> posts.index."""
+    match = getattr(request, 'resolver_match', None)
+    view_name = match.view_name if match else 'unresolved'
+    return os.path.join(base_dir, view_name.replace(':', '.'))
+
+
+def dump_request(base_dir, request, response, elapsed, log, profiler=None,
+                 stacks=None):
+    """Сохраняет профиль или стеки и SQL-лог запроса, возвращает префикс."""
+    directory = view_directory(base_dir, request)
+    os.makedirs(directory, exist_ok=True)
+    prefix = os.path.join(directory, (
+        f'{datetime.now():%Y%m%d-%H%M%S-%f}-{elapsed * 1000:.0f}ms-'
+        f'{os.getpid()}'
+    ))
+    if profiler is not None:
+        profiler.dump_stats(f'{prefix}.prof')
+    if stacks:
+        with open(f'{prefix}.stacks', 'w', encoding='utf-8') as output:
+            for stack, count in stacks.most_common():
+                output.write(f'{stack} {count}\n')
+    with open(f'{prefix}.sql.json', 'w', encoding='utf-8') as output:
+        json.dump({
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': getattr(response, 'status_code', None),
+            'elapsed_ms': round(elapsed * 1000, 3),
+            'sql_count': log.count,
+            'sql_ms': round(log.sql_time * 1000, 3),
+            'queries': [
+                {
+                    'alias': query.alias,
+                    'sql': query.sql,
+                    'params': None if query.many else repr(query.params),
+                    'ms': round(query.duration * 1000, 3),
+                }
+                for query in log.queries
+            ],
+        }, output, ensure_ascii=False, indent=2)
+    return prefix
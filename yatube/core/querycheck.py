@@ -0,0 +1,87 @@
+"""Поиск повторяющихся SQL-запросов (N+1) в рамках запроса или блока."""
+import re
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .instrumentation import capture
+
+
+DuplicateQuery = namedtuple('DuplicateQuery', 'fingerprint count origins')
+
+_IN_LIST = re.compile(r'\bIN \((?:\s*%s\s*,?)+\)', re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SPACES = re.compile(r'\s+')
+
+
+class DuplicateQueriesError(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    """Форма запроса без конкретных значений.
+
+    Литералы заменяются на ?, списки IN (%s, %s, ...) сворачиваются, так
+    что загрузки одного автора для разных постов дают одну форму.
+    """
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def check_threshold(threshold):
+    """Порог меньше 2 считал бы повтором любой одиночный запрос."""
+    if threshold < 2:
+        raise ValueError(
+            f'Порог повторов SQL-запросов должен быть не меньше 2: '
+            f'{threshold}')
+
+
+def find_duplicates(queries, threshold):
+    """Формы запросов, повторившиеся не меньше threshold раз."""
+    check_threshold(threshold)
+    groups = {}
+    for query in queries:
+        groups.setdefault(fingerprint(query.sql), []).append(query)
+    duplicates = [
+        DuplicateQuery(
+            shape, len(group),
+            Counter(query.origin for query in group)
+        )
+        for shape, group in groups.items()
+        if len(group) >= threshold
+    ]
+    return sorted(duplicates, key=lambda item: item.count, reverse=True)
+
+
+def format_report(duplicates, title='Повторяющиеся SQL-запросы'):
+    lines = [f'{title}:']
+    for duplicate in duplicates:
+        lines.append(f'  {duplicate.count} x {duplicate.fingerprint}')
+        for origin, count in duplicate.origins.most_common(3):
+            lines.append(f'      {count} x {origin}')
+    return '\n'.join(lines)
+
+
+@contextmanager
+def detect_duplicate_queries(threshold=None):
+    """Падает с DuplicateQueriesError, если в блоке нашлись N+1.
+
+    По умолчанию порог берется из settings.QUERY_DUPLICATES_THRESHOLD;
+    0 или None там отключают проверку.
+    """
+    if threshold is None:
+        threshold = settings.QUERY_DUPLICATES_THRESHOLD
+    if not threshold:
+        with capture() as log:
+            yield log
+        return
+    check_threshold(threshold)
+    with capture(origins=True) as log:
+        yield log
+    duplicates = find_duplicates(log.queries, threshold)
+    if duplicates:
+        raise DuplicateQueriesError(format_report(duplicates))
@@ -0,0 +1,41 @@
+"""Настройка подключений SQLite.
+
+configure_connection подключен к сигналу connection_created и выполняет
+PRAGMA из settings.SQLITE_PRAGMAS для каждого нового подключения:
+WAL позволяет читателям не блокировать писателя, busy_timeout заставляет
+ждать блокировку вместо немедленной ошибки «database is locked».
+"""
+import sqlite3
+
+from django.conf import settings
+
+
+def apply_pragmas(connection, pragmas):
+    """Выполняет PRAGMA на DB-API подключении SQLite."""
+    cursor = connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+    finally:
+        cursor.close()
+
+
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    if settings.SQLITE_PRAGMAS:
+        apply_pragmas(connection.connection, settings.SQLITE_PRAGMAS)
+
+
+def copy_database(source, target, pragmas=None):
+    """Копия базы через backup API, не останавливая работающие процессы."""
+    # Тестовая база в памяти задается URI file:...?mode=memory.
+    origin = sqlite3.connect(source, uri=source.startswith('file:'))
+    copy = sqlite3.connect(target)
+    try:
+        origin.backup(copy)
+        if pragmas:
+            apply_pragmas(copy, pragmas)
+    finally:
+        copy.close()
+        origin.close()
@@ -0,0 +1,140 @@
+"""Время старта процесса и разбивка по импортам.
+
+Каждая цель запускается в отдельном интерпретаторе с -X importtime:
+импорт yatube.wsgi (старт воркера) и manage.py version (минимальная
+цена любой management-команды: django.setup без работы самой команды).
+Отчет содержит медиану полного времени запуска, суммарное время
+импортов, самые дорогие пакеты и тяжелые модули из LAZY_MODULES,
+которые должны загружаться только по требованию.
+
+Django 2.2 импортирует distutils, и при setuptools в окружении это
+тянет pkg_resources; переменная окружения SETUPTOOLS_USE_DISTUTILS=stdlib
+у процессов воркеров убирает эту цену.
+"""
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+from .benchmarks import percentile
+
+
+STARTUP_TARGETS = {
+    'wsgi': ['-c', 'import yatube.wsgi'],
+    'manage': ['manage.py', 'version'],
+}
+
+# Окружение воркера продакшена: DEBUG выключен, прогрев при старте
+# (WARMUP_ON_START) включен.
+PRODUCTION_ENV = {'DJANGO_DEBUG': '0'}
+
+# Модули, нужные только части запросов или команд: при старте их быть
+# не должно.
+LAZY_MODULES = (
+    'PIL',
+    'sorl.thumbnail.engines',
+    'sorl.thumbnail.kvstores',
+    'django.test',
+    'django.contrib.auth.forms',
+    'requests',
+    'core.benchmarks',
+    'core.loadtest',
+)
+
+IMPORTTIME_LINE = re.compile(
+    r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def parse_importtime(output):
+    """Строки -X importtime: список (модуль, свое мкс, всего мкс,
+    глубина)."""
+    records = []
+    for line in output.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            own, total, indent, module = match.groups()
+            records.append(
+                (module, int(own), int(total), (len(indent) - 1) // 2))
+    return records
+
+
+def package_times(records):
+    """Свое время импорта по пакетам верхнего уровня, мс."""
+    totals = defaultdict(int)
+    for module, own, _, _ in records:
+        totals[module.split('.')[0]] += own
+    return {package: own / 1000 for package, own in totals.items()}
+
+
+def lazy_violations(records, lazy_modules=LAZY_MODULES):
+    modules = {module for module, _, _, _ in records}
+    return sorted(
+        lazy for lazy in lazy_modules
+        if any(module == lazy or module.startswith(lazy + '.')
+               for module in modules))
+
+
+def run_target(args, env=None):
+    """Один запуск цели; (полное время мс, записи importtime). env
+    дополняет окружение процесса, например PRODUCTION_ENV."""
+    env = {
+        **os.environ, 'DJANGO_SETTINGS_MODULE': 'yatube.settings',
+        **(env or {}),
+    }
+    started = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', *args],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - started) * 1000
+    if process.returncode:
+        raise RuntimeError(
+            f'{" ".join(args)}: код {process.returncode}\n'
+            f'{process.stderr[-2000:]}')
+    return wall_ms, parse_importtime(process.stderr)
+
+
+def profile_startup(runs=5, top=15, targets=STARTUP_TARGETS):
+    results = {}
+    for name, args in targets.items():
+        wall, imports, records = [], [], []
+        for _ in range(runs):
+            wall_ms, records = run_target(args)
+            wall.append(wall_ms)
+            imports.append(sum(own for _, own, _, _ in records) / 1000)
+        packages = sorted(
+            package_times(records).items(), key=lambda item: -item[1])
+        results[name] = {
+            'wall_ms': round(percentile(wall, 50), 3),
+            'imports_ms': round(percentile(imports, 50), 3),
+            'modules': len(records),
+            'packages': [
+                [package, round(ms, 3)] for package, ms in packages[:top]
+            ],
+            'lazy_violations': lazy_violations(records),
+        }
+    return results
+
+
+def compare_startup(baseline, current, tolerance=0.2, min_delta_ms=20.0):
+    """Регрессии старта относительно baseline: рост полного времени больше
+    чем на tolerance и min_delta_ms или тяжелые модули при старте."""
+    regressions = []
+    for name, result in sorted(current.items()):
+        for module in result['lazy_violations']:
+            regressions.append(f'{name}: при старте загружен {module}')
+        before = baseline.get(name)
+        if not before:
+            continue
+        limit = max(
+            before['wall_ms'] * (1 + tolerance),
+            before['wall_ms'] + min_delta_ms,
+        )
+        if result['wall_ms'] > limit:
+            regressions.append(
+                f'{name}: старт {before["wall_ms"]} мс '
+                f'-> {result["wall_ms"]} мс')
+    return regressions
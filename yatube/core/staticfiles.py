@@ -0,0 +1,80 @@
+"""Статика с хешами в именах и заранее сжатыми копиями.
+
+CompressedManifestStaticFilesStorage при collectstatic кладет рядом с
+каждым файлом с хешем в имени (bootstrap.3f2a9c.min.css) его сжатые
+копии .gz и .br (пакет brotli из requirements.txt; без него collectstatic
+предупреждает и пишет только .gz). Копия не пишется, если сжатие почти
+ничего не дает (картинки, шрифты). Раздает их
+core.middleware.static.PrecompressedStaticMiddleware: при запросе
+ничего не сжимается.
+"""
+import gzip
+import logging
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+
+logger = logging.getLogger('yatube.staticfiles')
+
+# Кодировки в порядке предпочтения и расширения их копий.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Сжатая копия пишется, только если она меньше этой доли исходного файла.
+MIN_RATIO = 0.95
+
+SKIP_EXTENSIONS = (
+    '.br', '.gz', '.png', '.jpg', '.jpeg', '.gif', '.webp', '.woff',
+    '.woff2', '.zip',
+)
+
+
+def gzip_compress(content):
+    # mtime=0: одинаковый файл дает одинаковую копию при каждой сборке.
+    return gzip.compress(content, compresslevel=9, mtime=0)
+
+
+def brotli_compress(content):
+    """Сжатие brotli или None, если пакет brotli не установлен."""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(content, quality=11)
+
+
+COMPRESSORS = {'br': brotli_compress, 'gzip': gzip_compress}
+
+
+def compress_file(path):
+    """Пишет сжатые копии файла; список записанных путей."""
+    if path.endswith(SKIP_EXTENSIONS):
+        return []
+    with open(path, 'rb') as source:
+        content = source.read()
+    written = []
+    for encoding, extension in ENCODINGS:
+        compressed = COMPRESSORS[encoding](content)
+        if compressed is None or len(compressed) >= len(content) * MIN_RATIO:
+            continue
+        with open(path + extension, 'wb') as output:
+            output.write(compressed)
+        written.append(path + extension)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage, который после обработки сжимает
+    файлы с хешами в именах."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        if brotli_compress(b'') is None:
+            logger.warning(
+                'Пакет brotli не установлен: копии .br не пишутся, '
+                'статика сжимается только gzip')
+        # Итоговые имена из манифеста: css проходит обработку несколько
+        # раз, и промежуточные имена в ссылках не встречаются.
+        for hashed_name in set(self.hashed_files.values()):
+            compress_file(self.path(hashed_name))
@@ -0,0 +1,71 @@
+"""Разбор шаблонов до первого запроса.
+
+С cached.Loader (settings.TEMPLATES вне режима отладки) шаблон
+разбирается при первом обращении и дальше берется из памяти процесса.
+Без прогрева первый запрос каждого воркера платит за разбор base.html,
+header.html, posts.html и остальных include. precompile_templates
+разбирает все шаблоны из DIRS заранее; yatube/wsgi.py вызывает ее до
+того, как воркер начнет принимать запросы.
+"""
+import logging
+import os
+import time
+
+from django.template import Engine, TemplateSyntaxError
+from django.template.loaders.cached import Loader as CachedLoader
+
+
+logger = logging.getLogger('yatube.templates')
+
+TEMPLATE_EXTENSIONS = ('.html', '.txt')
+
+
+def template_names(engine=None):
+    """Имена всех шаблонов из DIRS движка."""
+    engine = engine or Engine.get_default()
+    names = set()
+    for directory in engine.dirs:
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if filename.endswith(TEMPLATE_EXTENSIONS):
+                    path = os.path.relpath(
+                        os.path.join(root, filename), directory)
+                    names.add(path.replace(os.sep, '/'))
+    return sorted(names)
+
+
+def cached_loaders(engine=None):
+    engine = engine or Engine.get_default()
+    return [
+        loader for loader in engine.template_loaders
+        if isinstance(loader, CachedLoader)
+    ]
+
+
+def reset_templates(engine=None):
+    """Забывает разобранные шаблоны, как в только что запущенном воркере."""
+    for loader in cached_loaders(engine):
+        loader.reset()
+
+
+def precompile_templates(engine=None):
+    """Разбирает шаблоны в кеш загрузчика; число разобранных шаблонов.
+
+    Без cached.Loader разбор не сохраняется, и функция ничего не делает.
+    Шаблон с ошибкой пропускается: ее покажет первый запрос к нему.
+    """
+    engine = engine or Engine.get_default()
+    if not cached_loaders(engine):
+        return 0
+    started = time.perf_counter()
+    compiled = 0
+    for name in template_names(engine):
+        try:
+            engine.get_template(name)
+        except TemplateSyntaxError as error:
+            logger.error('Шаблон %s не разобран: %s', name, error)
+        else:
+            compiled += 1
+    logger.info('Разобрано шаблонов: %d за %.1f мс', compiled,
+                (time.perf_counter() - started) * 1000)
+    return compiled
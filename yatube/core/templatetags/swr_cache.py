@@ -0,0 +1,53 @@
+from django import template
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.templatetags.cache import CacheNode
+
+from core.cache.stampede import get_or_compute
+
+
+register = template.Library()
+
+
+class SWRCacheNode(CacheNode):
+    """Как {% cache %}, но пересчитывает фрагмент через get_or_compute:
+    один запрос рендерит, остальные получают прежнюю версию."""
+
+    def render(self, context):
+        try:
+            expire_time = int(self.expire_time_var.resolve(context))
+        except (template.VariableDoesNotExist, ValueError, TypeError):
+            raise template.TemplateSyntaxError(
+                f'"swr_cache" ожидает число секунд: '
+                f'{self.expire_time_var.token!r}')
+        cache_name = 'default'
+        if self.cache_name:
+            cache_name = self.cache_name.resolve(context)
+        try:
+            fragment_cache = caches[cache_name]
+        except InvalidCacheBackendError:
+            raise template.TemplateSyntaxError(
+                f'"swr_cache": неизвестный кеш {cache_name!r}')
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        return get_or_compute(
+            make_template_fragment_key(self.fragment_name, vary_on),
+            lambda: self.nodelist.render(context),
+            expire_time, fragment_cache)
+
+
+@register.tag
+def swr_cache(parser, token):
+    """{% swr_cache <секунды> <имя> [переменные...] [using="кеш"] %}"""
+    nodelist = parser.parse(('endswr_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f'"{tokens[0]}" ожидает срок и имя фрагмента')
+    cache_name = None
+    if len(tokens) > 3 and tokens[-1].startswith('using='):
+        cache_name = parser.compile_filter(tokens[-1][len('using='):])
+        tokens = tokens[:-1]
+    return SWRCacheNode(
+        nodelist, parser.compile_filter(tokens[1]), tokens[2],
+        [parser.compile_filter(bit) for bit in tokens[3:]], cache_name)
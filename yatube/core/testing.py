@@ -0,0 +1,107 @@
+"""Бюджеты SQL-запросов для тестов с эталонами в репозитории.
+
+Тест выполняет сценарий внутри assertQueryBudget, а число запросов и их
+формы сравниваются с JSON-эталоном. Тест падает, если запросов стало
+больше или появилась новая форма, план которой читает таблицу целиком.
+Чтобы перезаписать эталоны после осознанного изменения, тесты
+запускают с переменной окружения UPDATE_QUERY_BUDGETS=1.
+"""
+import json
+import os
+from collections import Counter
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .explain import WARNING, plan_flags, query_plan
+from .instrumentation import capture
+from .querycheck import fingerprint
+
+
+UPDATE_ENV = 'UPDATE_QUERY_BUDGETS'
+UNINDEXED = {'full_scan', 'automatic_index'}
+
+
+@contextmanager
+def commit_callbacks(using=DEFAULT_DB_ALIAS):
+    """Выполняет на выходе из блока transaction.on_commit, добавленные в
+    нем: TestCase не фиксирует транзакцию теста и сам их не вызывает
+    (в Django 3.2 для этого есть captureOnCommitCallbacks)."""
+    connection = connections[using]
+    start = len(connection.run_on_commit)
+    yield
+    callbacks = connection.run_on_commit[start:]
+    del connection.run_on_commit[start:]
+    for _, callback in callbacks:
+        callback()
+
+
+def query_profile(log):
+    """Число запросов и формы с замечаниями к планам."""
+    counts, samples = Counter(), {}
+    for query in log.queries:
+        shape = fingerprint(query.sql)
+        counts[shape] += 1
+        samples.setdefault(shape, query)
+    shapes = []
+    for shape in sorted(counts):
+        query = samples[shape]
+        flags = []
+        if shape.upper().startswith('SELECT') and not query.many:
+            plan = query_plan(query.alias, query.sql, query.params)
+            flags = sorted({
+                flag.kind
+                for flag in plan_flags(plan, connections[query.alias].vendor)
+                if flag.severity == WARNING
+            })
+        shapes.append(
+            {'fingerprint': shape, 'count': counts[shape], 'flags': flags})
+    return {'count': log.count, 'shapes': shapes}
+
+
+def budget_violations(golden, current):
+    """Отличия от эталона, из-за которых тест должен упасть."""
+    problems = []
+    if current['count'] > golden['count']:
+        problems.append(
+            f'SQL-запросов было {golden["count"]}, стало {current["count"]}')
+    known = {shape['fingerprint'] for shape in golden['shapes']}
+    for shape in current['shapes']:
+        unindexed = UNINDEXED.intersection(shape['flags'])
+        if shape['fingerprint'] not in known and unindexed:
+            problems.append(
+                f'новая форма без индекса ({", ".join(sorted(unindexed))}): '
+                f'{shape["fingerprint"]}')
+    return problems
+
+
+class QueryBudgetMixin:
+    """Примесь к TestCase; query_budget_dir - каталог эталонов."""
+
+    query_budget_dir = None
+
+    def assertQueryBudget(self, name, scenario):
+        """Выполняет scenario() с холодным кешем и сверяет запросы."""
+        cache.clear()
+        with capture() as log:
+            result = scenario()
+        current = query_profile(log)
+        path = os.path.join(self.query_budget_dir, f'{name}.json')
+
+        if os.environ.get(UPDATE_ENV):
+            os.makedirs(self.query_budget_dir, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as golden_file:
+                json.dump(current, golden_file, ensure_ascii=False, indent=2)
+                golden_file.write('\n')
+            return result
+
+        if not os.path.exists(path):
+            self.fail(f'Нет эталона {path}, запустите тесты с {UPDATE_ENV}=1')
+        with open(path, encoding='utf-8') as golden_file:
+            golden = json.load(golden_file)
+        problems = budget_violations(golden, current)
+        if problems:
+            self.fail(f'Бюджет запросов «{name}» превышен:\n' + '\n'.join(
+                problems))
+        return result
@@ -0,0 +1,84 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import Post, Group, Follow
+from ..benchmarks import build_cases, compare, percentile
+
+
+User = get_user_model()
+
+
+class BenchmarkHelpersTests(TestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_compare_flags_regressions(self):
+        """Рост числа запросов и p95 считается регрессией"""
+        baseline = {
+            'posts:index anonymous shallow': {'p95_ms': 10.0, 'queries': 3},
+            'about:tech anonymous shallow': {'p95_ms': 10.0, 'queries': 0},
+        }
+        current = {
+            'posts:index anonymous shallow': {'p95_ms': 10.5, 'queries': 4},
+            'about:tech anonymous shallow': {'p95_ms': 30.0, 'queries': 0},
+        }
+        regressions = compare(baseline, current)
+        self.assertEqual(len(regressions), 2)
+
+    def test_compare_ignores_noise(self):
+        baseline = {'about:tech anonymous shallow': {
+            'p95_ms': 1.0, 'queries': 0}}
+        current = {'about:tech anonymous shallow': {
+            'p95_ms': 2.5, 'queries': 0}}
+        self.assertEqual(compare(baseline, current), [])
+
+
+class BenchViewsCommandTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='reader')
+        cls.author = User.objects.create(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test_group', description='-')
+        for i in range(12):
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group)
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def test_cases_cover_named_urls(self):
+        """Замеры покрывают адреса posts, users и about"""
+        keys = {key for key, _, _ in build_cases(BenchViewsCommandTests.user)}
+        for expected in ('posts:index user deep',
+                         'posts:follow_index anonymous shallow',
+                         'users:signup anonymous shallow',
+                         'about:author user shallow'):
+            with self.subTest(key=expected):
+                self.assertIn(expected, keys)
+
+    def test_command_writes_and_compares_baseline(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            call_command(
+                'bench_views', '--iterations', '1', '--warmup', '0',
+                '--output', path, stdout=StringIO()
+            )
+            with open(path, encoding='utf-8') as baseline:
+                results = json.load(baseline)
+            self.assertEqual(
+                results['posts:index anonymous shallow']['status'], 200)
+            out = StringIO()
+            call_command(
+                'bench_views', '--iterations', '1', '--warmup', '0',
+                '--compare', path, '--tolerance', '100', stdout=out
+            )
+            self.assertIn('Регрессий нет', out.getvalue())
@@ -0,0 +1,231 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.test import SimpleTestCase, override_settings
+
+from ..benchmarks import private_cache
+from ..cache import tiered
+from ..cache.sqlite import SQLiteCache
+
+
+def _increment(path, times):
+    cache = SQLiteCache(path, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.path, {'OPTIONS': options})
+
+    def test_values_shared_between_instances(self):
+        """Запись и удаление видны другому экземпляру с тем же файлом"""
+        other = self.make_cache()
+        self.cache.set('key', {'text': 'значение'})
+        self.assertEqual(other.get('key'), {'text': 'значение'})
+        other.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_expired_value_not_returned(self):
+        self.cache.set('key', 'value', timeout=0.05)
+        self.assertTrue(self.cache.add('other', 'value', timeout=0.05))
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertFalse(self.cache.has_key('key'))
+        self.assertTrue(self.cache.add('other', 'new'))
+        self.assertEqual(self.cache.get('other'), 'new')
+
+    def test_add_touch_and_many(self):
+        self.assertTrue(self.cache.add('key', 1))
+        self.assertFalse(self.cache.add('key', 2))
+        self.assertTrue(self.cache.touch('key', None))
+        self.assertFalse(self.cache.touch('missing'))
+        self.cache.set_many({'a': 1, 'b': [2]})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'missing', 'key']),
+            {'a': 1, 'b': [2], 'key': 1})
+        self.cache.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get_many(['a', 'b']), {})
+        self.cache.clear()
+        self.assertEqual(self.cache.usage(), {'entries': 0, 'bytes': 0})
+
+    def test_incr_decr(self):
+        self.cache.set('counter', 10)
+        self.assertEqual(self.cache.incr('counter', 5), 15)
+        self.assertEqual(self.cache.decr('counter'), 14)
+        self.assertEqual(self.cache.get('counter'), 14)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_delete_prefixed(self):
+        self.cache.set_many({'feed:1': 1, 'feed:2': 2, 'obj:1': 3, 'other': 4})
+        self.cache.delete_prefixed(['feed:', 'obj:'])
+        self.assertEqual(
+            self.cache.get_many(['feed:1', 'feed:2', 'obj:1', 'other']),
+            {'other': 4})
+
+    def test_incr_atomic_across_processes(self):
+        """Одновременные incr из разных процессов не теряют обновлений"""
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=_increment, args=(self.path, 50))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+
+    def test_max_entries_evicts_least_recently_used(self):
+        cache = self.make_cache(
+            MAX_ENTRIES=3, CULL_FREQUENCY=3, ACCESS_RESOLUTION=0)
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key)
+            time.sleep(0.01)
+        cache.get('a')
+        cache.set('d', 'd')
+        self.assertEqual(cache.get_many(['a', 'b', 'c', 'd']),
+                         {'a': 'a', 'c': 'c', 'd': 'd'})
+
+    def test_max_size_limits_total_bytes(self):
+        cache = self.make_cache(MAX_SIZE=4096, CULL_FREQUENCY=4)
+        for number in range(20):
+            cache.set(f'key{number}', 'x' * 500)
+        usage = cache.usage()
+        self.assertLessEqual(usage['bytes'], 4096)
+        self.assertGreater(usage['entries'], 0)
+        self.assertEqual(cache.get('key19'), 'x' * 500)
+
+
+def _run_in_child(action):
+    process = multiprocessing.get_context('fork').Process(target=action)
+    process.start()
+    process.join()
+
+
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings = override_settings(CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+            },
+            'tiered': {
+                'BACKEND': 'core.cache.tiered.TieredCache',
+                'LOCATION': 'tiered_l2',
+                'OPTIONS': {
+                    'L1_TIMEOUT': 60,
+                    'L1_TIMEOUTS': {'shared-only:': 0},
+                    'CHECK_INTERVAL': 0.05,
+                },
+            },
+            'tiered_l2': {
+                'BACKEND': 'core.cache.sqlite.SQLiteCache',
+                'LOCATION': os.path.join(self.directory, 'cache.sqlite3'),
+            },
+        })
+        self.settings.enable()
+        tiered._tiers.clear()
+        self.cache = caches['tiered']
+        self.l2 = caches['tiered_l2']
+
+    def tearDown(self):
+        self.settings.disable()
+        tiered._tiers.clear()
+        shutil.rmtree(self.directory)
+
+    def test_repeated_reads_served_from_memory(self):
+        self.l2.set('key', 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        # Запись мимо журнала не видна, пока не истек срок L1.
+        self.l2.delete('key')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertIsNone(self.cache.get('missing'))
+        stats = self.cache.stats()
+        self.assertEqual((stats['l1'], stats['l2'], stats['miss']), (1, 1, 1))
+        self.assertEqual(stats['l1_ratio'], 1 / 3)
+        self.assertEqual(stats['l2_ratio'], 1 / 2)
+
+    def test_l1_timeout_per_prefix(self):
+        self.cache.set('shared-only:key', 'value')
+        self.l2.delete('shared-only:key')
+        self.assertIsNone(self.cache.get('shared-only:key'))
+
+    def test_writes_invalidate_other_processes(self):
+        """Запись в другом процессе выбрасывает ключ из L1 этого"""
+        self.cache.set_many({'changed': 'old', 'deleted': 'old'})
+        self.assertEqual(self.cache.get('changed'), 'old')
+
+        def write():
+            cache = caches['tiered']
+            cache.set('changed', 'new')
+            cache.delete('deleted')
+        _run_in_child(write)
+
+        time.sleep(0.1)
+        self.assertEqual(
+            self.cache.get_many(['changed', 'deleted']), {'changed': 'new'})
+
+    def test_clear_in_other_process(self):
+        self.cache.set('key', 'value')
+        _run_in_child(lambda: caches['tiered'].clear())
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_counters_stay_atomic(self):
+        self.cache.set('counter', 1)
+        _run_in_child(lambda: caches['tiered'].incr('counter', 10))
+        self.assertEqual(self.cache.incr('counter'), 12)
+        self.assertEqual(self.cache.get('counter'), 12)
+
+    def test_write_and_log_in_one_transaction(self):
+        """Значение и запись журнала - одна транзакция, журнал не занимает
+        места значений"""
+        statements = []
+        self.l2.connection.set_trace_callback(statements.append)
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.cache.delete('a')
+        self.l2.connection.set_trace_callback(None)
+        self.assertEqual(
+            [sql for sql in statements if sql.startswith('BEGIN')],
+            ['BEGIN IMMEDIATE'] * 2)
+        self.assertEqual(self.l2.usage()['entries'], 1)
+        self.assertEqual(self.l2.log_sequence(), 2)
+
+    def test_delete_prefixed_in_other_process(self):
+        self.cache.set_many({'feed:1': 'value', 'other': 'value'})
+        _run_in_child(lambda: caches['tiered'].delete_prefixed(['feed:']))
+        time.sleep(0.1)
+        self.assertEqual(
+            self.cache.get_many(['feed:1', 'other']), {'other': 'value'})
+
+
+class CacheIsolationTests(SimpleTestCase):
+    def test_tests_do_not_use_server_cache(self):
+        self.assertNotEqual(
+            os.path.dirname(settings.CACHES['shared']['LOCATION']),
+            settings.BASE_DIR)
+
+    def test_private_cache_leaves_shared_cache(self):
+        cache.set('isolation:key', 'shared')
+        self.addCleanup(cache.delete, 'isolation:key')
+        with private_cache():
+            self.assertIsNone(cache.get('isolation:key'))
+            cache.set('isolation:key', 'private')
+            cache.clear()
+        self.assertEqual(caches['shared'].get('isolation:key'), 'shared')
@@ -0,0 +1,106 @@
+import os
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import (Client, SimpleTestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from posts.models import Post
+from ..db_router import ReplicaRouter, routing_scope
+from ..instrumentation import capture
+
+
+User = get_user_model()
+
+
+@contextmanager
+def replica_alias(alias, name=None):
+    """Временный алиас базы, по умолчанию на ту же тестовую базу."""
+    default = connections.databases['default']
+    connections.databases[alias] = {
+        **default, 'NAME': name or default['NAME']}
+    try:
+        yield alias
+    finally:
+        connections[alias].close()
+        del connections[alias]
+        del connections.databases[alias]
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_outside_replica_views_use_primary(self):
+        """Вне разрешенных view чтения идут по умолчанию"""
+        self.assertIsNone(self.router.db_for_read(Post))
+        with routing_scope():
+            self.assertIsNone(self.router.db_for_read(Post))
+
+    def test_reads_use_replica_until_write(self):
+        """После записи чтения того же запроса идут в основную базу"""
+        with routing_scope() as scope:
+            scope.replicas = True
+            self.assertEqual(self.router.db_for_read(Post), 'replica')
+            self.assertEqual(self.router.db_for_write(Post), 'default')
+            self.assertTrue(scope.wrote)
+            self.assertIsNone(self.router.db_for_read(Post))
+
+    def test_pinned_scope_uses_primary(self):
+        """Клиент с cookie привязки читает основную базу"""
+        with routing_scope(pinned=True) as scope:
+            scope.replicas = True
+            self.assertIsNone(self.router.db_for_read(Post))
+
+
+class ReplicaMiddlewareTests(TransactionTestCase):
+    def setUp(self):
+        self.author = User.objects.create(username='replica_author')
+        self.post = Post.objects.create(
+            text='Тестовый пост', author=self.author)
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def post_aliases(self, url):
+        cache.clear()
+        with capture() as log:
+            self.client.get(url)
+        return {
+            query.alias for query in log.queries
+            if 'posts_post' in query.sql
+        }
+
+    def test_feed_reads_replica_and_sticks_after_write(self):
+        """Лента читает реплику, после комментария - основную базу"""
+        with replica_alias('replica'), override_settings(
+                DATABASE_REPLICAS=['replica']):
+            index = reverse('posts:index')
+            self.assertEqual(self.post_aliases(index), {'replica'})
+            response = self.client.post(
+                reverse('posts:add_comment',
+                        kwargs={'post_id': self.post.pk}),
+                {'text': 'Новый комментарий'})
+            self.assertIn('primary_pin', response.cookies)
+            self.assertEqual(self.post_aliases(index), {'default'})
+
+    def test_sync_replica_copies_database(self):
+        """sync_replica копирует основную базу в файл реплики"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'replica.sqlite3')
+            with replica_alias('replica', path):
+                call_command('sync_replica', 'replica', stdout=StringIO())
+            copy = sqlite3.connect(path)
+            try:
+                count = copy.execute(
+                    'SELECT COUNT(*) FROM posts_post').fetchone()[0]
+            finally:
+                copy.close()
+        self.assertEqual(count, 1)
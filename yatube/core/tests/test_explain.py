@@ -0,0 +1,104 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post
+from ..explain import ShapeCollector, explain_shapes, plan_flags
+
+
+User = get_user_model()
+
+
+class PlanFlagsTests(TestCase):
+    def test_sqlite_plan_flags(self):
+        """Полный скан, временное B-дерево и некрывающий индекс"""
+        plan = [
+            'SCAN posts_post',
+            'SEARCH auth_user USING INTEGER PRIMARY KEY (rowid=?)',
+            'SEARCH posts_comment USING INDEX posts_comment_post (post_id=?)',
+            'SEARCH posts_follow USING COVERING INDEX follow_user (user_id=?)',
+            'SEARCH auth_user USING INDEX sqlite_autoindex_auth_user_1 (x=?)',
+            'USE TEMP B-TREE FOR ORDER BY',
+        ]
+        kinds = [flag.kind for flag in plan_flags(plan, 'sqlite')]
+        self.assertEqual(kinds, ['full_scan', 'not_covering', 'temp_btree'])
+
+    def test_postgres_plan_flags(self):
+        """Seq Scan и Sort в текстовом плане PostgreSQL"""
+        plan = [
+            'Limit  (cost=1.0..2.0 rows=10 width=8)',
+            '  ->  Sort  (cost=1.0..1.5 rows=100 width=8)',
+            '        Sort Key: created DESC',
+            '        ->  Seq Scan on posts_post  (cost=0.0..1.0)',
+        ]
+        kinds = [flag.kind for flag in plan_flags(plan, 'postgresql')]
+        self.assertEqual(kinds, ['temp_btree', 'full_scan'])
+
+
+class ExplainQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='TestUser')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug',
+            description='Тестовое описание')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.user, group=cls.group)
+            for i in range(15)
+        )
+
+    def test_shapes_are_deduplicated(self):
+        """Запросы одной формы с разными значениями - одна форма"""
+        collector = ShapeCollector()
+        sql = 'SELECT "id" FROM "posts_post" WHERE "id" = %s'
+        collector.add('default', sql, (1,), 'posts:post_detail')
+        collector.add('default', sql, (2,), 'posts:post_detail')
+        collector.add('default', sql, (3,), 'posts:post_edit')
+        collector.add('default', 'UPDATE "posts_post" SET "text" = %s',
+                      ('x',), 'posts:post_edit')
+        report = explain_shapes(collector)
+        self.assertEqual(len(report), 1)
+        self.assertEqual(report[0]['count'], 3)
+        self.assertEqual(
+            report[0]['views'], ['posts:post_detail', 'posts:post_edit'])
+        self.assertTrue(report[0]['plan'])
+
+    def test_command_reports_feed_plans(self):
+        """Команда обходит адреса и находит сортировку ленты"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'plans.json')
+            call_command('explain_queries', output=path, stdout=StringIO())
+            with open(path, encoding='utf-8') as report_file:
+                report = json.load(report_file)
+        index = [item for item in report if 'posts:index' in item['views']
+                 and item['fingerprint'].startswith('SELECT "posts_post"')]
+        self.assertTrue(index)
+        self.assertIn('temp_btree', {
+            flag['kind'] for item in index for flag in item['flags']})
+
+    def test_middleware_captures_new_shapes_once(self):
+        """Middleware пишет каждую новую форму один раз"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'shapes.jsonl')
+            with override_settings(EXPLAIN_CAPTURE_FILE=path):
+                client = Client()
+                client.get(reverse('posts:group_posts', args=['test-slug']))
+                client.get(reverse('posts:group_posts', args=['test-slug']))
+            with open(path, encoding='utf-8') as capture_file:
+                records = [json.loads(line) for line in capture_file]
+            output = StringIO()
+            call_command('explain_queries', input=path, verbose=True,
+                         stdout=output)
+        self.assertTrue(records)
+        self.assertEqual(
+            {record['view'] for record in records}, {'posts:group_posts'})
+        self.assertEqual(len(records), len({
+            record['sql'] for record in records}))
+        self.assertIn(f'Форм запросов: {len(records)}', output.getvalue())
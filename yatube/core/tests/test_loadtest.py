@@ -0,0 +1,94 @@
+import random
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TransactionTestCase
+
+from posts.models import Post, Group, Comment
+from yatube.wsgi import application
+from ..clients import WSGISession
+from ..loadtest import LoadTest, Recorder, VirtualUser, build_catalog
+
+
+User = get_user_model()
+
+
+class RecorderTests(SimpleTestCase):
+    def test_report_contains_timeline_and_errors(self):
+        recorder = Recorder(interval=10)
+        recorder.add('index', 0.010, True)
+        recorder.add('index', 0.030, False)
+        recorder.add_lock_error()
+        recorder.add_login_error()
+        report = recorder.report(duration=2)
+        self.assertEqual(report['total']['requests'], 2)
+        self.assertEqual(report['total']['rps'], 1)
+        self.assertEqual(report['total']['error_rate'], 0.5)
+        self.assertEqual(report['total']['lock_errors'], 1)
+        self.assertEqual(report['total']['login_errors'], 1)
+        self.assertEqual(len(report['timeline']), 1)
+
+
+class LoadTestRunTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='load_0', password='load-test')
+        self.group = Group.objects.create(
+            title='Тестовая группа', slug='test_group', description='-')
+        for i in range(3):
+            Post.objects.create(
+                text=f'Пост {i}', author=self.user, group=self.group)
+
+    def test_wsgi_session_keeps_cookies(self):
+        """Сессия передает приложению cookies из прошлых ответов"""
+        session = WSGISession(application)
+        self.assertEqual(
+            session.request('GET', '/auth/login/'), HTTPStatus.OK)
+        self.assertIn('csrftoken', session.cookies)
+        status = session.request('POST', '/auth/login/', {
+            'username': 'load_0',
+            'password': 'load-test',
+            'csrfmiddlewaretoken': session.cookies['csrftoken'],
+        })
+        self.assertEqual(status, HTTPStatus.FOUND)
+        self.assertIn('sessionid', session.cookies)
+
+    def test_load_test_runs_scenarios(self):
+        """Виртуальный пользователь авторизуется и пишет комментарии"""
+        load_test = LoadTest(
+            lambda: WSGISession(application),
+            [('load_0', 'load-test')],
+            build_catalog(),
+            concurrency=1,
+            duration=0.5,
+            scenarios={'post': 1, 'comment': 1},
+            seed=1,
+        )
+        report = load_test.run()
+        self.assertGreater(report['total']['requests'], 0)
+        self.assertEqual(report['total']['error_rate'], 0)
+        self.assertTrue(Comment.objects.exists())
+
+    def test_failed_login_stops_virtual_user(self):
+        """Пользователь с неверным паролем не гоняет сценарии"""
+        load_test = LoadTest(
+            lambda: WSGISession(application),
+            [('load_0', 'wrong')],
+            build_catalog(),
+            concurrency=1,
+            duration=0.2,
+            scenarios={'post': 1},
+        )
+        report = load_test.run()
+        self.assertEqual(report['total']['login_errors'], 1)
+        self.assertEqual(report['total']['requests'], 0)
+
+    def test_redirect_to_login_is_error(self):
+        """Редирект на вход не считается успешным ответом"""
+        user = VirtualUser(
+            WSGISession(application), 'load_0', 'load-test', {},
+            random.Random(1))
+        self.assertEqual(user.follow_feed(), HTTPStatus.FOUND)
+        self.assertTrue(user.redirected_to_login())
+        self.assertTrue(user.login())
+        self.assertFalse(user.redirected_to_login())
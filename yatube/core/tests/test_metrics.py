@@ -0,0 +1,113 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from ..metrics import (DB_POOL_CONNECTIONS, INITIAL_SIZE, MmapStore,
+                       collect, series)
+
+
+User = get_user_model()
+
+
+class MmapStoreTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def store(self, pid):
+        return MmapStore(os.path.join(self.directory, f'metrics_{pid}.db'))
+
+    def test_values_are_summed_across_processes(self):
+        """Одинаковые ряды из файлов разных воркеров складываются"""
+        first, second = self.store(1), self.store(2)
+        first.inc('requests_total{view="a"}')
+        first.inc('requests_total{view="a"}', 2)
+        second.inc('requests_total{view="a"}', 4)
+        second.inc('requests_total{view="b"}')
+        totals = collect(self.directory)
+        self.assertEqual(totals['requests_total{view="a"}'], 7)
+        self.assertEqual(totals['requests_total{view="b"}'], 1)
+
+    def test_dead_process_gauges_dropped_and_counters_kept(self):
+        """Файл завершившегося процесса уходит в архив без gauge"""
+        # pid завершившегося и уже собранного дочернего процесса.
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        process.wait()
+        dead = self.store(process.pid)
+        gauge = series(DB_POOL_CONNECTIONS.name, {'state': 'idle'})
+        dead.inc('requests_total', 3)
+        dead.set(gauge, 5)
+        alive = self.store(os.getpid())
+        alive.inc('requests_total')
+        alive.set(gauge, 2)
+        for _ in range(2):
+            totals = collect(self.directory)
+            self.assertEqual(totals['requests_total'], 4)
+            self.assertEqual(totals[gauge], 2)
+        self.assertFalse(os.path.exists(dead.path))
+
+    def test_file_grows_and_survives_reopen(self):
+        """Файл расширяется при переполнении и читается заново"""
+        store = self.store(1)
+        keys = [f'series_{i}{{label="{"x" * 50}"}}' for i in range(2000)]
+        for key in keys:
+            store.inc(key)
+        self.assertGreater(len(store.map), INITIAL_SIZE)
+        reopened = self.store(1)
+        reopened.inc(keys[-1])
+        self.assertEqual(collect(self.directory)[keys[-1]], 2)
+
+
+class MetricsEndpointTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='TestUser')
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_metrics_disabled_by_default(self):
+        """Без METRICS_ENABLED эндпоинт не отвечает"""
+        response = Client().get(reverse('metrics'))
+        self.assertEqual(response.status_code, 404)
+
+    def test_request_and_created_metrics_exposed(self):
+        """Гистограммы по адресам, кеш и созданные объекты на /metrics"""
+        with override_settings(METRICS_ENABLED=True,
+                               METRICS_DIR=self.directory):
+            client = Client()
+            Post.objects.create(text='Тестовый пост', author=self.user)
+            client.get(reverse('posts:index'))
+            client.get(reverse('posts:index'))
+            response = client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        for line in (
+            '# TYPE yatube_request_duration_seconds histogram',
+            'yatube_request_duration_seconds_count{view="posts:index"} 2.0',
+            'yatube_request_duration_seconds_bucket'
+            '{le="+Inf",view="posts:index"} 2.0',
+            'yatube_request_sql_queries_count{view="posts:index"} 2.0',
+            'yatube_response_size_bytes_count{view="posts:index"} 2.0',
+            'yatube_cache_hit_ratio{cache="index_page"} 0.5',
+            'yatube_cache_tier_requests_total{cache="shared",tier="l1"} 3.0',
+            'yatube_objects_created_total{model="post"} 1.0',
+        ):
+            with self.subTest(line=line):
+                self.assertIn(line, body.splitlines())
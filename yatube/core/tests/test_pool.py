@@ -0,0 +1,122 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.db import connections
+from django.test import SimpleTestCase
+
+from ..db.pool import ConnectionPool, PoolTimeout, close_pools
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.healthy = True
+
+    def close(self):
+        self.closed = True
+
+
+def check(connection):
+    if not connection.healthy:
+        raise RuntimeError('соединение разорвано')
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def pool(self, **options):
+        return ConnectionPool(FakeConnection, check, 'test', **options)
+
+    def test_released_connection_is_reused(self):
+        """Возвращенное подключение выдается снова, без нового connect"""
+        pool = self.pool()
+        first = pool.acquire()
+        pool.release(first)
+        self.assertIs(pool.acquire(), first)
+        self.assertEqual(pool.events['created'], 1)
+        self.assertEqual(pool.events['reused'], 1)
+
+    def test_max_size_waits_then_times_out(self):
+        """При исчерпании пула ждем TIMEOUT и получаем PoolTimeout"""
+        pool = self.pool(max_size=1, timeout=0.05)
+        pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        self.assertEqual(pool.events['timeout'], 1)
+
+    def test_unhealthy_idle_connection_is_replaced(self):
+        """Не прошедшее проверку подключение закрывается и заменяется"""
+        pool = self.pool(check_after=0)
+        first = pool.acquire()
+        pool.release(first)
+        first.healthy = False
+        second = pool.acquire()
+        self.assertIsNot(second, first)
+        self.assertTrue(first.closed)
+        self.assertEqual(pool.events['health_check_failed'], 1)
+        self.assertEqual(pool.size, 1)
+
+    def test_idle_connections_pruned_to_min_size(self):
+        """Простаивающие дольше IDLE_TIMEOUT закрываются сверх MIN_SIZE"""
+        pool = self.pool(min_size=1, idle_timeout=10, max_lifetime=0)
+        clock = [0.0]
+        with mock.patch('core.db.pool.time.monotonic',
+                        side_effect=lambda: clock[0]), \
+                mock.patch('core.db.pool.metrics.DB_POOL_EVENTS') as events:
+            first, second, third = [pool.acquire() for _ in range(3)]
+            pool.release(first)
+            pool.release(second)
+            clock[0] = 100.0
+            pool.release(third)
+        self.assertEqual(events.inc.call_args_list.count(
+            mock.call(1, alias='test', event='idle_closed')), 2)
+        self.assertTrue(first.closed)
+        self.assertTrue(second.closed)
+        self.assertFalse(third.closed)
+        self.assertEqual(pool.size, 1)
+
+    def test_expired_connection_is_closed(self):
+        """Подключение старше MAX_LIFETIME не возвращается в пул"""
+        pool = self.pool(max_lifetime=100)
+        clock = [0.0]
+        with mock.patch('core.db.pool.time.monotonic',
+                        side_effect=lambda: clock[0]):
+            connection = pool.acquire()
+            clock[0] = 101.0
+            pool.release(connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.size, 0)
+
+    def test_broken_connection_is_not_reused(self):
+        """Сломанное подключение закрывается при возврате"""
+        pool = self.pool()
+        connection = pool.acquire()
+        pool.release(connection, broken=True)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.size, 0)
+
+
+class PooledBackendTests(SimpleTestCase):
+    def test_sqlite_backend_returns_connections_to_pool(self):
+        """close() возвращает подключение в пул, connect() берет из него"""
+        with tempfile.TemporaryDirectory() as directory:
+            connections.databases['pooled'] = {
+                **connections.databases['default'],
+                'ENGINE': 'core.db.backends.sqlite3',
+                'NAME': os.path.join(directory, 'pooled.sqlite3'),
+                'POOL': {'MAX_SIZE': 2},
+            }
+            try:
+                connection = connections['pooled']
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                raw = connection.connection
+                connection.close()
+                self.assertEqual(connection.pool.stats()['idle'], 1)
+                connection.ensure_connection()
+                self.assertIs(connection.connection, raw)
+                connection.close()
+                self.assertEqual(connection.pool.events['created'], 1)
+            finally:
+                close_pools()
+                del connections['pooled']
+                del connections.databases['pooled']
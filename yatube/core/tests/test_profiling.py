@@ -0,0 +1,130 @@
+import json
+import os
+import pstats
+import shutil
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http import HttpResponse
+from django.test import TestCase, Client, RequestFactory, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from ..middleware.explain import ExplainCaptureMiddleware
+from ..middleware.profiling import ProfilingMiddleware
+
+
+User = get_user_model()
+
+
+class ProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='TestUser')
+        Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def files(self, view_name):
+        return sorted(os.listdir(os.path.join(self.directory, view_name)))
+
+    def test_sampled_request_is_profiled(self):
+        """Профиль и SQL-лог пишутся в каталог имени адреса"""
+        with override_settings(PROFILING_SAMPLE_RATE=1.0,
+                               PROFILING_DIR=self.directory):
+            Client().get(reverse('posts:index'))
+        files = self.files('posts.index')
+        profiles = [name for name in files if name.endswith('.prof')]
+        if not profiles:
+            self.skipTest('cProfile занят другим профилировщиком')
+        stats = pstats.Stats(
+            os.path.join(self.directory, 'posts.index', profiles[0]))
+        self.assertGreater(stats.total_calls, 0)
+        sql_log = next(name for name in files if name.endswith('.sql.json'))
+        with open(os.path.join(self.directory, 'posts.index', sql_log),
+                  encoding='utf-8') as log:
+            record = json.load(log)
+        self.assertEqual(record['path'], reverse('posts:index'))
+        self.assertEqual(record['sql_count'], len(record['queries']))
+
+    def test_slow_request_stacks_are_sampled(self):
+        """Медленный запрос сэмплируется по стеку фоновым потоком"""
+        def slow_view(request):
+            time.sleep(0.1)
+            return HttpResponse()
+
+        with override_settings(PROFILING_SLOW_MS=20, PROFILING_INTERVAL_MS=2,
+                               PROFILING_DIR=self.directory):
+            middleware = ProfilingMiddleware(slow_view)
+            middleware(RequestFactory().get('/slow/'))
+            middleware = ProfilingMiddleware(lambda request: HttpResponse())
+            middleware(RequestFactory().get('/fast/'))
+        files = self.files('unresolved')
+        self.assertEqual(len(files), 2)
+        stacks = next(name for name in files if name.endswith('.stacks'))
+        with open(os.path.join(self.directory, 'unresolved', stacks),
+                  encoding='utf-8') as output:
+            self.assertIn('slow_view', output.read())
+
+    def test_slow_request_logs_only_queries_after_threshold(self):
+        """SQL-лог включается только после порога"""
+        def fast_view(request):
+            Post.objects.count()
+            return HttpResponse()
+
+        def slow_view(request):
+            Post.objects.count()
+            time.sleep(0.1)
+            Post.objects.exists()
+            return HttpResponse()
+
+        with override_settings(PROFILING_SLOW_MS=20, PROFILING_INTERVAL_MS=2,
+                               PROFILING_DIR=self.directory):
+            ProfilingMiddleware(fast_view)(RequestFactory().get('/fast/'))
+            ProfilingMiddleware(slow_view)(RequestFactory().get('/slow/'))
+        self.assertEqual(connection.execute_wrappers, [])
+        sql_logs = [
+            name for name in self.files('unresolved')
+            if name.endswith('.sql.json')]
+        self.assertEqual(len(sql_logs), 1)
+        sql_log = sql_logs[0]
+        with open(os.path.join(self.directory, 'unresolved', sql_log),
+                  encoding='utf-8') as log:
+            record = json.load(log)
+        self.assertEqual(record['sql_count'], 1)
+        self.assertIn('LIMIT 1', record['queries'][0]['sql'])
+
+    def test_slow_request_with_explain_capture(self):
+        """Профилирование и сбор EXPLAIN снимают свои обертки"""
+        def slow_view(request):
+            time.sleep(0.1)
+            Post.objects.exists()
+            return HttpResponse()
+
+        capture_file = os.path.join(self.directory, 'explain.jsonl')
+        with override_settings(PROFILING_SLOW_MS=20, PROFILING_INTERVAL_MS=2,
+                               PROFILING_DIR=self.directory,
+                               EXPLAIN_CAPTURE_FILE=capture_file):
+            chains = {
+                'profiling_outer': ProfilingMiddleware(
+                    ExplainCaptureMiddleware(slow_view)),
+                'explain_outer': ExplainCaptureMiddleware(
+                    ProfilingMiddleware(slow_view)),
+            }
+            for name, middleware in chains.items():
+                with self.subTest(chain=name):
+                    response = middleware(RequestFactory().get('/slow/'))
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(connection.execute_wrappers, [])
+        for name in self.files('unresolved'):
+            if name.endswith('.sql.json'):
+                with open(os.path.join(self.directory, 'unresolved', name),
+                          encoding='utf-8') as log:
+                    self.assertEqual(json.load(log)['sql_count'], 1)
@@ -0,0 +1,33 @@
+from django.test import SimpleTestCase
+
+from ..testing import budget_violations
+
+
+class BudgetViolationsTests(SimpleTestCase):
+    golden = {
+        'count': 2,
+        'shapes': [
+            {'fingerprint': 'SELECT a', 'count': 1, 'flags': ['full_scan']},
+            {'fingerprint': 'SELECT b', 'count': 1, 'flags': []},
+        ],
+    }
+
+    def test_same_or_fewer_queries_pass(self):
+        """Известные формы и меньшее число запросов допустимы"""
+        current = {'count': 1, 'shapes': self.golden['shapes'][:1]}
+        self.assertEqual(budget_violations(self.golden, current), [])
+
+    def test_more_queries_fail(self):
+        """Рост числа запросов - нарушение бюджета"""
+        current = {'count': 3, 'shapes': self.golden['shapes']}
+        self.assertEqual(len(budget_violations(self.golden, current)), 1)
+
+    def test_new_unindexed_shape_fails(self):
+        """Новая форма с полным сканом - нарушение, с индексом - нет"""
+        current = {'count': 2, 'shapes': [
+            {'fingerprint': 'SELECT c', 'count': 1, 'flags': ['full_scan']},
+            {'fingerprint': 'SELECT d', 'count': 1, 'flags': ['temp_btree']},
+        ]}
+        problems = budget_violations(self.golden, current)
+        self.assertEqual(len(problems), 1)
+        self.assertIn('SELECT c', problems[0])
@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.template import engines
+from django.test import TestCase, Client, RequestFactory, override_settings
+from django.urls import reverse
+
+from posts.models import Post, Comment
+from ..middleware.queries import DuplicateQueryMiddleware
+from ..querycheck import (DuplicateQueriesError, detect_duplicate_queries,
+                          fingerprint)
+
+
+User = get_user_model()
+
+
+class FingerprintTests(TestCase):
+    def test_literals_and_in_lists_are_collapsed(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s)'),
+            fingerprint('SELECT * FROM t WHERE id IN (%s)'),
+        )
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE a = 'x' AND b = 10"),
+            'SELECT * FROM t WHERE a = ? AND b = ?',
+        )
+
+
+class DuplicateQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='TestUser')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.user)
+        for i in range(5):
+            author = User.objects.create(username=f'commentator_{i}')
+            Comment.objects.create(
+                post=cls.post, author=author, text='Комментарий')
+
+    def test_detects_n_plus_one_in_template(self):
+        """Отчет указывает на строку шаблона, породившую N+1"""
+        template = engines['django'].from_string(
+            '{% for comment in comments %}\n'
+            '{{ comment.author.username }}\n'
+            '{% endfor %}'
+        )
+        with self.assertRaises(DuplicateQueriesError) as error:
+            with detect_duplicate_queries(threshold=3):
+                template.render(
+                    {'comments': DuplicateQueriesTests.post.comments.all()})
+        self.assertIn('5 x SELECT', str(error.exception))
+        self.assertIn(':2', str(error.exception))
+
+    def test_detects_n_plus_one_in_code(self):
+        with self.assertRaises(DuplicateQueriesError) as error:
+            with detect_duplicate_queries(threshold=3):
+                for comment in DuplicateQueriesTests.post.comments.all():
+                    comment.author.username
+        self.assertIn('test_querycheck.py', str(error.exception))
+
+    def test_select_related_passes(self):
+        with detect_duplicate_queries(threshold=3):
+            comments = DuplicateQueriesTests.post.comments.select_related(
+                'author')
+            for comment in comments:
+                comment.author.username
+
+    def test_default_settings_disable_check(self):
+        """Без порога в настройках одиночные и разные запросы проходят"""
+        with detect_duplicate_queries():
+            Post.objects.count()
+        with detect_duplicate_queries():
+            Post.objects.count()
+            Comment.objects.count()
+
+    def test_threshold_below_two_rejected(self):
+        with self.assertRaises(ValueError):
+            with detect_duplicate_queries(threshold=1):
+                pass
+
+    @override_settings(QUERY_DUPLICATES_THRESHOLD=2,
+                       QUERY_DUPLICATES_RAISE=True)
+    def test_middleware_checks_post_detail(self):
+        """Комментарии на странице поста загружаются без N+1"""
+        response = Client().get(reverse(
+            'posts:post_detail',
+            kwargs={'post_id': DuplicateQueriesTests.post.id}))
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(QUERY_DUPLICATES_THRESHOLD=3)
+    def test_middleware_reports_in_header_and_log(self):
+        def view(request):
+            for post in Post.objects.all():
+                list(post.comments.all())
+                list(post.comments.all())
+                list(post.comments.all())
+            return HttpResponse()
+
+        middleware = DuplicateQueryMiddleware(view)
+        with self.assertLogs('yatube.queries', level='WARNING'):
+            response = middleware(RequestFactory().get('/'))
+        self.assertEqual(response['X-Duplicate-Queries'], '3')
@@ -0,0 +1,58 @@
+import os
+import sqlite3
+import tempfile
+
+from django.conf import settings
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from ..contention import compare_settings
+
+
+SCHEMA = '''
+CREATE TABLE auth_user (id INTEGER PRIMARY KEY, username TEXT);
+CREATE TABLE posts_post (id INTEGER PRIMARY KEY);
+CREATE TABLE posts_comment (
+    id INTEGER PRIMARY KEY, created TEXT, post_id INTEGER,
+    author_id INTEGER, text TEXT);
+CREATE INDEX posts_comment_post ON posts_comment (post_id);
+INSERT INTO auth_user (id, username) VALUES (1, 'first'), (2, 'second');
+INSERT INTO posts_post (id) VALUES (1), (2), (3);
+'''
+
+
+class SQLitePragmasTests(TestCase):
+    def test_pragmas_applied_to_connection(self):
+        """Подключение получает PRAGMA из SQLITE_PRAGMAS"""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            busy_timeout = cursor.fetchone()[0]
+            cursor.execute('PRAGMA temp_store')
+            temp_store = cursor.fetchone()[0]
+        self.assertEqual(
+            busy_timeout, settings.SQLITE_PRAGMAS['busy_timeout'])
+        self.assertEqual(temp_store, 2, 'temp_store должен быть MEMORY')
+
+
+class ContentionBenchmarkTests(SimpleTestCase):
+    def test_compare_settings(self):
+        """Замер идет на копиях базы в разных режимах журнала"""
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'source.sqlite3')
+            database = sqlite3.connect(source)
+            database.executescript(SCHEMA)
+            database.close()
+            results = compare_settings(
+                source, directory, settings.SQLITE_PRAGMAS,
+                readers=2, writers=2, duration=0.2)
+            modes = {}
+            for name in results:
+                copy = sqlite3.connect(
+                    os.path.join(directory, f'{name}.sqlite3'))
+                modes[name] = copy.execute('PRAGMA journal_mode').fetchone()[0]
+                copy.close()
+        self.assertEqual(modes, {'default': 'delete', 'tuned': 'wal'})
+        for name, result in results.items():
+            with self.subTest(name=name):
+                self.assertGreater(result['read']['ops'], 0)
+                self.assertGreater(result['write']['ops'], 0)
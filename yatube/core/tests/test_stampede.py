@@ -0,0 +1,87 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from ..cache.stampede import get_or_compute, lock_key, should_recompute
+
+
+@override_settings(
+    CACHE_STALE_SECONDS=60, CACHE_LOCK_TIMEOUT=2, CACHE_RECOMPUTE_BETA=1.0)
+class GetOrComputeTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = LocMemCache('stampede-tests', {})
+        self.cache.clear()
+        self.calls = 0
+
+    def compute(self, value='value', seconds=0):
+        def compute():
+            self.calls += 1
+            time.sleep(seconds)
+            return value
+        return compute
+
+    def test_early_recompute_grows_towards_expiry(self):
+        now = 1000.0
+        with mock.patch('random.random', return_value=0.5):
+            # -ln(0.5) * 2 с расчета ≈ 1.4 с до срока.
+            self.assertFalse(should_recompute(now + 2, 2.0, now))
+            self.assertTrue(should_recompute(now + 1, 2.0, now))
+        self.assertTrue(should_recompute(now, 0, now))
+        self.assertFalse(should_recompute(now + 1, 2.0, now, beta=0))
+
+    def test_fresh_value_not_recomputed(self):
+        get_or_compute('key', self.compute(), 20, self.cache)
+        value = get_or_compute('key', self.compute('new'), 20, self.cache)
+        self.assertEqual((value, self.calls), ('value', 1))
+        self.assertFalse(self.cache.has_key(lock_key('key')))
+
+    def test_stale_value_served_while_other_recomputes(self):
+        get_or_compute('key', self.compute(), -1, self.cache)
+        self.cache.add(lock_key('key'), True)
+        value = get_or_compute('key', self.compute('new'), 20, self.cache)
+        self.assertEqual((value, self.calls), ('value', 1))
+
+        self.cache.delete(lock_key('key'))
+        value = get_or_compute('key', self.compute('new'), 20, self.cache)
+        self.assertEqual((value, self.calls), ('new', 2))
+
+    def test_single_flight_on_cold_cache(self):
+        """Из одновременных запросов к пустому кешу считает один"""
+        results = []
+
+        def request():
+            results.append(get_or_compute(
+                'key', self.compute(seconds=0.2), 20, self.cache))
+        threads = [threading.Thread(target=request) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['value'] * 5)
+        self.assertEqual(self.calls, 1)
+
+
+class SWRCacheTagTests(SimpleTestCase):
+    template = Template(
+        '{% load swr_cache %}'
+        '{% swr_cache 20 fragment key using="stampede" %}'
+        '{{ text }}{% endswr_cache %}')
+
+    @override_settings(CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        },
+        'stampede': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'swr-cache-tag-tests',
+        },
+    })
+    def test_fragment_cached_per_vary_on(self):
+        render = self.template.render
+        self.assertEqual(render(Context({'key': 1, 'text': 'a'})), 'a')
+        self.assertEqual(render(Context({'key': 1, 'text': 'b'})), 'a')
+        self.assertEqual(render(Context({'key': 2, 'text': 'b'})), 'b')
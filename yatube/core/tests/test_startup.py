@@ -0,0 +1,98 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
+
+from ..password_validation import CommonPasswordValidator
+from ..startup import (PRODUCTION_ENV, STARTUP_TARGETS, compare_startup,
+                       lazy_violations, package_times, parse_importtime,
+                       run_target)
+
+
+IMPORTTIME = '''\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     django.utils
+import time:      2000 |       2120 |   django.core
+import time:       500 |       2620 | django
+import time:       300 |        300 |   PIL.Image
+'''
+
+
+class StartupHelpersTests(SimpleTestCase):
+    def test_parse_importtime(self):
+        records = parse_importtime(IMPORTTIME)
+        self.assertEqual(records[0], ('django.utils', 120, 120, 2))
+        self.assertEqual(records[2], ('django', 500, 2620, 0))
+        self.assertEqual(
+            package_times(records), {'django': 2.62, 'PIL': 0.3})
+        self.assertEqual(lazy_violations(records), ['PIL'])
+
+    def test_compare_flags_slow_start_and_heavy_modules(self):
+        baseline = {'wsgi': {'wall_ms': 400.0}}
+        slow = {'wsgi': {'wall_ms': 600.0, 'lazy_violations': []}}
+        noise = {'wsgi': {'wall_ms': 430.0, 'lazy_violations': []}}
+        heavy = {'wsgi': {'wall_ms': 400.0, 'lazy_violations': ['PIL']}}
+        self.assertEqual(len(compare_startup(baseline, slow)), 1)
+        self.assertEqual(compare_startup(baseline, noise), [])
+        self.assertEqual(
+            compare_startup(baseline, heavy),
+            ['wsgi: при старте загружен PIL'])
+
+    def test_worker_start_skips_heavy_modules(self):
+        """Импорт yatube.wsgi не загружает PIL, движки sorl и django.test"""
+        _, records = run_target(STARTUP_TARGETS['wsgi'])
+        self.assertIn('django', {module for module, _, _, _ in records})
+        self.assertEqual(lazy_violations(records), [])
+
+    def test_production_worker_imports(self):
+        """С настройками продакшена yatube.wsgi импортирует прогрев, но не
+        django.test, замеры и requests. Сами шаги прогрева заменены
+        заглушкой: PIL и sorl они загружают намеренно."""
+        _, records = run_target([
+            '-c', 'import core.warmup; '
+                  'core.warmup.warmup = lambda session: None; '
+                  'import yatube.wsgi',
+        ], PRODUCTION_ENV)
+        modules = {module for module, _, _, _ in records}
+        self.assertIn('core.clients', modules)
+        self.assertEqual(lazy_violations(records), [])
+
+
+class ProfileStartupCommandTests(SimpleTestCase):
+    result = {
+        'wall_ms': 400.0, 'imports_ms': 300.0, 'modules': 600,
+        'packages': [['django', 120.0]], 'lazy_violations': [],
+    }
+
+    def test_command_writes_and_compares_baseline(self):
+        with mock.patch(
+                'core.management.commands.profile_startup.profile_startup',
+                return_value={'wsgi': self.result}):
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'startup.json')
+                out = StringIO()
+                call_command('profile_startup', '--output', path, stdout=out)
+                self.assertIn('django', out.getvalue())
+                with open(path, encoding='utf-8') as baseline:
+                    self.assertEqual(json.load(baseline)['wsgi'], self.result)
+                with open(path, 'w', encoding='utf-8') as baseline:
+                    json.dump({'wsgi': {'wall_ms': 100.0}}, baseline)
+                with self.assertRaises(CommandError):
+                    call_command(
+                        'profile_startup', '--compare', path, stdout=out)
+
+
+class CommonPasswordValidatorTests(SimpleTestCase):
+    def test_list_read_on_first_validation(self):
+        validator = CommonPasswordValidator()
+        self.assertNotIn('passwords', validator.__dict__)
+        self.assertIn('пароль', validator.get_help_text())
+        with self.assertRaises(ValidationError):
+            validator.validate('password')
+        self.assertIn('password', validator.passwords)
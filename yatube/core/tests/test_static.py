@@ -0,0 +1,122 @@
+import gzip
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils.http import http_date
+
+from ..middleware.static import (PrecompressedStaticMiddleware,
+                                 accepted_encodings)
+from ..staticfiles import brotli_compress
+
+
+CSS = (
+    'body { background: url("../img/logo.png"); }\n'
+    + '.row { margin: 0; }\n' * 200
+)
+
+
+class PrecompressedStaticTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        source = os.path.join(self.directory, 'static')
+        os.makedirs(os.path.join(source, 'css'))
+        os.makedirs(os.path.join(source, 'img'))
+        with open(os.path.join(source, 'css', 'site.css'), 'w') as css:
+            css.write(CSS)
+        with open(os.path.join(source, 'img', 'logo.png'), 'wb') as logo:
+            logo.write(os.urandom(2048))
+        settings = override_settings(
+            STATICFILES_DIRS=[source],
+            STATIC_ROOT=os.path.join(self.directory, 'collected'),
+            STATICFILES_STORAGE=(
+                'core.staticfiles.CompressedManifestStaticFilesStorage'),
+            STATIC_SERVE_PRECOMPRESSED=True,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.css = staticfiles_storage.stored_name('css/site.css')
+        self.middleware = PrecompressedStaticMiddleware(
+            lambda request: HttpResponse('view', status=404))
+        self.factory = RequestFactory()
+
+    def get(self, name, **headers):
+        return self.middleware(self.factory.get(f'/static/{name}', **headers))
+
+    def test_collectstatic_writes_compressed_copies(self):
+        path = staticfiles_storage.path(self.css)
+        self.assertNotEqual(self.css, 'css/site.css')
+        with open(path, 'rb') as original, \
+                open(path + '.gz', 'rb') as compressed:
+            self.assertEqual(
+                gzip.decompress(compressed.read()), original.read())
+        self.assertEqual(
+            os.path.exists(path + '.br'),
+            brotli_compress(b'') is not None)
+        logo = staticfiles_storage.path(
+            staticfiles_storage.stored_name('img/logo.png'))
+        self.assertFalse(os.path.exists(logo + '.gz'))
+
+    def test_collectstatic_warns_without_brotli(self):
+        with mock.patch('core.staticfiles.brotli_compress',
+                        return_value=None):
+            with self.assertLogs('yatube.staticfiles', 'WARNING'):
+                call_command(
+                    'collectstatic', interactive=False, verbosity=0)
+
+    def test_serves_gzip_copy_with_immutable_cache(self):
+        response = self.get(self.css, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        body = gzip.decompress(b''.join(response.streaming_content))
+        self.assertIn(b'../img/logo.', body)
+
+    def test_identity_without_accept_encoding(self):
+        for header in ('', 'gzip;q=0'):
+            with self.subTest(header=header):
+                response = self.get(self.css, HTTP_ACCEPT_ENCODING=header)
+                self.assertFalse(response.has_header('Content-Encoding'))
+                self.assertIn(
+                    b'.row', b''.join(response.streaming_content))
+
+    def test_unhashed_name_gets_short_max_age(self):
+        response = self.get('css/site.css')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+
+    def test_not_modified(self):
+        path = staticfiles_storage.path(self.css)
+        response = self.get(
+            self.css, HTTP_IF_MODIFIED_SINCE=http_date(
+                os.stat(path).st_mtime))
+        self.assertEqual(response.status_code, 304)
+
+    def test_other_paths_reach_view(self):
+        for name in ('missing.css', '../static/css/site.css'):
+            with self.subTest(name=name):
+                self.assertEqual(self.get(name).status_code, 404)
+
+    def test_only_existing_files_remembered(self):
+        for number in range(3):
+            self.get(f'missing-{number}.css')
+        self.get(self.css)
+        self.assertEqual(list(self.middleware.files), [self.css])
+
+    def test_disabled_without_setting(self):
+        with override_settings(STATIC_SERVE_PRECOMPRESSED=False):
+            with self.assertRaises(MiddlewareNotUsed):
+                PrecompressedStaticMiddleware(lambda request: None)
+
+    def test_accepted_encodings(self):
+        self.assertEqual(
+            accepted_encodings('gzip;q=0.5, br;q=0, identity'),
+            {'gzip', 'identity'})
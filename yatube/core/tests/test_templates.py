@@ -0,0 +1,53 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.template import Engine
+from django.test import TestCase, override_settings
+
+from posts.models import Post
+from ..benchmarks import cached_templates
+from ..templates import (
+    cached_loaders, precompile_templates, reset_templates, template_names)
+
+
+User = get_user_model()
+
+
+class PrecompileTemplatesTests(TestCase):
+    def test_names_cover_project_templates(self):
+        names = template_names()
+        for name in ('base.html', 'includes/header.html',
+                     'posts/includes/paginator.html'):
+            with self.subTest(name=name):
+                self.assertIn(name, names)
+
+    def test_without_cached_loader_does_nothing(self):
+        self.assertEqual(cached_loaders(), [])
+        self.assertEqual(precompile_templates(), 0)
+
+    def test_templates_served_from_memory_after_precompile(self):
+        with override_settings(TEMPLATES=cached_templates()):
+            reset_templates()
+            self.assertEqual(
+                precompile_templates(), len(template_names()))
+            loader = cached_loaders()[0]
+            with mock.patch.object(
+                    loader, 'get_contents',
+                    side_effect=AssertionError('шаблон читается с диска')):
+                Engine.get_default().get_template('posts/index.html')
+
+
+class BenchTemplatesCommandTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='reader')
+        Post.objects.create(text='Пост', author=cls.user)
+
+    def test_command_prints_cold_and_steady_times(self):
+        out = StringIO()
+        call_command('bench_templates', '--iterations', '1', stdout=out)
+        self.assertIn('posts:index anonymous shallow', out.getvalue())
+        self.assertIn('Разобрано шаблонов', out.getvalue())
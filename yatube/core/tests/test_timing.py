@@ -0,0 +1,49 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+
+User = get_user_model()
+
+
+@override_settings(REQUEST_TIMING_SAMPLE_RATE=1.0)
+class ServerTimingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='TestUser')
+        Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_server_timing_header(self):
+        """Ответ содержит Server-Timing с SQL, view и шаблоном"""
+        response = self.guest_client.get(reverse('posts:index'))
+        header = response['Server-Timing']
+        for metric in ('db;dur=', 'view;dur=', 'tpl;dur=', 'cache;desc=',
+                       'total;dur='):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, header)
+
+    def test_structured_log_line(self):
+        """Строка лога - JSON с метриками запроса и кеша"""
+        self.guest_client.get(reverse('posts:index'))
+        with self.assertLogs('yatube.timing', level='INFO') as logs:
+            self.guest_client.get(reverse('posts:index'))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['sql_count'], 0)
+        self.assertGreaterEqual(record['cache_hits'], 1)
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0.0)
+    def test_disabled_when_sample_rate_zero(self):
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
@@ -0,0 +1,97 @@
+from django.contrib.admin.sites import site
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post
+from ..testing import commit_callbacks
+from ..versioning import (
+    bump, get_versions, version_key, versioned_key, versioned_keys)
+
+
+User = get_user_model()
+
+
+class VersioningTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='version_author')
+        cls.reader = User.objects.create(username='version_reader')
+        cls.group = Group.objects.create(
+            title='Версии', slug='versions', description='Описание')
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_key_changes_only_with_its_objects(self):
+        key = versioned_key('fragment', self.post, self.author)
+        self.assertEqual(key, versioned_key(
+            'fragment', self.post, self.author))
+        group_key = versioned_key('fragment', self.group)
+        bump(self.author)
+        self.assertNotEqual(key, versioned_key(
+            'fragment', self.post, self.author))
+        self.assertEqual(group_key, versioned_key('fragment', self.group))
+
+    def test_batch_reads_versions_once(self):
+        keys = versioned_keys('card', [(self.post,), (self.group,)])
+        self.assertEqual(keys, [
+            versioned_key('card', self.post),
+            versioned_key('card', self.group),
+        ])
+
+    def test_lost_counter_does_not_repeat_old_version(self):
+        get_versions([self.post])
+        for _ in range(100):
+            bump(self.post)
+        old = get_versions([self.post])[version_key(self.post)]
+        cache.delete(version_key(self.post))
+        new = get_versions([self.post])[version_key(self.post)]
+        self.assertGreater(new, old)
+
+    def assert_bumped(self, action, *objects):
+        before = versioned_keys('test', [(obj,) for obj in objects])
+        with commit_callbacks():
+            action()
+            self.assertEqual(
+                versioned_keys('test', [(obj,) for obj in objects]), before)
+        after = versioned_keys('test', [(obj,) for obj in objects])
+        for old, new in zip(before, after):
+            self.assertNotEqual(old, new)
+
+    def test_views_bump_versions(self):
+        self.assert_bumped(lambda: self.client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Комментарий'}), self.post)
+        for name in ('posts:profile_follow', 'posts:profile_unfollow'):
+            with self.subTest(name=name):
+                url = reverse(name, args=['version_author'])
+                self.assert_bumped(
+                    lambda: self.client.get(url), self.author, self.reader)
+
+    def test_admin_save_bumps_version(self):
+        admin = site._registry[Group]
+        request = None
+        self.group.title = 'Новое название'
+        self.assert_bumped(lambda: admin.save_model(
+            request, self.group, form=None, change=True), self.group)
+
+    def test_login_does_not_bump_user(self):
+        before = versioned_key('test', self.reader)
+        self.client.force_login(self.reader)
+        self.assertEqual(versioned_key('test', self.reader), before)
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+    def test_cache_without_counters(self):
+        """Кеш, который ничего не хранит, не ломает ключи и страницы"""
+        self.assertTrue(versioned_key('test', self.post).startswith(
+            f'test:post{self.post.pk}v'))
+        self.assertEqual(
+            self.client.get(reverse('posts:index')).status_code, 200)
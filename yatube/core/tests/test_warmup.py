@@ -0,0 +1,78 @@
+from contextlib import ExitStack
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post
+from yatube.wsgi import application
+from ..clients import WSGISession
+from ..warmup import feed_urls, warmup
+
+
+User = get_user_model()
+
+
+class WarmupTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='warm_author')
+        cls.group = Group.objects.create(
+            title='Прогрев', slug='warm', description='Описание')
+        Post.objects.create(text='Пост', author=cls.author, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feed_urls_cover_index_groups_and_authors(self):
+        self.assertEqual(feed_urls(2), [
+            reverse('posts:index') + '?page=1',
+            reverse('posts:index') + '?page=2',
+            reverse('posts:group_posts', args=['warm']),
+            reverse('posts:profile', args=['warm_author']),
+        ])
+
+    def test_warmup_runs_every_step(self):
+        results = warmup(WSGISession(application), pages=1)
+        self.assertEqual(
+            list(results),
+            ['urls', 'templates', 'imaging', 'thumbnails', 'feeds'])
+        self.assertGreater(results['urls'][0], 0)
+        self.assertEqual(results['feeds'][0], len(feed_urls(1)))
+
+    def test_failed_step_does_not_stop_warmup(self):
+        with mock.patch('core.warmup.prime_urls', side_effect=RuntimeError):
+            with self.assertLogs('yatube.warmup', 'ERROR'):
+                results = warmup(pages=1)
+        self.assertIsNone(results['urls'][0])
+        self.assertGreater(results['imaging'][0], 0)
+        self.assertNotIn('feeds', results)
+
+    def test_warmup_closes_connections(self):
+        """Воркеры после fork не наследуют подключение прогрева.
+
+        Тестовая база в памяти при close() не закрывается, поэтому
+        проверяется сам вызов close() у каждого подключения. Без сессии:
+        запросы лент закрывают подключение и сами, по request_finished."""
+        with ExitStack() as stack:
+            closes = [
+                stack.enter_context(mock.patch.object(
+                    connection, 'close', wraps=connection.close))
+                for connection in connections.all()
+            ]
+            warmup(pages=1)
+        for close in closes:
+            close.assert_called()
+
+    def test_command_prints_steps(self):
+        out = StringIO()
+        call_command('warmup', '--pages', '1', stdout=out)
+        for step in ('urls', 'templates', 'feeds'):
+            with self.subTest(step=step):
+                self.assertIn(step, out.getvalue())
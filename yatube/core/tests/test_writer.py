@@ -0,0 +1,109 @@
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post
+from ..contention import WriteBenchmark
+from ..writer import WriteQueue, run_write
+
+
+User = get_user_model()
+
+
+class WriteQueueTests(TransactionTestCase):
+    def setUp(self):
+        self.author = User.objects.create(username='writer_author')
+        self.reader = User.objects.create(username='writer_reader')
+        self.post = Post.objects.create(
+            text='Тестовый пост', author=self.author)
+
+    def test_batch_jobs_are_isolated(self):
+        """Ошибка одного задания откатывает только его точку сохранения"""
+        def failing():
+            Comment.objects.create(
+                post=self.post, author=self.reader, text='Откатится')
+            raise ValueError('ошибка задания')
+
+        write_queue = WriteQueue()
+        try:
+            futures = [
+                write_queue.submit(
+                    Comment.objects.create, post=self.post,
+                    author=self.reader, text='Первый'),
+                write_queue.submit(failing),
+                write_queue.submit(
+                    Comment.objects.create, post=self.post,
+                    author=self.reader, text='Второй'),
+            ]
+            self.assertEqual(futures[0].result(5).text, 'Первый')
+            with self.assertRaises(ValueError):
+                futures[1].result(5)
+            futures[2].result(5)
+        finally:
+            write_queue.close()
+        self.assertEqual(
+            sorted(Comment.objects.values_list('text', flat=True)),
+            ['Второй', 'Первый'])
+
+    def test_timed_out_job_is_not_written(self):
+        """Задание, не дождавшееся писателя, отменяется и не пишется"""
+        started, release = threading.Event(), threading.Event()
+
+        def busy():
+            started.set()
+            release.wait(5)
+
+        write_queue = WriteQueue()
+        try:
+            write_queue.submit(busy)
+            started.wait(5)
+            with override_settings(WRITE_QUEUE_ENABLED=True,
+                                   WRITE_QUEUE_TIMEOUT=0.1), \
+                    mock.patch('core.writer.get_write_queue',
+                               return_value=write_queue):
+                with self.assertRaises(FutureTimeoutError):
+                    run_write(
+                        Comment.objects.create, post=self.post,
+                        author=self.reader, text='Опоздавший')
+        finally:
+            release.set()
+            write_queue.close()
+        self.assertFalse(Comment.objects.filter(text='Опоздавший').exists())
+
+    def test_run_write_inside_transaction_is_inline(self):
+        """Внутри транзакции вызывающего запись не уходит в очередь"""
+        with override_settings(WRITE_QUEUE_ENABLED=True):
+            with transaction.atomic():
+                follow = run_write(
+                    Follow.objects.create, user=self.reader,
+                    author=self.author)
+                self.assertTrue(Follow.objects.filter(pk=follow.pk).exists())
+
+    def test_views_write_through_queue(self):
+        """Комментарий и подписка из view проходят через очередь"""
+        client = Client()
+        client.force_login(self.reader)
+        with override_settings(WRITE_QUEUE_ENABLED=True):
+            client.post(
+                reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+                {'text': 'Комментарий через очередь'})
+            client.get(reverse(
+                'posts:profile_follow',
+                kwargs={'username': self.author.username}))
+        self.assertTrue(Comment.objects.filter(
+            text='Комментарий через очередь', author=self.reader).exists())
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author).exists())
+
+    def test_write_benchmark_modes(self):
+        """Замер записи работает напрямую и через очередь"""
+        for mode in ('direct', 'queue'):
+            with self.subTest(mode=mode):
+                result = WriteBenchmark(
+                    'default', writers=2, duration=0.2, mode=mode).run()
+                self.assertGreater(result['ops'], 0)
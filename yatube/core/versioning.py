@@ -0,0 +1,85 @@
+"""Версии объектов для ключей кеша.
+
+У каждого объекта есть счетчик в кеше (version:<модель>:<pk>), который
+сигналы увеличивают при любой записи. Ключ фрагмента строится из версий
+всех объектов, от которых он зависит: после записи ключ меняется, а
+старая запись просто перестает читаться и вытесняется по LRU. Так не
+нужно искать и удалять зависимые ключи или держать короткие сроки.
+
+Пропавший счетчик (вытеснен или кеш очищен) начинается не с единицы, а
+с времени в микросекундах, умноженного на RESTART_STEP: иначе новая
+версия могла бы совпасть со старой и вернуть устаревший фрагмент.
+Старая версия догнала бы новую, только если ключ увеличивали чаще
+RESTART_STEP раз за микросекунду, а одно увеличение - это обращение к
+кешу.
+
+Кроме общей версии у объекта могут быть версии с областью (scope): их
+увеличивают только записи, которые меняют эту область. Так карточка
+поста зависит от версии 'card', которую не трогают комментарии и
+подписки.
+"""
+import time
+
+from django.core.cache import cache
+
+
+# Увеличений на микросекунду времени между перезапусками счетчика.
+# Начальная версия порядка 10**18 остается в пределах 64-битного целого.
+RESTART_STEP = 1000
+
+
+def version_key(obj, scope=None):
+    key = f'version:{obj._meta.label_lower}:{obj.pk}'
+    return f'{key}:{scope}' if scope else key
+
+
+def _initial_version():
+    return time.time_ns() // 1000 * RESTART_STEP
+
+
+def get_versions(objects, scope=None):
+    """Словарь version_key -> версия для объектов."""
+    keys = {version_key(obj, scope) for obj in objects}
+    versions = cache.get_many(list(keys))
+    missing = keys.difference(versions)
+    if missing:
+        initial = _initial_version()
+        for key in missing:
+            cache.add(key, initial, None)
+        # Счетчик мог создать параллельный запрос. Если кеш его не
+        # сохранил (DummyCache), используется начальная версия.
+        versions.update(cache.get_many(list(missing)))
+        for key in missing:
+            versions.setdefault(key, initial)
+    return versions
+
+
+def bump(*objects, scope=None):
+    """Новая версия объектов после записи."""
+    for obj in objects:
+        key = version_key(obj, scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), None)
+
+
+def versioned_keys(name, dependencies, scope=None):
+    """Ключи name для каждого кортежа объектов из dependencies одним
+    обращением к кешу за версиями области scope."""
+    dependencies = [tuple(objects) for objects in dependencies]
+    versions = get_versions(
+        (obj for objects in dependencies for obj in objects), scope)
+    return [
+        ':'.join([name, *(
+            f'{obj._meta.model_name}{obj.pk}'
+            f'v{versions[version_key(obj, scope)]}'
+            for obj in objects
+        )])
+        for objects in dependencies
+    ]
+
+
+def versioned_key(name, *objects):
+    """Ключ name, который меняется при записи любого из objects."""
+    return versioned_keys(name, [objects])[0]
@@ -1,11 +1,20 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from core.metrics import exposition
+
 
 def page_not_found(request, exception):
     template = 'core/404.html'
     return render(request, template, {'path': request.path}, status=404)
 
 
+def permission_denied(request, exception):
+    template = 'core/403.html'
+    return render(request, template, {'path': request.path}, status=403)
+
+
 def csrf_failure(request, reason=''):
     template = 'core/403csrf.html'
     return render(request, template)
@@ -14,3 +23,11 @@ def csrf_failure(request, reason=''):
 def internal_server_error(request):
     template = 'core/500.html'
     return render(request, template)
+
+
+def metrics(request):
+    """Метрики всех воркеров в текстовом формате Prometheus."""
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    return HttpResponse(
+        exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
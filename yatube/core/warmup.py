@@ -0,0 +1,133 @@
+"""Прогрев воркера до первого запроса.
+
+После деплоя первые запросы каждого воркера платят за заполнение
+резолвера адресов, разбор шаблонов, импорт бэкендов sorl и плагинов
+Pillow и за холодные кеши. warmup делает все это заранее: yatube/wsgi.py
+вызывает его при старте процесса (WARMUP_ON_START), а команда
+manage.py warmup прогревает общий кеш и, с --url, уже запущенный пул.
+
+Шаги не зависят друг от друга: ошибка шага попадает в лог и не мешает
+воркеру стартовать.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count
+from django.urls import get_resolver, reverse
+
+from .templates import precompile_templates
+
+
+logger = logging.getLogger('yatube.warmup')
+
+# Те же параметры, что у {% thumbnail %} в карточке и на странице поста.
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+def prime_urls():
+    """Заполняет словари reverse резолвера и его пространств имен."""
+    resolver = get_resolver()
+    resolvers = [resolver]
+    while resolvers:
+        current = resolvers.pop()
+        current.reverse_dict
+        resolvers.extend(
+            child for _, child in current.namespace_dict.values())
+    return len(resolver.reverse_dict)
+
+
+def prime_imaging():
+    """Импортирует движок, хранилище и kvstore sorl и плагины Pillow."""
+    from PIL import Image
+    from sorl.thumbnail import default
+
+    Image.init()
+    for backend in (default.engine, default.storage, default.kvstore):
+        # Ленивые объекты sorl создаются при первом обращении.
+        backend.__class__
+    return len(Image.OPEN)
+
+
+def feed_urls(pages):
+    """Первые pages страниц главной и первые страницы pages самых
+    больших групп и авторов."""
+    from posts.models import Group, User
+
+    index = reverse('posts:index')
+    urls = [f'{index}?page={page}' for page in range(1, pages + 1)]
+    groups = Group.objects.annotate(total=Count('posts')).order_by(
+        '-total').values_list('slug', flat=True)[:pages]
+    authors = User.objects.annotate(total=Count('posts')).order_by(
+        '-total').values_list('username', flat=True)[:pages]
+    urls += [reverse('posts:group_posts', args=[slug]) for slug in groups]
+    urls += [reverse('posts:profile', args=[name]) for name in authors]
+    return urls
+
+
+def prime_feeds(session, pages):
+    """Запрашивает страницы лент: прогревает представления, фрагменты,
+    карточки и кеш объектов. Число ответов 200."""
+    return sum(
+        session.request('GET', url) == 200 for url in feed_urls(pages))
+
+
+def prime_thumbnails(pages):
+    """Миниатюры картинок постов с первых pages страниц главной; число
+    созданных или найденных в кеше sorl."""
+    from sorl.thumbnail import get_thumbnail
+
+    from posts.models import Post
+    from posts.views import POSTS_PER_PAGE
+
+    images = Post.objects.exclude(image='').order_by(
+        '-created').values_list('image', flat=True)[:pages * POSTS_PER_PAGE]
+    created = 0
+    for image in images:
+        try:
+            get_thumbnail(image, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS)
+        except Exception as error:
+            # Как и {% thumbnail %}, битая картинка не мешает остальным.
+            logger.warning('Миниатюра %s не создана: %s', image, error)
+        else:
+            created += 1
+    return created
+
+
+def warmup(session=None, pages=None):
+    """Выполняет шаги прогрева; словарь шаг -> (результат, мс).
+
+    session - WSGISession или HTTPSession из core.loadtest, через которую
+    запрашиваются ленты; без нее ленты не прогреваются. Подключения к базе
+    в конце закрываются: при gunicorn --preload прогрев идет до fork, и
+    воркеры не должны наследовать открытое подключение.
+    """
+    if pages is None:
+        pages = settings.WARMUP_FEED_PAGES
+    steps = [
+        ('urls', prime_urls),
+        ('templates', precompile_templates),
+        ('imaging', prime_imaging),
+        ('thumbnails', lambda: prime_thumbnails(pages)),
+    ]
+    if session is not None:
+        steps.append(('feeds', lambda: prime_feeds(session, pages)))
+    results = {}
+    try:
+        for name, step in steps:
+            started = time.perf_counter()
+            try:
+                result = step()
+            except Exception:
+                logger.exception('Прогрев: шаг %s не выполнен', name)
+                result = None
+            results[name] = (
+                result, round((time.perf_counter() - started) * 1000, 3))
+    finally:
+        connections.close_all()
+    logger.info('Прогрев: %s', ', '.join(
+        f'{name} {result} за {ms} мс'
+        for name, (result, ms) in results.items()))
+    return results
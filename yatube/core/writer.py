@@ -0,0 +1,134 @@
+"""Очередь записи в базу через один поток-писатель на процесс.
+
+SQLite пропускает только одного писателя за раз, поэтому одновременные
+записи из разных потоков ждут блокировку и повторяют попытки. При
+WRITE_QUEUE_ENABLED функции записи, переданные в run_write, выполняет
+отдельный поток со своим подключением. Накопившиеся за время коммита
+задания он объединяет в одну транзакцию, каждое в своей точке
+сохранения: ошибка одного задания не откатывает остальные. Задание,
+которое не дождалось очереди за WRITE_QUEUE_TIMEOUT, отменяется и уже
+не выполняется.
+"""
+import os
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .db_router import mark_write
+
+
+_STOP = object()
+
+
+class WriteQueue:
+    def __init__(self, using=DEFAULT_DB_ALIAS, batch_size=50):
+        self.using = using
+        self.batch_size = batch_size
+        self.jobs = queue.Queue()
+        self.batches = 0
+        self.thread = threading.Thread(
+            target=self.run, name=f'write-queue-{using}', daemon=True)
+        self.thread.start()
+
+    def submit(self, func, *args, **kwargs):
+        future = Future()
+        self.jobs.put((future, func, args, kwargs))
+        return future
+
+    def close(self):
+        self.jobs.put(_STOP)
+        self.thread.join()
+
+    def next_batch(self):
+        """Блокируется до первого задания и добирает уже ожидающие."""
+        job = self.jobs.get()
+        if job is _STOP:
+            return None
+        batch = [job]
+        while len(batch) < self.batch_size:
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is _STOP:
+                self.jobs.put(_STOP)
+                break
+            batch.append(job)
+        return batch
+
+    def run(self):
+        try:
+            while True:
+                batch = self.next_batch()
+                if batch is None:
+                    break
+                self.execute(batch)
+        finally:
+            connections[self.using].close()
+
+    def execute(self, batch):
+        # Отмененные задания пропускаются, остальные больше не отменить.
+        batch = [job for job in batch if job[0].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        outcomes = []
+        try:
+            with transaction.atomic(using=self.using):
+                for future, func, args, kwargs in batch:
+                    try:
+                        with transaction.atomic(using=self.using):
+                            outcomes.append((True, func(*args, **kwargs)))
+                    except Exception as error:
+                        outcomes.append((False, error))
+        except Exception as error:
+            # Не удался сам коммит: не записалось ни одно задание.
+            for future, *_ in batch:
+                future.set_exception(error)
+            return
+        self.batches += 1
+        for (future, *_), (ok, value) in zip(batch, outcomes):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_write_queue(using=DEFAULT_DB_ALIAS):
+    """Очередь текущего процесса; после fork создается заново."""
+    key = (os.getpid(), using)
+    if key not in _queues:
+        with _queues_lock:
+            if key not in _queues:
+                _queues[key] = WriteQueue(
+                    using, settings.WRITE_QUEUE_BATCH_SIZE)
+    return _queues[key]
+
+
+def run_write(func, *args, using=DEFAULT_DB_ALIAS, **kwargs):
+    """Выполняет запись через очередь и возвращает ее результат.
+
+    Без WRITE_QUEUE_ENABLED и внутри уже открытой транзакции вызывающего
+    функция выполняется сразу: запись должна попасть в ту же транзакцию.
+    Если задание за WRITE_QUEUE_TIMEOUT не дошло до писателя, оно
+    отменяется и поднимается TimeoutError: клиент не должен получить
+    ошибку за запись, которая потом все равно случится. Уже начатое
+    задание дожидается результата.
+    """
+    if (not settings.WRITE_QUEUE_ENABLED
+            or connections[using].in_atomic_block):
+        return func(*args, **kwargs)
+    mark_write()
+    future = get_write_queue(using).submit(func, *args, **kwargs)
+    try:
+        return future.result(settings.WRITE_QUEUE_TIMEOUT)
+    except FutureTimeoutError:
+        if future.cancel():
+            raise
+    return future.result()
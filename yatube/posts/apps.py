@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class PostsConfig(AppConfig):
     name = 'posts'
     verbose_name: str = 'Публикации'
+
+    def ready(self):
+        from . import signals
+
+        post_migrate.connect(
+            signals.clear_cache, sender=self, dispatch_uid='posts_clear_cache')
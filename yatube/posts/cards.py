@@ -0,0 +1,50 @@
+"""Карточки постов в лентах, закешированные по отдельности.
+
+Разметка карточки (posts/includes/post_card.html) не зависит от
+страницы, на которой выводится, поэтому одна запись кеша переиспользуется
+главной, группой, профилем и подписками. Лента берет все карточки
+страницы одним get_many и рендерит только отсутствующие. Ключ карточки
+строится из версий области 'card' поста и автора (core.versioning):
+правка поста или имени автора меняет ключ, и удалять старые карточки не
+нужно. Комментарии и подписки эти версии не трогают, поэтому карточки
+популярных постов и авторов не перерисовываются после каждого из них.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core.versioning import versioned_keys
+from .models import User
+
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+
+# Область версий, от которой зависит разметка карточки.
+CARD_SCOPE = 'card'
+
+
+def card_keys(posts):
+    # Автор нужен только ради pk, поэтому не загружается.
+    return versioned_keys('post_card', [
+        (post, User(pk=post.author_id)) for post in posts
+    ], CARD_SCOPE)
+
+
+def card_key(post):
+    return card_keys([post])[0]
+
+
+def render_cards(posts):
+    """Пары (пост, HTML карточки) в порядке posts."""
+    posts = list(posts)
+    keys = dict(zip(card_keys(posts), posts))
+    cards = cache.get_many(list(keys))
+    rendered = {
+        key: render_to_string(CARD_TEMPLATE, {'post': post})
+        for key, post in keys.items() if key not in cards
+    }
+    if rendered:
+        cache.set_many(rendered, settings.POST_CARD_TIMEOUT)
+        cards.update(rendered)
+    return [(post, mark_safe(cards[key])) for key, post in keys.items()]
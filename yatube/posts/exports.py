@@ -0,0 +1,115 @@
+import csv
+import json
+from urllib.parse import quote
+
+from django.db.models import Q
+
+from .models import Comment, Follow, Post
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FIELDS = (
+    'type', 'id', 'created', 'author', 'group', 'post', 'user', 'text',
+    'image',
+)
+
+POST_COLUMNS = (
+    ('id', 'id'),
+    ('created', 'created'),
+    ('author', 'author__username'),
+    ('group', 'group__slug'),
+    ('text', 'text'),
+    ('image', 'image'),
+)
+
+COMMENT_COLUMNS = (
+    ('id', 'id'),
+    ('created', 'created'),
+    ('author', 'author__username'),
+    ('group', 'post__group__slug'),
+    ('post', 'post_id'),
+    ('text', 'text'),
+)
+
+FOLLOW_COLUMNS = (
+    ('id', 'id'),
+    ('user', 'user__username'),
+    ('author', 'author__username'),
+)
+
+
+def _records(record_type, queryset, columns):
+    """Построчно отдает записи выборки в виде словарей.
+
+    Модели не создаются: читаем только нужные колонки через values_list,
+    а iterator(chunk_size=...) держит в памяти не больше одного чанка.
+    """
+    names = [name for name, _ in columns]
+    lookups = [lookup for _, lookup in columns]
+    rows = queryset.order_by('id').values_list(*lookups)
+    for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        record = {'type': record_type}
+        for name, value in zip(names, row):
+            if name == 'created':
+                value = value.isoformat()
+            record[name] = value
+        yield record
+
+
+def author_records(author):
+    """Посты и комментарии автора, а также его подписки и подписчики."""
+    yield from _records(
+        'post', Post.objects.filter(author=author), POST_COLUMNS)
+    yield from _records(
+        'comment', Comment.objects.filter(author=author), COMMENT_COLUMNS)
+    yield from _records(
+        'follow',
+        Follow.objects.filter(Q(user=author) | Q(author=author)),
+        FOLLOW_COLUMNS
+    )
+
+
+def group_records(group):
+    """Посты группы и комментарии к ним."""
+    yield from _records(
+        'post', Post.objects.filter(group=group), POST_COLUMNS)
+    yield from _records(
+        'comment', Comment.objects.filter(post__group=group),
+        COMMENT_COLUMNS
+    )
+
+
+class Echo:
+    """Псевдо-файл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def to_ndjson(records):
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def to_csv(records):
+    writer = csv.DictWriter(Echo(), fieldnames=EXPORT_FIELDS)
+    yield writer.writerow(dict(zip(EXPORT_FIELDS, EXPORT_FIELDS)))
+    for record in records:
+        yield writer.writerow(record)
+
+
+def attachment(filename):
+    """Content-Disposition для скачивания; имя не из ASCII передается
+    по RFC 5987."""
+    try:
+        filename.encode('ascii')
+    except UnicodeEncodeError:
+        return f"attachment; filename*=UTF-8''{quote(filename)}"
+    return f'attachment; filename="{quote(filename, safe=" .@+-_")}"'
+
+
+EXPORT_FORMATS = {
+    'ndjson': (to_ndjson, 'application/x-ndjson'),
+    'csv': (to_csv, 'text/csv'),
+}
@@ -0,0 +1,175 @@
+"""Ленты постов как списки id в кеше.
+
+При POST_FEED_STORAGE = 'cache' лента главной, каждой группы и каждого
+автора хранится в кеше списком id новых постов длиной не больше
+POST_FEED_LENGTH. Страница ленты - срез списка и объекты из
+posts.objcache, без сортировки по created в базе. Сигналы из
+posts.signals добавляют id нового поста в начало списков и убирают id
+удаленного, а счетчики постов лент меняют через атомарный incr/decr.
+Списки меняются под короткой блокировкой в кеше; если ее не
+удалось взять, список удаляется и соберется из базы при следующем
+чтении. Чтение-изменение-запись списка должно видеть общий кеш, поэтому
+ключи feed: не хранятся в памяти процесса (L1_TIMEOUTS в settings).
+Страницы за пределами списка читаются из базы как раньше.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Post
+from .objcache import hydrate_posts
+
+
+LOCK_TIMEOUT = 5
+LOCK_ATTEMPTS = 20
+LOCK_DELAY = 0.005
+
+
+def cache_enabled():
+    return settings.POST_FEED_STORAGE == 'cache'
+
+
+def feed_key(kind, pk=None):
+    return f'feed:{kind}' if pk is None else f'feed:{kind}:{pk}'
+
+
+# Поле поста, по которому отбирается лента каждого вида.
+FEED_FIELDS = {'index': None, 'group': 'group_id', 'author': 'author_id'}
+
+
+def post_feed_keys(post):
+    """Ключи лент, в которые входит пост."""
+    keys = [feed_key('index'), feed_key('author', post.author_id)]
+    if post.group_id:
+        keys.append(feed_key('group', post.group_id))
+    return keys
+
+
+def count_key(key):
+    return f'{key}:count'
+
+
+def feed_ids(kind, pk=None):
+    key = feed_key(kind, pk)
+    ids = cache.get(key)
+    if ids is None:
+        ids = list(
+            Post.objects.filter(**{FEED_FIELDS[kind]: pk} if pk else {})
+            .order_by('-created')
+            .values_list('pk', flat=True)[:settings.POST_FEED_LENGTH])
+        # add: не затираем список, который успели обновить сигналы.
+        cache.add(key, ids, settings.POST_FEED_TIMEOUT)
+    return ids
+
+
+class LazyPosts:
+    """Посты страницы; объекты собираются при первом обращении, так что
+    страница внутри закешированного фрагмента ничего не читает."""
+
+    def __init__(self, ids):
+        self.ids = ids
+        self.posts = None
+
+    def _load(self):
+        if self.posts is None:
+            self.posts = hydrate_posts(self.ids)
+        return self.posts
+
+    def __len__(self):
+        return len(self._load())
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __getitem__(self, index):
+        return self._load()[index]
+
+
+class CachedFeed:
+    """Последовательность постов ленты для Paginator."""
+
+    model = Post
+
+    def __init__(self, kind, pk, queryset):
+        self.key = feed_key(kind, pk)
+        self.ids = feed_ids(kind, pk)
+        self.queryset = queryset
+        self.complete = len(self.ids) < settings.POST_FEED_LENGTH
+
+    def count(self):
+        if self.complete:
+            return len(self.ids)
+        total = cache.get(count_key(self.key))
+        if total is None:
+            total = self.queryset.count()
+            cache.add(count_key(self.key), total, settings.POST_FEED_TIMEOUT)
+        return total
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        stop = index.stop if index.stop is not None else self.count()
+        if stop > len(self.ids) and not self.complete:
+            return self.queryset[index]
+        return LazyPosts(self.ids[index])
+
+
+def post_feed(kind, pk, queryset):
+    """Лента из кеша или queryset, если лента хранится в базе."""
+    if not cache_enabled():
+        return queryset
+    return CachedFeed(kind, pk, queryset)
+
+
+def change_count(key, delta):
+    try:
+        cache.incr(count_key(key), delta)
+    except ValueError:
+        pass
+
+
+def update_feed(key, change):
+    """Применяет change к списку id ключа key, если он в кеше."""
+    lock = f'{key}:lock'
+    for _ in range(LOCK_ATTEMPTS):
+        if cache.add(lock, True, LOCK_TIMEOUT):
+            try:
+                ids = cache.get(key)
+                if ids is not None:
+                    cache.set(
+                        key, change(ids)[:settings.POST_FEED_LENGTH],
+                        settings.POST_FEED_TIMEOUT)
+            finally:
+                cache.delete(lock)
+            return
+        time.sleep(LOCK_DELAY)
+    cache.delete(key)
+
+
+def add_post(post):
+    """Новый пост - в начало его лент."""
+    for key in post_feed_keys(post):
+        update_feed(key, lambda ids: [post.pk] + [
+            pk for pk in ids if pk != post.pk])
+        change_count(key, 1)
+
+
+def move_post(post, old_group_id):
+    """Пост перенесен в другую группу."""
+    if old_group_id:
+        remove_post(post, [feed_key('group', old_group_id)])
+    if post.group_id:
+        # Место в новой ленте зависит от даты, проще собрать ее заново.
+        key = feed_key('group', post.group_id)
+        cache.delete_many([key, count_key(key)])
+
+
+def remove_post(post, keys=None):
+    """Удаленный пост - из его лент или только из лент keys."""
+    for key in keys or post_feed_keys(post):
+        update_feed(key, lambda ids: [pk for pk in ids if pk != post.pk])
+        change_count(key, -1)
@@ -0,0 +1,50 @@
+"""Поиск группы по slug и автора по username через кеш.
+
+Соответствие slug или username первичному ключу хранится в кеше, сами
+объекты - в posts.objcache, который сигналы очищают при сохранении и
+удалении. Объект из кеша сверяется с искомым значением, поэтому
+переименование группы или пользователя не вернет устаревшую запись.
+Внутри одного запроса результат запоминается на объекте request.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+from . import objcache
+from .models import Group, User
+
+
+def lookup_key(model, value):
+    return f'lookup:{model._meta.label_lower}:{value}'
+
+
+def _lookup(request, model, field, value):
+    memo = request.__dict__.setdefault('_lookups', {})
+    if (model, value) in memo:
+        return memo[model, value]
+    key = lookup_key(model, value)
+    pk = cache.get(key)
+    obj = None
+    if pk is not None:
+        obj = objcache.get_objects(model, [pk]).get(pk)
+        if obj is not None and getattr(obj, field) != value:
+            obj = None
+    if obj is None:
+        try:
+            obj = objcache.object_queryset(model).get(**{field: value})
+        except model.DoesNotExist:
+            raise Http404(f'Не найдено: {value}')
+        cache.set_many({
+            key: obj.pk,
+            objcache.object_key(model, obj.pk): obj,
+        }, settings.OBJECT_CACHE_TIMEOUT)
+    memo[model, value] = obj
+    return obj
+
+
+def group_by_slug(request, slug):
+    return _lookup(request, Group, 'slug', slug)
+
+
+def user_by_username(request, username):
+    return _lookup(request, User, 'username', username)
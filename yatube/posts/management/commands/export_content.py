@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.exports import EXPORT_FORMATS, author_records, group_records
+from posts.models import Group, User
+
+
+class Command(BaseCommand):
+    help = ('Потоковая выгрузка постов, комментариев и подписок '
+            'автора или группы в NDJSON или CSV.')
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--author', help='username автора')
+        target.add_argument('--group', help='slug группы')
+        parser.add_argument(
+            '--format', choices=sorted(EXPORT_FORMATS), default='ndjson')
+        parser.add_argument(
+            '--output', help='Файл для выгрузки, по умолчанию stdout')
+
+    def handle(self, *args, **options):
+        if options['author']:
+            try:
+                author = User.objects.get(username=options['author'])
+            except User.DoesNotExist:
+                raise CommandError(
+                    f'Автор {options["author"]} не найден')
+            records = author_records(author)
+        else:
+            try:
+                group = Group.objects.get(slug=options['group'])
+            except Group.DoesNotExist:
+                raise CommandError(f'Группа {options["group"]} не найдена')
+            records = group_records(group)
+
+        render, _ = EXPORT_FORMATS[options['format']]
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8',
+                      newline='') as output:
+                for chunk in render(records):
+                    output.write(chunk)
+        else:
+            for chunk in render(records):
+                self.stdout.write(chunk, ending='')
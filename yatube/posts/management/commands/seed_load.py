@@ -0,0 +1,266 @@
+import io
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+
+from core.cache import delete_prefixed
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.signals import DATA_CACHE_PREFIXES
+
+
+TEXT_POOL_SIZE = 2000
+NAME_POOL_SIZE = 300
+IMAGE_SIZE = (960, 339)
+
+
+def zipf_cum_weights(count, alpha):
+    """Накопленные веса степенного распределения для random.choices."""
+    return list(accumulate(1 / rank ** alpha for rank in range(1, count + 1)))
+
+
+def batches(total, size):
+    for start in range(0, total, size):
+        yield start, min(size, total - start)
+
+
+@contextmanager
+def explicit_created(*models):
+    """Позволяет задать created вручную, отключив auto_now_add."""
+    fields = [model._meta.get_field('created') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = ('Генерирует нагрузочные данные: пользователей, группы, посты '
+            'со степенным распределением авторов, комментарии к популярным '
+            'постам и подписки на «звезд».')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=200000)
+        parser.add_argument('--follows', type=int, default=50000)
+        parser.add_argument(
+            '--images', type=int, default=0,
+            help='Сколько различных картинок сгенерировать')
+        parser.add_argument(
+            '--image-root', default=settings.MEDIA_ROOT,
+            help='Каталог для картинок, по умолчанию MEDIA_ROOT; картинки '
+                 'из другого каталога видны, только если MEDIA_ROOT '
+                 'указывает на него')
+        parser.add_argument(
+            '--image-ratio', type=float, default=0.1,
+            help='Доля постов с картинкой, если --images > 0')
+        parser.add_argument(
+            '--group-ratio', type=float, default=0.6,
+            help='Доля постов, опубликованных в группах')
+        parser.add_argument(
+            '--alpha', type=float, default=1.1,
+            help='Показатель степенного распределения')
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней распределить даты публикаций')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='load')
+        parser.add_argument(
+            '--password', default='load-test',
+            help='Общий пароль сгенерированных пользователей')
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(options['seed'])
+        self.texts = [
+            self.fake.paragraph(nb_sentences=3)
+            for _ in range(TEXT_POOL_SIZE)
+        ]
+        self.now = timezone.now()
+        self.start = self.now - timedelta(days=options['days'])
+
+        user_ids = self.stage('users', self.create_users)
+        group_ids = self.stage('groups', self.create_groups)
+        images = self.stage('images', self.create_images)
+        post_ids = self.stage(
+            'posts', self.create_posts, user_ids, group_ids, images)
+        self.stage('comments', self.create_comments, user_ids, post_ids)
+        self.stage('follows', self.create_follows, user_ids)
+        # bulk_create не шлет сигналов: ленты и объекты в кеше устарели.
+        delete_prefixed(DATA_CACHE_PREFIXES)
+        self.stdout.write(self.style.SUCCESS('Готово, кеш данных очищен'))
+
+    def stage(self, name, func, *args):
+        started = time.monotonic()
+        result = func(*args)
+        self.stdout.write(
+            f'{name}: {len(result)} за {time.monotonic() - started:.1f} с')
+        return result
+
+    def bulk_insert(self, model, total, build):
+        """Вставляет total объектов пачками, каждая в своей транзакции."""
+        last_id = model.objects.aggregate(last=Max('id'))['last'] or 0
+        for start, size in batches(total, self.options['batch_size']):
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    [build(start + i) for i in range(size)])
+        return list(
+            model.objects.filter(id__gt=last_id)
+            .order_by('id').values_list('id', flat=True)
+        )
+
+    def created_at(self, index, total):
+        """Дата публикации: равномерно по периоду с небольшим разбросом."""
+        span = (self.now - self.start).total_seconds()
+        offset = span * (index + self.rng.random()) / max(total, 1)
+        return self.start + timedelta(seconds=min(offset, span))
+
+    def create_users(self):
+        prefix = self.options['prefix']
+        offset = User.objects.filter(username__startswith=f'{prefix}_').count()
+        password = make_password(self.options['password'])
+        first_names = [
+            self.fake.first_name() for _ in range(NAME_POOL_SIZE)]
+        last_names = [self.fake.last_name() for _ in range(NAME_POOL_SIZE)]
+
+        def build(i):
+            return User(
+                username=f'{prefix}_{offset + i}',
+                first_name=self.rng.choice(first_names),
+                last_name=self.rng.choice(last_names),
+                password=password,
+            )
+
+        user_ids = self.bulk_insert(User, self.options['users'], build)
+        self.rng.shuffle(user_ids)
+        return user_ids
+
+    def create_groups(self):
+        prefix = self.options['prefix']
+        offset = Group.objects.filter(slug__startswith=f'{prefix}-').count()
+
+        def build(i):
+            return Group(
+                title=self.fake.catch_phrase()[:200],
+                slug=f'{prefix}-{offset + i}'[:25],
+                description=self.rng.choice(self.texts),
+            )
+
+        group_ids = self.bulk_insert(Group, self.options['groups'], build)
+        self.rng.shuffle(group_ids)
+        return group_ids
+
+    def create_images(self):
+        from PIL import Image, ImageDraw
+
+        storage = FileSystemStorage(location=self.options['image_root'])
+        names = []
+        for i in range(self.options['images']):
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            image = Image.new('RGB', IMAGE_SIZE, color)
+            draw = ImageDraw.Draw(image)
+            for _ in range(5):
+                x, y = (self.rng.randrange(IMAGE_SIZE[0]),
+                        self.rng.randrange(IMAGE_SIZE[1]))
+                draw.rectangle(
+                    (x, y, x + 120, y + 60),
+                    fill=tuple(self.rng.randrange(256) for _ in range(3)))
+            buffer = io.BytesIO()
+            image.save(buffer, format='PNG')
+            names.append(storage.save(
+                f'posts/seed/seed_{i}.png', ContentFile(buffer.getvalue())))
+        return names
+
+    def create_posts(self, user_ids, group_ids, images):
+        total = self.options['posts']
+        # Даты постов нужны комментариям: комментарий не старше поста.
+        self.post_dates = [self.created_at(i, total) for i in range(total)]
+        if not user_ids:
+            return []
+        author_weights = zipf_cum_weights(len(user_ids), self.options['alpha'])
+        group_weights = zipf_cum_weights(
+            len(group_ids), self.options['alpha'])
+
+        def build(i):
+            group_id = None
+            if group_ids and self.rng.random() < self.options['group_ratio']:
+                group_id = self.rng.choices(
+                    group_ids, cum_weights=group_weights)[0]
+            image = ''
+            if images and self.rng.random() < self.options['image_ratio']:
+                image = self.rng.choice(images)
+            return Post(
+                text=self.rng.choice(self.texts),
+                author_id=self.rng.choices(
+                    user_ids, cum_weights=author_weights)[0],
+                group_id=group_id,
+                image=image,
+                created=self.post_dates[i],
+            )
+
+        with explicit_created(Post):
+            return self.bulk_insert(Post, total, build)
+
+    def create_comments(self, user_ids, post_ids):
+        if not user_ids or not post_ids:
+            return []
+        total_posts = len(post_ids)
+        hot_order = list(range(total_posts))
+        self.rng.shuffle(hot_order)
+        hot_weights = zipf_cum_weights(total_posts, self.options['alpha'])
+
+        def build(i):
+            index = self.rng.choices(hot_order, cum_weights=hot_weights)[0]
+            posted = self.post_dates[index]
+            return Comment(
+                post_id=post_ids[index],
+                author_id=self.rng.choice(user_ids),
+                text=self.rng.choice(self.texts),
+                created=posted + (self.now - posted) * self.rng.random(),
+            )
+
+        with explicit_created(Comment):
+            return self.bulk_insert(Comment, self.options['comments'], build)
+
+    def create_follows(self, user_ids):
+        if len(user_ids) < 2:
+            return []
+        weights = zipf_cum_weights(len(user_ids), self.options['alpha'])
+        # Пользователи созданы этим же запуском, и подписок у них еще нет.
+        existing = set()
+        edges = []
+        attempts = self.options['follows'] * 10
+        while len(edges) < self.options['follows'] and attempts:
+            attempts -= 1
+            user_id = self.rng.choice(user_ids)
+            author_id = self.rng.choices(user_ids, cum_weights=weights)[0]
+            if user_id == author_id or (user_id, author_id) in existing:
+                continue
+            existing.add((user_id, author_id))
+            edges.append((user_id, author_id))
+
+        def build(i):
+            user_id, author_id = edges[i]
+            return Follow(user_id=user_id, author_id=author_id)
+
+        return self.bulk_insert(Follow, len(edges), build)
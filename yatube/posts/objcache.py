@@ -0,0 +1,65 @@
+"""Кеш объектов Post, User и Group по первичному ключу.
+
+get_objects берет объекты одним get_many, а отсутствующие - одним
+in_bulk и кладет их в кеш. hydrate_posts собирает посты ленты по списку
+id вместе с авторами и группами: на теплом кеше без запросов к базе.
+Записи удаляют сигналы из posts.signals.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Group, Post, User
+
+
+# Поля пользователя, которые выводят ленты; остальные не кешируются.
+USER_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def object_key(model, pk):
+    return f'obj:{model._meta.label_lower}:{pk}'
+
+
+def object_queryset(model):
+    if model is User:
+        return User.objects.only(*USER_FIELDS)
+    return model._default_manager.all()
+
+
+def get_objects(model, ids):
+    """Словарь pk -> объект для существующих ids."""
+    keys = {object_key(model, pk): pk for pk in set(ids)}
+    if not keys:
+        return {}
+    objects = {
+        keys[key]: obj for key, obj in cache.get_many(list(keys)).items()
+    }
+    missing = [pk for pk in keys.values() if pk not in objects]
+    if missing:
+        fetched = object_queryset(model).in_bulk(missing)
+        cache.set_many(
+            {object_key(model, pk): obj for pk, obj in fetched.items()},
+            settings.OBJECT_CACHE_TIMEOUT)
+        objects.update(fetched)
+    return objects
+
+
+def forget(model, ids):
+    cache.delete_many([object_key(model, pk) for pk in ids])
+
+
+def hydrate_posts(ids):
+    """Посты с авторами и группами в порядке ids; удаленные пропускаются."""
+    posts = get_objects(Post, ids)
+    authors = get_objects(User, [post.author_id for post in posts.values()])
+    groups = get_objects(Group, [
+        post.group_id for post in posts.values() if post.group_id
+    ])
+    result = []
+    for pk in ids:
+        post = posts.get(pk)
+        if post is None or post.author_id not in authors:
+            continue
+        post.author = authors[post.author_id]
+        post.group = groups.get(post.group_id)
+        result.append(post)
+    return result
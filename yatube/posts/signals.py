@@ -0,0 +1,175 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from core import versioning
+from core.cache import delete_prefixed
+from core.metrics import OBJECTS_CREATED
+from . import feeds, objcache
+from .cards import CARD_SCOPE
+from .models import Comment, Follow, Group, Post, User
+
+
+# Ключи, которые выводятся из данных в базе: фрагменты шаблонов, карточки,
+# ленты, объекты, поиск по slug и username, версии. Миниатюры sorl к ним
+# не относятся.
+DATA_CACHE_PREFIXES = (
+    'template.cache.', 'post_card:', 'feed:', 'obj:', 'lookup:', 'version:',
+)
+
+
+def count_created(sender, instance, created, **kwargs):
+    if created:
+        OBJECTS_CREATED.inc(model=sender._meta.model_name)
+
+
+def bump_after_commit(*objects, scopes=(None,)):
+    """Новые версии областей scopes после фиксации транзакции: до нее
+    запрос с новой версией собрал бы фрагмент из старых данных. Заглушки
+    по pk, потому что после delete() у объекта его уже нет."""
+    stubs = [type(obj)(pk=obj.pk) for obj in objects]
+
+    def bump():
+        for scope in scopes:
+            versioning.bump(*stubs, scope=scope)
+    transaction.on_commit(bump)
+
+
+def bump_version(sender, instance, **kwargs):
+    bump_after_commit(instance)
+
+
+def bump_post_version(sender, instance, **kwargs):
+    # Текст, картинка и дата поста выводятся в карточке.
+    bump_after_commit(instance, scopes=(None, CARD_SCOPE))
+
+
+def bump_comment_post(sender, instance, **kwargs):
+    # Заглушка по post_id: при каскадном удалении пост уже не прочитать.
+    bump_after_commit(Post(pk=instance.post_id))
+
+
+def bump_follow_users(sender, instance, **kwargs):
+    bump_after_commit(User(pk=instance.user_id), User(pk=instance.author_id))
+
+
+def displayed_user_changed(created, update_fields):
+    # Вход пользователя сохраняет только last_login: ленты не меняются.
+    return not created and not (update_fields and not set(
+        objcache.USER_FIELDS).intersection(update_fields))
+
+
+def bump_user_version(sender, instance, created=False, update_fields=None,
+                      **kwargs):
+    if (kwargs.get('signal') is post_delete
+            or displayed_user_changed(created, update_fields)):
+        # Имя автора выводится в карточке.
+        bump_after_commit(instance, scopes=(None, CARD_SCOPE))
+
+
+def remember_post_group(sender, instance, raw=False, **kwargs):
+    """Запоминает прежнюю группу редактируемого поста."""
+    if feeds.cache_enabled() and instance.pk and not raw:
+        instance._feed_group_id = Post.objects.filter(
+            pk=instance.pk).values_list('group_id', flat=True).first()
+
+
+def feed_post(instance):
+    """Поля поста для лент на момент сигнала: к on_commit instance может
+    измениться, а после delete() у него уже нет pk."""
+    return Post(
+        pk=instance.pk, author_id=instance.author_id,
+        group_id=instance.group_id)
+
+
+# Ленты и кеш объектов меняются после фиксации транзакции: до нее другой
+# запрос прочитал бы из базы старые данные и вернул бы их в кеш.
+def update_post_feeds(sender, instance, created, **kwargs):
+    if not feeds.cache_enabled():
+        return
+    post = feed_post(instance)
+    if created:
+        transaction.on_commit(lambda: feeds.add_post(post))
+        return
+    old_group_id = getattr(instance, '_feed_group_id', instance.group_id)
+
+    def update():
+        objcache.forget(Post, [post.pk])
+        if old_group_id != post.group_id:
+            feeds.move_post(post, old_group_id)
+    transaction.on_commit(update)
+
+
+def remove_post_from_feeds(sender, instance, **kwargs):
+    if not feeds.cache_enabled():
+        return
+    post = feed_post(instance)
+
+    def remove():
+        objcache.forget(Post, [post.pk])
+        feeds.remove_post(post)
+    transaction.on_commit(remove)
+
+
+def forget_cached(model, pk, feed_kind=None):
+    """После фиксации транзакции забывает объект, а с feed_kind - и
+    ленту удаленного автора или группы: иначе posts.lookups мог бы до
+    фиксации снова положить в кеш старую строку из базы."""
+    def forget():
+        if feed_kind:
+            key = feeds.feed_key(feed_kind, pk)
+            cache.delete_many([key, feeds.count_key(key)])
+        objcache.forget(model, [pk])
+    transaction.on_commit(forget)
+
+
+def forget_cached_user(sender, instance, created=False, update_fields=None,
+                       **kwargs):
+    # Кеш объектов нужен и posts.lookups, поэтому очищается в любом режиме.
+    if kwargs.get('signal') is post_delete:
+        forget_cached(User, instance.pk, 'author')
+    elif displayed_user_changed(created, update_fields):
+        forget_cached(User, instance.pk)
+
+
+def forget_cached_group(sender, instance, **kwargs):
+    if kwargs.get('signal') is post_delete:
+        forget_cached(Group, instance.pk, 'group')
+    else:
+        forget_cached(Group, instance.pk)
+
+
+def clear_cache(sender, **kwargs):
+    # После migrate и flush (в том числе между тестами) в кеше остались бы
+    # объекты, которых нет в базе или которые не подходят к новой схеме.
+    delete_prefixed(DATA_CACHE_PREFIXES)
+
+
+for model in (Post, Comment, Follow):
+    post_save.connect(
+        count_created, sender=model,
+        dispatch_uid=f'metrics_created_{model._meta.model_name}')
+
+# Версии для core.versioning: сигналы ловят и представления, и админку.
+for signal in (post_save, post_delete):
+    signal.connect(
+        bump_post_version, sender=Post, dispatch_uid='version_post')
+    signal.connect(bump_version, sender=Group, dispatch_uid='version_group')
+    signal.connect(
+        bump_user_version, sender=User, dispatch_uid='version_user')
+    signal.connect(
+        bump_comment_post, sender=Comment, dispatch_uid='version_comment')
+    signal.connect(
+        bump_follow_users, sender=Follow, dispatch_uid='version_follow')
+
+pre_save.connect(
+    remember_post_group, sender=Post, dispatch_uid='post_feed_group')
+post_save.connect(
+    update_post_feeds, sender=Post, dispatch_uid='post_feed_saved')
+post_delete.connect(
+    remove_post_from_feeds, sender=Post, dispatch_uid='post_feed_deleted')
+for signal in (post_save, post_delete):
+    signal.connect(
+        forget_cached_user, sender=User, dispatch_uid='objcache_user')
+    signal.connect(
+        forget_cached_group, sender=Group, dispatch_uid='objcache_group')
@@ -0,0 +1,82 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import commit_callbacks
+from ..cards import card_key
+from ..models import Group, Post
+
+
+User = get_user_model()
+
+
+class PostCardsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(
+            username='card_author', first_name='Иван', last_name='Петров')
+        cls.group = Group.objects.create(
+            title='Группа карточек', slug='cards', description='Описание')
+        cls.first = Post.objects.create(
+            text='Первый пост', author=cls.user, group=cls.group)
+        cls.second = Post.objects.create(
+            text='Второй пост', author=cls.user, group=cls.group)
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+    def test_card_shared_between_feeds(self):
+        """Карточка из ленты группы выводится в профиле без рендера"""
+        self.client.get(reverse('posts:group_posts', args=['cards']))
+        cache.set(card_key(self.first), '<article>из кеша</article>')
+        response = self.client.get(
+            reverse('posts:profile', args=['card_author']))
+        content = response.content.decode()
+        self.assertIn('<article>из кеша</article>', content)
+        self.assertIn('Второй пост', content)
+        self.assertIn('Иван Петров', content)
+
+    def test_edit_changes_only_its_card_key(self):
+        self.client.get(reverse('posts:group_posts', args=['cards']))
+        self.first.text = 'Исправленный пост'
+        with commit_callbacks():
+            self.first.save()
+        self.assertIsNone(cache.get(card_key(self.first)))
+        self.assertIsNotNone(cache.get(card_key(self.second)))
+        response = self.client.get(reverse('posts:index'))
+        self.assertIn('Исправленный пост', response.content.decode())
+
+    def test_author_rename_changes_author_card_keys(self):
+        other = Post.objects.create(
+            text='Чужой пост', author=User.objects.create(username='other'))
+        self.client.get(reverse('posts:index'))
+
+        self.user.last_login = self.user.date_joined
+        self.user.save(update_fields=['last_login'])
+        self.assertIsNotNone(cache.get(card_key(self.first)))
+
+        self.user.first_name = 'Пётр'
+        with commit_callbacks():
+            self.user.save()
+        self.assertIsNone(cache.get(card_key(self.first)))
+        self.assertIsNone(cache.get(card_key(self.second)))
+        self.assertIsNotNone(cache.get(card_key(other)))
+
+    def test_comment_and_follow_keep_card_key(self):
+        """Комментарий и подписка не меняют ключ карточки"""
+        reader = User.objects.create(username='card_reader')
+        self.client.force_login(reader)
+        key = card_key(self.first)
+        with commit_callbacks():
+            self.client.post(
+                reverse('posts:add_comment', args=[self.first.pk]),
+                {'text': 'Комментарий'})
+        self.assertEqual(card_key(self.first), key)
+        for name in ('posts:profile_follow', 'posts:profile_unfollow'):
+            with self.subTest(name=name):
+                with commit_callbacks():
+                    self.client.get(reverse(name, args=['card_author']))
+                self.assertEqual(card_key(self.first), key)
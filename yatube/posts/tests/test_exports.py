@@ -0,0 +1,122 @@
+import csv
+import io
+import json
+import os
+import tempfile
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..models import Post, Group, Comment, Follow
+
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='export_author')
+        cls.reader = User.objects.create(username='export_reader')
+        cls.staff = User.objects.create(username='staff', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='export_group',
+            description='Описание тестовой группы'
+        )
+        for i in range(3):
+            post = Post.objects.create(
+                text=f'Тестовый пост {i}',
+                author=cls.author,
+                group=cls.group
+            )
+            Comment.objects.create(
+                post=post, author=cls.author, text=f'Комментарий {i}')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(ExportTests.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(ExportTests.reader)
+        self.staff_client = Client()
+        self.staff_client.force_login(ExportTests.staff)
+
+    def test_profile_export_ndjson(self):
+        """Выгрузка автора содержит посты, комментарии и подписки"""
+        response = self.author_client.get(reverse(
+            'posts:profile_export',
+            kwargs={'username': ExportTests.author.username}))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTrue(response.streaming)
+        records = [
+            json.loads(line)
+            for line in b''.join(response.streaming_content).splitlines()
+        ]
+        types = [record['type'] for record in records]
+        self.assertEqual(types.count('post'), 3)
+        self.assertEqual(types.count('comment'), 3)
+        self.assertEqual(types.count('follow'), 1)
+        self.assertEqual(records[0]['author'], ExportTests.author.username)
+
+    def test_group_export_csv(self):
+        """Выгрузка группы в CSV отдает заголовок и все записи"""
+        response = self.staff_client.get(reverse(
+            'posts:group_export',
+            kwargs={'slug': ExportTests.group.slug}) + '?format=csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]['group'], ExportTests.group.slug)
+
+    def test_export_filename_from_slug_and_username(self):
+        """Имя файла не зависит от названия группы на кириллице"""
+        response = self.staff_client.get(reverse(
+            'posts:group_export', kwargs={'slug': ExportTests.group.slug}))
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename="export_group.ndjson"')
+        User.objects.create(username='автор')
+        response = self.staff_client.get(reverse(
+            'posts:profile_export', kwargs={'username': 'автор'}))
+        self.assertEqual(
+            response['Content-Disposition'],
+            "attachment; filename*=UTF-8''%D0%B0%D0%B2%D1%82%D0%BE%D1%80"
+            '.ndjson')
+
+    def test_export_forbidden_for_other_users(self):
+        """Чужой контент выгрузить нельзя"""
+        urls = [
+            reverse('posts:profile_export',
+                    kwargs={'username': ExportTests.author.username}),
+            reverse('posts:group_export',
+                    kwargs={'slug': ExportTests.group.slug}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.reader_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+
+    def test_export_unknown_format(self):
+        response = self.author_client.get(reverse(
+            'posts:profile_export',
+            kwargs={'username': ExportTests.author.username}) + '?format=xml')
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_export_command_writes_file(self):
+        """Команда export_content пишет выгрузку в файл"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'group.ndjson')
+            call_command(
+                'export_content',
+                '--group', ExportTests.group.slug,
+                '--output', path
+            )
+            with open(path, encoding='utf-8') as export:
+                lines = export.read().splitlines()
+        self.assertEqual(len(lines), 6)
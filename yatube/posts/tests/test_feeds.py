@@ -0,0 +1,97 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import commit_callbacks
+from ..feeds import count_key, feed_key
+from ..models import Group, Post
+
+
+User = get_user_model()
+
+
+@override_settings(POST_FEED_STORAGE='cache', POST_FEED_LENGTH=12)
+class CachedFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='feed_author')
+        cls.group = Group.objects.create(
+            title='Лента', slug='feed', description='Описание')
+        cls.other_group = Group.objects.create(
+            title='Другая', slug='other', description='Описание')
+        for number in range(13):
+            Post.objects.create(
+                text=f'Пост {number}', author=cls.user, group=cls.group)
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+    def page_posts(self, url, page=1):
+        response = self.client.get(url, {'page': page})
+        return list(response.context['page_obj'])
+
+    def test_pages_match_database_order(self):
+        url = reverse('posts:group_posts', args=['feed'])
+        expected = list(Post.objects.filter(group=self.group))
+        self.assertEqual(self.page_posts(url), expected[:10])
+        # Вторая страница выходит за POST_FEED_LENGTH и читается из базы.
+        self.assertEqual(self.page_posts(url, 2), expected[10:])
+        self.assertEqual(len(cache.get(feed_key('group', self.group.pk))), 12)
+
+    @override_settings(POST_FEED_LENGTH=1000)
+    def test_warm_page_needs_no_queries(self):
+        url = reverse('posts:index')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            posts = self.page_posts(url)
+        self.assertEqual(posts[0].author, self.user)
+        self.assertEqual(posts[0].group, self.group)
+
+    def test_create_and_delete_update_cached_lists(self):
+        keys = [
+            feed_key('index'),
+            feed_key('group', self.group.pk),
+            feed_key('author', self.user.pk),
+        ]
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:group_posts', args=['feed']))
+        self.client.get(reverse('posts:profile', args=['feed_author']))
+
+        with commit_callbacks():
+            post = Post.objects.create(
+                text='Новый', author=self.user, group=self.group)
+            # До фиксации транзакции списки не меняются.
+            self.assertNotEqual(cache.get(keys[0])[0], post.pk)
+        for key in keys:
+            with self.subTest(key=key):
+                self.assertEqual(cache.get(key)[0], post.pk)
+                self.assertEqual(len(cache.get(key)), 12)
+        group_count = count_key(feed_key('group', self.group.pk))
+        self.assertEqual(cache.get(group_count), 14)
+
+        post_id = post.pk
+        with commit_callbacks():
+            post.delete()
+        for key in keys:
+            with self.subTest(key=key):
+                self.assertNotIn(post_id, cache.get(key))
+        self.assertEqual(cache.get(group_count), 13)
+
+    def test_group_change_moves_post(self):
+        self.client.get(reverse('posts:group_posts', args=['feed']))
+        self.client.get(reverse('posts:group_posts', args=['other']))
+        post = Post.objects.filter(group=self.group).first()
+        post.group = self.other_group
+        with commit_callbacks():
+            post.save()
+        self.assertNotIn(
+            post.pk, cache.get(feed_key('group', self.group.pk)))
+        self.assertEqual(
+            self.page_posts(reverse('posts:group_posts', args=['other'])),
+            [post])
+        self.assertEqual(
+            self.page_posts(reverse('posts:index'))[0].group,
+            self.other_group)
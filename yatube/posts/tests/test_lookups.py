@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import Http404
+from django.test import RequestFactory, TestCase
+
+from core.testing import commit_callbacks
+from ..lookups import group_by_slug, user_by_username
+from ..models import Group
+
+
+User = get_user_model()
+
+
+class LookupTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(
+            username='lookup_user', first_name='Анна')
+        cls.group = Group.objects.create(
+            title='Поиск', slug='lookup', description='Описание')
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def request(self):
+        return self.factory.get('/')
+
+    def test_memoized_within_request_and_cached_across(self):
+        request = self.request()
+        with self.assertNumQueries(1):
+            group = group_by_slug(request, 'lookup')
+            self.assertIs(group_by_slug(request, 'lookup'), group)
+        user_by_username(self.request(), 'lookup_user')
+        with self.assertNumQueries(0):
+            group_by_slug(self.request(), 'lookup')
+            user = user_by_username(self.request(), 'lookup_user')
+        self.assertEqual(user, self.user)
+        self.assertEqual(user.get_full_name(), 'Анна')
+
+    def test_rename_not_served_from_cache(self):
+        group_by_slug(self.request(), 'lookup')
+        self.group.slug = 'renamed'
+        with commit_callbacks():
+            self.group.save()
+        with self.assertRaises(Http404):
+            group_by_slug(self.request(), 'lookup')
+        self.assertEqual(
+            group_by_slug(self.request(), 'renamed'), self.group)
+
+    def test_save_refreshes_cached_user(self):
+        user_by_username(self.request(), 'lookup_user')
+        self.user.first_name = 'Мария'
+        with commit_callbacks():
+            self.user.save()
+            # Кеш очищается только после фиксации транзакции.
+            user = user_by_username(self.request(), 'lookup_user')
+            self.assertEqual(user.first_name, 'Анна')
+        user = user_by_username(self.request(), 'lookup_user')
+        self.assertEqual(user.first_name, 'Мария')
+
+    def test_missing_raises_404(self):
+        with self.assertRaises(Http404):
+            user_by_username(self.request(), 'nobody')
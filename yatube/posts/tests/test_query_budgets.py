@@ -0,0 +1,122 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from core.benchmarks import fetch
+from core.testing import QueryBudgetMixin
+from ..models import Post, Group, Comment, Follow
+
+
+User = get_user_model()
+
+BUDGETS_DIR = os.path.join(os.path.dirname(__file__), 'query_budgets')
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Число и формы SQL-запросов страниц posts сверяются с эталонами
+    в query_budgets/. После осознанного изменения эталоны обновляются
+    запуском тестов с UPDATE_QUERY_BUDGETS=1."""
+
+    query_budget_dir = BUDGETS_DIR
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='budget_author')
+        cls.reader = User.objects.create(username='budget_reader')
+        cls.commenters = [
+            User.objects.create(username=f'budget_commenter_{i}')
+            for i in range(10)
+        ]
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='budget_group',
+            description='Описание тестовой группы'
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Тестовый пост {i}', author=cls.author,
+                 group=cls.group if i % 2 else None)
+            for i in range(25)
+        )
+        cls.post = Post.objects.filter(author=cls.author).latest('created')
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, text=f'Комментарий {i}',
+                    author=cls.commenters[i % len(cls.commenters)])
+            for i in range(50)
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(QueryBudgetTests.reader)
+        self.author_client = Client()
+        self.author_client.force_login(QueryBudgetTests.author)
+
+    def check(self, name, client, url, method='get', data=None):
+        if method == 'post':
+            def scenario():
+                return client.post(url, data)
+        else:
+            def scenario():
+                return fetch(client, url)
+        response = self.assertQueryBudget(name, scenario)
+        self.assertLess(response.status_code, 400)
+
+    def test_index_budgets(self):
+        """Главная страница: первая и последняя страница ленты"""
+        url = reverse('posts:index')
+        self.check('index_page_1_guest', self.guest_client, url)
+        self.check('index_page_1_user', self.reader_client, url)
+        self.check('index_last_page', self.guest_client, f'{url}?page=last')
+
+    def test_group_budget(self):
+        """Страница группы"""
+        self.check('group_posts', self.guest_client, reverse(
+            'posts:group_posts', kwargs={'slug': QueryBudgetTests.group.slug}))
+
+    def test_profile_budgets(self):
+        """Профиль автора: гостем и подписчиком"""
+        url = reverse(
+            'posts:profile',
+            kwargs={'username': QueryBudgetTests.author.username})
+        self.check('profile_guest', self.guest_client, url)
+        self.check('profile_following', self.reader_client, url)
+
+    def test_post_detail_budget(self):
+        """Пост с 50 комментариями"""
+        self.check('post_detail_50_comments', self.reader_client, reverse(
+            'posts:post_detail', kwargs={'post_id': QueryBudgetTests.post.pk}))
+
+    def test_follow_feed_budget(self):
+        """Лента подписок"""
+        self.check(
+            'follow_index', self.reader_client, reverse('posts:follow_index'))
+
+    def test_post_forms_budgets(self):
+        """Формы создания и редактирования поста"""
+        self.check(
+            'post_create', self.author_client, reverse('posts:post_create'))
+        self.check('post_edit', self.author_client, reverse(
+            'posts:post_edit', kwargs={'post_id': QueryBudgetTests.post.pk}))
+
+    def test_write_budgets(self):
+        """Комментарий, подписка и отписка"""
+        post_kwargs = {'post_id': QueryBudgetTests.post.pk}
+        self.check(
+            'add_comment', self.reader_client,
+            reverse('posts:add_comment', kwargs=post_kwargs),
+            method='post', data={'text': 'Новый комментарий'})
+        author_kwargs = {'username': QueryBudgetTests.author.username}
+        self.check('profile_unfollow', self.reader_client, reverse(
+            'posts:profile_unfollow', kwargs=author_kwargs))
+        self.check('profile_follow', self.reader_client, reverse(
+            'posts:profile_follow', kwargs=author_kwargs))
+
+    def test_export_budget(self):
+        """Потоковая выгрузка автора"""
+        self.check('profile_export', self.author_client, reverse(
+            'posts:profile_export',
+            kwargs={'username': QueryBudgetTests.author.username}))
@@ -0,0 +1,68 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Count, F, OuterRef, Subquery
+from django.test import TestCase, override_settings
+
+from ..models import Post, Group, Comment, Follow
+
+
+User = get_user_model()
+
+
+class SeedLoadTests(TestCase):
+    def test_seed_load_creates_social_graph(self):
+        """seed_load создает заданное количество объектов"""
+        call_command(
+            'seed_load', '--users', '30', '--groups', '3', '--posts', '200',
+            '--comments', '100', '--follows', '40', '--batch-size', '64',
+            '--seed', '1', stdout=StringIO()
+        )
+        expected = {
+            User: 30,
+            Group: 3,
+            Post: 200,
+            Comment: 100,
+            Follow: 40,
+        }
+        for model, count in expected.items():
+            with self.subTest(model=model.__name__):
+                self.assertEqual(model.objects.count(), count)
+        self.assertFalse(
+            Follow.objects.filter(user=F('author')).exists(),
+            'Пользователь не должен быть подписан сам на себя'
+        )
+
+    def test_seed_load_skews_authors(self):
+        """Посты распределены по авторам неравномерно"""
+        call_command(
+            'seed_load', '--users', '50', '--groups', '0', '--posts', '500',
+            '--comments', '0', '--follows', '0', '--seed', '2',
+            stdout=StringIO()
+        )
+        counts = sorted(
+            User.objects.annotate(total=Count('posts'))
+            .values_list('total', flat=True),
+            reverse=True
+        )
+        self.assertGreater(counts[0], 5 * (500 / 50))
+
+    def test_seed_load_images_and_comment_dates(self):
+        """Картинки по умолчанию пишутся в MEDIA_ROOT, комментарии не
+        старше постов"""
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(MEDIA_ROOT=directory):
+            call_command(
+                'seed_load', '--users', '10', '--groups', '0', '--posts',
+                '30', '--comments', '60', '--follows', '0', '--images', '1',
+                '--image-ratio', '1', '--seed', '3', stdout=StringIO()
+            )
+            image = Post.objects.first().image
+            self.assertTrue(os.path.isfile(image.path))
+            self.assertTrue(image.path.startswith(directory))
+        posted = Post.objects.filter(pk=OuterRef('post')).values('created')
+        self.assertFalse(
+            Comment.objects.filter(created__lt=Subquery(posted)).exists())
@@ -18,7 +18,11 @@ User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    QUERY_DUPLICATES_THRESHOLD=3,
+    QUERY_DUPLICATES_RAISE=True,
+)
 class BaseTestClass(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -38,6 +38,16 @@ urlpatterns = [
         'profile/<str:username>/unfollow/',
         views.ProfileUnfollow.as_view(),
         name='profile_unfollow'
+    ),
+    path(
+        'profile/<str:username>/export/',
+        views.ProfileExportView.as_view(),
+        name='profile_export'
+    ),
+    path(
+        'group/<slug>/export/',
+        views.GroupExportView.as_view(),
+        name='group_export'
     )
 ]
 
@@ -1,33 +1,44 @@
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect
 from django.views.generic import (ListView, DetailView,
                                   FormView, CreateView, UpdateView, View)
 from django.urls import reverse
+
+from core.writer import run_write
+from .feeds import post_feed
+from .lookups import group_by_slug, user_by_username
 from .models import Group, Post, User, Comment, Follow
 from .forms import PostForm, CommentForm
+from .exports import (EXPORT_FORMATS, attachment, author_records,
+                      group_records)
 
 
 POSTS_PER_PAGE = 10
 
 
 class IndexListView(ListView):
-    model = Post
+    queryset = Post.objects.select_related('author', 'group')
     template_name = 'posts/index.html'
     paginate_by = POSTS_PER_PAGE
+    replica_reads = True
+
+    def get_queryset(self):
+        return post_feed('index', None, super().get_queryset())
 
 
 class GroupListView(ListView):
     template_name = 'posts/group_list.html'
     paginate_by = POSTS_PER_PAGE
+    replica_reads = True
 
     def get_object(self):
-        group = get_object_or_404(Group, slug=self.kwargs.get('slug'))
-        return group
+        return group_by_slug(self.request, self.kwargs.get('slug'))
 
     def get_queryset(self):
         group = self.get_object()
-        self.queryset = group.posts
-        return self.queryset.all()
+        self.queryset = group.posts.select_related('author', 'group')
+        return post_feed('group', group.pk, self.queryset.all())
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -38,15 +49,15 @@ class GroupListView(ListView):
 class ProfileListView(ListView):
     template_name = 'posts/profile.html'
     paginate_by = POSTS_PER_PAGE
+    replica_reads = True
 
     def get_object(self):
-        user = get_object_or_404(User, username=self.kwargs.get('username'))
-        return user
+        return user_by_username(self.request, self.kwargs.get('username'))
 
     def get_queryset(self):
         user = self.get_object()
-        self.queryset = user.posts
-        return self.queryset.all()
+        self.queryset = user.posts.select_related('author', 'group')
+        return post_feed('author', user.pk, self.queryset.all())
 
     def get_context_data(self, **kwargs):
         author = self.get_object()
@@ -60,19 +71,20 @@ class ProfileListView(ListView):
 
 
 class PostDetailView(DetailView, FormView):
-    model = Post
+    queryset = Post.objects.select_related('author', 'group')
     context_object_name = 'post'
     template_name = 'posts/post_detail.html'
     pk_url_kwarg = 'post_id'
     form_class = CommentForm
     symbols_count = 30
+    replica_reads = True
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         post = context['post']
         title = f'Пост {post.text[:self.symbols_count]}'
         author_fullname = f'{post.author.first_name} {post.author.last_name}'
-        context['comments'] = post.comments.all()
+        context['comments'] = post.comments.select_related('author')
         context['title'] = title
         context['author_fullname'] = author_fullname
         return context
@@ -97,8 +109,10 @@ class PostEditView(LoginRequiredMixin, UpdateView):
     template_name = 'posts/create_post.html'
 
     def get_object(self, queryset=None):
-        obj = get_object_or_404(Post, id=self.kwargs.get('post_id'))
-        return obj
+        if not hasattr(self, '_post'):
+            self._post = get_object_or_404(
+                Post, id=self.kwargs.get('post_id'))
+        return self._post
 
     def get(self, request, *args, **kwargs):
         post = self.get_object()
@@ -114,7 +128,7 @@ class PostEditView(LoginRequiredMixin, UpdateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        author = get_object_or_404(Post, id=self.kwargs.get('post_id'))
+        author = self.get_object()
         context['author'] = author
         context['is_edit']: True
         return context
@@ -133,7 +147,7 @@ class AddCommentView(LoginRequiredMixin, CreateView):
         comment = form.save(commit=False)
         comment.author = self.request.user
         comment.post = post
-        form.save()
+        run_write(comment.save)
         return redirect('posts:post_detail', post.id)
 
 
@@ -141,12 +155,13 @@ class FollowIndexView(LoginRequiredMixin, ListView):
     model = Post
     template_name = 'posts/follow.html'
     paginate_by = POSTS_PER_PAGE
+    replica_reads = True
 
     def get_queryset(self):
         user = self.request.user
         post_list_follow = Post.objects.filter(
             author__following__user=user
-        )
+        ).select_related('author', 'group')
         self.queryset = post_list_follow
         return self.queryset
 
@@ -156,11 +171,12 @@ class ProfileFollow(LoginRequiredMixin, View):
 
     def get(self, request, **kwargs):
         author_username = kwargs.get('username')
-        author = User.objects.get(username=author_username)
+        author = user_by_username(request, author_username)
         follower = request.user.follower.filter(
             author__username=author_username)
         if author.id != request.user.id and not follower.exists():
-            Follow.objects.create(
+            run_write(
+                Follow.objects.create,
                 user=request.user,
                 author=author
             )
@@ -176,14 +192,61 @@ class ProfileUnfollow(LoginRequiredMixin, View):
 
     def get(self, request, **kwargs):
         author_username = kwargs.get('username')
-        author = User.objects.get(username=author_username)
+        author = user_by_username(request, author_username)
         followings = request.user.follower.filter(
             author__username=author_username)
         if author.id != request.user.id:
-            if followings.exists():
-                followings.delete()
+            # Сигналы Follow все равно выбирают удаляемые строки,
+            # отдельная проверка exists() не нужна.
+            run_write(followings.delete)
         return redirect(
             reverse(
                 'posts:profile',
                 kwargs={'username': self.kwargs.get('username')})
         )
+
+
+class ExportView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """Потоковая выгрузка контента: ?format=ndjson (по умолчанию) или csv.
+
+    Подкласс задает model, lookup_field - поле модели и одноименный
+    аргумент адреса, по значению которого названа выгрузка, - и records,
+    функцию объект -> записи.
+    """
+
+    model = None
+    lookup_field = None
+    records = None
+
+    def get(self, request, **kwargs):
+        export_format = request.GET.get('format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return HttpResponseBadRequest(
+                f'Неизвестный формат выгрузки: {export_format}')
+        lookup = self.kwargs.get(self.lookup_field)
+        obj = get_object_or_404(self.model, **{self.lookup_field: lookup})
+        render, content_type = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(
+            render(self.records(obj)), content_type=content_type)
+        response['Content-Disposition'] = attachment(
+            f'{lookup}.{export_format}')
+        return response
+
+
+class ProfileExportView(ExportView):
+    model = User
+    lookup_field = 'username'
+    records = staticmethod(author_records)
+
+    def test_func(self):
+        user = self.request.user
+        return user.is_staff or user.username == self.kwargs.get('username')
+
+
+class GroupExportView(ExportView):
+    model = Group
+    lookup_field = 'slug'
+    records = staticmethod(group_records)
+
+    def test_func(self):
+        return self.request.user.is_staff
@@ -10,7 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -23,7 +27,12 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = 'e(i7r59m)9ayzbi93i9az#p8j1zx$!3upjn=u@5lfv_t8wek)5'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# DJANGO_DEBUG=0 в окружении включает настройки продакшена.
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') != '0'
+
+# manage.py test и pytest: кеш во временном каталоге, а не в файле
+# запущенного сервера.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
 
 ALLOWED_HOSTS = [
     'localhost',
@@ -36,7 +45,9 @@ ALLOWED_HOSTS = [
 # Application definition
 
 INSTALLED_APPS = [
-    'django.contrib.admin',
+    # Без автообнаружения при старте: admin.py приложений загружает
+    # yatube/urls.py, так что команды без адресов не платят за админку.
+    'django.contrib.admin.apps.SimpleAdminConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -50,6 +61,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.static.PrecompressedStaticMiddleware',
+    'core.middleware.metrics.MetricsMiddleware',
+    'core.middleware.timing.ServerTimingMiddleware',
+    'core.middleware.queries.DuplicateQueryMiddleware',
+    'core.middleware.profiling.ProfilingMiddleware',
+    'core.middleware.explain.ExplainCaptureMiddleware',
+    'core.middleware.replicas.ReplicaRouterMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -62,12 +80,20 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Вне отладки разобранные шаблоны хранятся в памяти процесса,
+            # а yatube/wsgi.py разбирает их все до первого запроса.
+            'loaders': TEMPLATE_LOADERS if DEBUG else [
+                ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -92,6 +118,66 @@ DATABASES = {
     }
 }
 
+# С сервером баз данных подключения берутся из пула core.db.pool:
+# CONN_MAX_AGE = 0 возвращает подключение в пул после каждого запроса.
+#
+# DATABASES = {
+#     'default': {
+#         'ENGINE': 'core.db.backends.postgresql',
+#         'NAME': 'yatube',
+#         'USER': 'yatube',
+#         'PASSWORD': '',
+#         'HOST': 'localhost',
+#         'PORT': 5432,
+#         'CONN_MAX_AGE': 0,
+#         'POOL': {
+#             'MIN_SIZE': 2,
+#             'MAX_SIZE': 20,
+#             'TIMEOUT': 10,
+#             'IDLE_TIMEOUT': 300,
+#             'MAX_LIFETIME': 3600,
+#             'CHECK_AFTER': 30,
+#         },
+#     }
+# }
+
+# PRAGMA для каждого нового подключения SQLite (core.sqlite). WAL не дает
+# читателям блокировать писателя, busy_timeout (мс) ждет освобождения
+# блокировки вместо «database is locked», mmap_size и cache_size (в КиБ,
+# если отрицательный) держат горячие страницы в памяти.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64000,
+    'temp_store': 'memory',
+}
+
+# Запись комментариев и подписок через один поток-писатель на процесс
+# (core.writer): ожидающие записи объединяются в транзакции до
+# WRITE_QUEUE_BATCH_SIZE штук; WRITE_QUEUE_TIMEOUT - секунды ожидания
+# результата запросом, после них еще не начатое задание отменяется.
+WRITE_QUEUE_ENABLED = False
+WRITE_QUEUE_BATCH_SIZE = 50
+WRITE_QUEUE_TIMEOUT = 10
+
+# Реплики для чтения лент и постов (core.db_router). Запись всегда идет в
+# default; клиент, который что-то записал, REPLICA_PIN_SECONDS секунд
+# читает основную базу. Локально реплику можно подключить так и
+# обновлять командой sync_replica:
+#
+# DATABASES['replica'] = {
+#     'ENGINE': 'django.db.backends.sqlite3',
+#     'NAME': os.path.join(BASE_DIR, 'replica.sqlite3'),
+#     'TEST': {'MIRROR': 'default'},
+# }
+# DATABASE_REPLICAS = ['replica']
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+DATABASE_REPLICAS = []
+REPLICA_PIN_SECONDS = 5
+REPLICA_PIN_COOKIE = 'primary_pin'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -104,7 +190,7 @@ AUTH_PASSWORD_VALIDATORS = [
         'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
     },
     {
-        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+        'NAME': 'core.password_validation.CommonPasswordValidator',
     },
     {
         'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
@@ -133,6 +219,19 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
+# Вне отладки collectstatic добавляет хеш содержимого в имена файлов и
+# пишет рядом сжатые копии .gz и .br (core.staticfiles), а
+# PrecompressedStaticMiddleware раздает их из STATIC_ROOT по
+# Accept-Encoding. Файлам с хешем отдается immutable на
+# STATIC_IMMUTABLE_MAX_AGE секунд, остальным - STATIC_MAX_AGE.
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+STATICFILES_STORAGE = (
+    'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+    else 'core.staticfiles.CompressedManifestStaticFilesStorage')
+STATIC_SERVE_PRECOMPRESSED = not DEBUG
+STATIC_MAX_AGE = 60 * 60
+STATIC_IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
@@ -146,8 +245,114 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Двухуровневый кеш: default держит горячие ключи в памяти процесса
+# (L1) не дольше L1_TIMEOUT секунд, а промахи читает из shared - файла
+# SQLite, общего для всех воркеров. Изменения доходят до L1 других
+# процессов через журнал в shared не позже CHECK_INTERVAL секунд.
+# Списки лент (feed:) меняются чтением-записью и в L1 не попадают.
+# MAX_SIZE - предел размера значений shared в байтах, при превышении
+# удаляются давно не читавшиеся записи.
+if TESTING:
+    CACHE_DIR = tempfile.mkdtemp(prefix='yatube-cache-')
+    atexit.register(shutil.rmtree, CACHE_DIR, ignore_errors=True)
+else:
+    CACHE_DIR = BASE_DIR
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache.tiered.TieredCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {
+            'L1_MAX_ENTRIES': 500,
+            'L1_TIMEOUT': 5,
+            'L1_TIMEOUTS': {'feed:': 0},
+            'CHECK_INTERVAL': 0.5,
+        },
+    },
+    'shared': {
+        'BACKEND': 'core.cache.sqlite.SQLiteCache',
+        'LOCATION': os.path.join(CACHE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+            'MAX_SIZE': 64 * 1024 * 1024,
+        },
+    },
+}
+
+# Защита от одновременного пересчета (core.cache.stampede): значение
+# хранится еще CACHE_STALE_SECONDS после срока и отдается, пока один
+# запрос его пересчитывает; блокировка пересчета живет CACHE_LOCK_TIMEOUT
+# секунд. CACHE_RECOMPUTE_BETA > 1 чаще пересчитывает заранее, 0 -
+# только по истечении срока.
+CACHE_STALE_SECONDS = 60
+CACHE_LOCK_TIMEOUT = 10
+CACHE_RECOMPUTE_BETA = 1.0
+
+# Срок карточек постов в кеше (posts.cards): их удаляют сигналы при
+# изменении поста или автора, срок лишь освобождает место.
+POST_CARD_TIMEOUT = 24 * 60 * 60
+
+# Хранение лент (posts.feeds): 'database' - страница ленты сортируется
+# в базе на каждый запрос; 'cache' - лента главной, группы и автора
+# хранится в кеше списком id не длиннее POST_FEED_LENGTH, посты, авторы
+# и группы берутся из кеша объектов на OBJECT_CACHE_TIMEOUT секунд.
+POST_FEED_STORAGE = 'database'
+POST_FEED_LENGTH = 1000
+POST_FEED_TIMEOUT = 10 * 60
+OBJECT_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Прогрев воркера при старте (core.warmup): резолвер, шаблоны, sorl и
+# Pillow, миниатюры и WARMUP_FEED_PAGES страниц главной, групп и авторов.
+WARMUP_ON_START = not DEBUG
+WARMUP_FEED_PAGES = 3
+
+# Доля запросов, для которых ServerTimingMiddleware собирает метрики:
+# 0 отключает middleware, 1.0 замеряет каждый запрос.
+REQUEST_TIMING_SAMPLE_RATE = 0.0
+REQUEST_TIMING_HEADER = True
+
+# Сколько раз одна форма SQL-запроса может повториться за запрос, прежде
+# чем DuplicateQueryMiddleware сочтет это N+1; 0 отключает проверку, иначе
+# порог не меньше 2.
+# QUERY_DUPLICATES_RAISE превращает отчет в ошибку (для тестов).
+QUERY_DUPLICATES_THRESHOLD = 0
+QUERY_DUPLICATES_RAISE = False
+
+# Доля запросов, целиком снимаемых cProfile, и порог в мс, после которого
+# запрос сэмплируется по стеку. Результаты вместе с SQL-логом пишутся в
+# PROFILING_DIR/<имя адреса>/; нули отключают профилирование. Под порогом
+# запрос стоит записи в словарь сэмплера и проверки флага на каждый
+# SQL-запрос; SQL-лог медленного запроса включается после порога и
+# содержит только запросы после него.
+PROFILING_SAMPLE_RATE = 0.0
+PROFILING_SLOW_MS = 0
+PROFILING_INTERVAL_MS = 5
+PROFILING_DIR = os.path.join(BASE_DIR, 'profiles')
+
+# Метрики Prometheus на /metrics. Каждый воркер пишет свой файл в
+# METRICS_DIR, эндпоинт суммирует все файлы; файлы завершившихся воркеров
+# переносятся в metrics_archive.db без gauge. Каталог нужно очищать при
+# перезапуске сервера, иначе счетчики продолжатся с прежних значений.
+METRICS_ENABLED = False
+METRICS_DIR = os.path.join(BASE_DIR, 'metrics')
+
+# Файл, куда ExplainCaptureMiddleware дописывает новые формы SQL-запросов
+# для explain_queries --input; None отключает сбор.
+EXPLAIN_CAPTURE_FILE = None
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'yatube': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
 }
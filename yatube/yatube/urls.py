@@ -16,13 +16,19 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from core.views import metrics
+
+
+# INSTALLED_APPS подключает админку без автообнаружения (settings).
+admin.autodiscover()
 
 handler404 = 'core.views.page_not_found'
-handler403 = 'core.views.csrf_failure'
+handler403 = 'core.views.permission_denied'
 handler500 = 'core.views.internal_server_error'
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics, name='metrics'),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
@@ -14,3 +14,12 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Прогрев воркера до первого запроса (core.warmup).
+from django.conf import settings  # noqa: E402
+
+if settings.WARMUP_ON_START:
+    from core.clients import WSGISession
+    from core.warmup import warmup
+
+    warmup(WSGISession(application))